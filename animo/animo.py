@@ -6,10 +6,24 @@
 
 from __future__ import print_function, division
 from abc import ABCMeta, abstractmethod
-from JSAnimation.IPython_display import display_animation
-from matplotlib import animation
+from .export import export_animation, FrameRenderer, unique_axes
+from .embed import display_frames
+from .player import FramePlayer
+from .sources import frame_stack, contiguous_stack, single_pass, FrameSource, SlabSource, \
+                    AtlasSource, RingSource
+from .cache import FrameCache, DiskCache, animation_key, encode_png
+from .instrument import FrameProfiler, NULLPHASE, perf_counter
+from .schedule import PlaybackScheduler
+from .decimate import decimate_lines
+from .pyramid import FramePyramid
+from . import compact as cpt
+from .timeline import Timeline, Track, content_key
+from . import raster
 import numpy as np
-import matplotlib.pyplot as plt
+import warnings
+import hashlib
+import sys
+import os
 import matplotlib as mpl
 import matplotlib.colors as colors
 
@@ -17,32 +31,220 @@ import matplotlib.colors as colors
 # ===== Utility functions ===== #
 
 class MidpointNormalize(colors.Normalize):
+    """
+    Piecewise-linear normalization mapping vmin, midpoint, vmax to 0, 0.5, 1
+    """
 
     def __init__(self, vmin=None, vmax=None, midpoint=None, clip=False):
         self.midpoint = midpoint
         colors.Normalize.__init__(self, vmin, vmax, clip)
 
+    def _slopes(self):
+        vmin, vmax = float(self.vmin), float(self.vmax)
+        mp = min(max(float(self.midpoint), vmin), vmax)
+        slo = 0.5 / (mp - vmin) if mp > vmin else 0.
+        shi = 0.5 / (vmax - mp) if vmax > mp else 0.
+        return vmin, vmax, mp, slo, shi
+
     def __call__(self, value, clip=None):
-        x, y = [self.vmin, self.midpoint, self.vmax], [0, 0.5, 1]
-        return np.ma.masked_array(np.interp(value, x, y))
+        result, is_scalar = self.process_value(value)
+        self.autoscale_None(result)
+        vmin, vmax, mp, slo, shi = self._slopes()
+        # Vectorized kernel operating in place on the copy made by process_value
+        resdat = np.ma.getdata(result)
+        np.clip(resdat, vmin, vmax, out=resdat)
+        slope = np.where(resdat < mp, slo, shi)
+        resdat -= mp
+        resdat *= slope
+        resdat += 0.5
+        result = np.ma.array(resdat, mask=np.ma.getmask(result), copy=False)
+        if is_scalar:
+            result = result[0]
+        return result
 
+    def inverse(self, value):
+        vmin, vmax, mp, slo, shi = self._slopes()
+        value = np.asarray(value, dtype='float')
+        return np.where(value < 0.5, mp - (0.5 - value) * (mp - vmin) * 2, \
+                        mp + (value - 0.5) * (vmax - mp) * 2)
 
-def parse_norm(data, cscale):
+
+def parse_norm(data, cscale, vmin=None, vmax=None):
     """
-    Parser of string for color normalization
+    Parser of string for color normalization, the limits of the midpoint
+    normalization that are not specified are taken from data
     """
     if isinstance(cscale, str):
         if cscale == 'log':  # log scale
-            return mpl.colors.LogNorm()
+            return mpl.colors.LogNorm(vmin=vmin, vmax=vmax)
         elif cscale == 'linear':  # linear scale (default)
-            return mpl.colors.Normalize()
+            return mpl.colors.Normalize(vmin=vmin, vmax=vmax)
     elif isinstance(cscale, dict):
-        mp = cscale.pop('midpoint', 0.)
-        cvmin = cscale.pop('vmin', np.min(data))
-        cvmax = cscale.pop('vmax', np.max(data))
+        mp = cscale.get('midpoint', 0.)
+        cvmin = cscale.get('vmin', vmin)
+        cvmax = cscale.get('vmax', vmax)
+        if cvmin is None:
+            cvmin = np.nanmin(data)
+        if cvmax is None:
+            cvmax = np.nanmax(data)
         return MidpointNormalize(vmin=cvmin, vmax=cvmax, midpoint=mp)
 
 
+class StackLimits(object):
+    """
+    Per-frame and global color limits of a frame stack, gathered in a single
+    chunked streaming pass. With percentile=(lo, hi) the limits are robust,
+    exact per frame and estimated from a bounded strided sample globally
+    """
+
+    def __init__(self, stack, percentile=None, chunksize=16, maxsamples=1000000):
+        nframes = stack.shape[0]
+        framesize = int(np.prod(stack.shape[1:]))
+        self.percentile = percentile
+        self.fmin, self.fmax = np.empty(nframes), np.empty(nframes)
+        self.samples = []
+        step = max(1, int(np.ceil(nframes * framesize / float(maxsamples))))
+        with warnings.catch_warnings():
+            # The limits of all-NaN frames are NaN
+            warnings.simplefilter('ignore', RuntimeWarning)
+            for k in range(0, nframes, chunksize):
+                chunk = np.asarray(stack[k:k+chunksize]).reshape(-1, framesize)
+                if percentile is None:
+                    self.fmin[k:k+len(chunk)] = np.nanmin(chunk, axis=1)
+                    self.fmax[k:k+len(chunk)] = np.nanmax(chunk, axis=1)
+                else:
+                    self.fmin[k:k+len(chunk)], self.fmax[k:k+len(chunk)] = \
+                        np.nanpercentile(chunk, percentile, axis=1)
+                    samples = chunk[:, ::step].ravel()
+                    self.samples.append(samples[~np.isnan(samples)])
+        self._globals()
+
+    def _globals(self):
+        """
+        Global limits over the frames, all-NaN frames are skipped and a stack
+        without any value gets the limits (0, 1) so that it renders blank
+        """
+        if self.percentile is None:
+            # fmin/fmax ignore NaN unless all values are NaN
+            self.gmin, self.gmax = np.fmin.reduce(self.fmin), np.fmax.reduce(self.fmax)
+        else:
+            samples = np.concatenate(self.samples)
+            if samples.size > 0:
+                self.gmin, self.gmax = np.percentile(samples, self.percentile)
+            else:
+                self.gmin, self.gmax = np.nan, np.nan
+        if np.isnan(self.gmin) or np.isnan(self.gmax):
+            self.gmin, self.gmax = 0., 1.
+
+    @classmethod
+    def merge(cls, limits):
+        """
+        Combine the limits of several stacks, e.g. the panels of MultiImageAnimate
+        """
+        merged = cls.__new__(cls)
+        nframes = min(len(lim.fmin) for lim in limits)
+        merged.percentile = limits[0].percentile
+        merged.fmin = np.fmin.reduce([lim.fmin[:nframes] for lim in limits], axis=0)
+        merged.fmax = np.fmax.reduce([lim.fmax[:nframes] for lim in limits], axis=0)
+        merged.samples = sum((lim.samples for lim in limits), [])
+        merged._globals()
+        return merged
+
+    def get(self, iframe=None):
+        """
+        Retrieve the global limits (iframe=None) or the limits of a frame
+        """
+        if iframe is None:
+            return self.gmin, self.gmax
+        return self.fmin[iframe], self.fmax[iframe]
+
+
+def is_uniform(axis, rtol=1e-6):
+    """
+    Check if the coordinates along an axis are increasing and evenly spaced
+    """
+    axis = np.asarray(axis, dtype='float')
+    if axis.ndim != 1 or axis.size < 2:
+        return False
+    steps = np.diff(axis)
+    return bool(steps[0] > 0 and np.allclose(steps, steps[0], rtol=rtol, atol=0))
+
+
+def image_extent(xaxis, yaxis):
+    """
+    Image extent with pixels centered at evenly spaced axis coordinates
+    """
+    dx, dy = xaxis[1] - xaxis[0], yaxis[1] - yaxis[0]
+    return (xaxis[0] - dx/2., xaxis[-1] + dx/2., yaxis[0] - dy/2., yaxis[-1] + dy/2.)
+
+
+def is_style_value(value):
+    """
+    Check if an attribute value is a plain style parameter (numbers, strings
+    and containers thereof) rather than data or matplotlib objects
+    """
+    if isinstance(value, (str, bool, int, float, np.generic, type(None))):
+        return True
+    elif isinstance(value, (tuple, list)):
+        return all(is_style_value(v) for v in value)
+    elif isinstance(value, dict):
+        return all(is_style_value(v) for v in value.values())
+    return False
+
+
+class FrameLabels(object):
+    """
+    Frame annotations from a format string of the frame number, e.g. 'frame {}'
+    """
+    
+    def __init__(self, fmt=''):
+        self.fmt = fmt
+    
+    def __getitem__(self, iframe):
+        return self.fmt.format(iframe)
+    
+    def content_state(self):
+        return {'fmt':self.fmt}
+
+
+def new_figure(figsize=None, nrows=1, ncols=1, pyplot=None):
+    """
+    Figure with a grid of axes, created through pyplot in interactive sessions
+    and directly on an Agg canvas otherwise, without importing pyplot
+    """
+    if pyplot is None:
+        pyplot = 'matplotlib.pyplot' in sys.modules or 'IPython' in sys.modules
+    if pyplot:
+        import matplotlib.pyplot as plt
+        return plt.subplots(nrows, ncols, figsize=figsize)
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig, fig.subplots(nrows, ncols)
+
+
+def frame_image(img):
+    """
+    Displayable PNG image of a rendered RGBA frame
+    """
+    from IPython.display import Image
+    return Image(data=encode_png(img))
+
+
+def show_frame(img):
+    """
+    Display a rendered RGBA frame when running in IPython
+    """
+    try:
+        from IPython import get_ipython
+        from IPython.display import display
+    except ImportError:
+        return
+    if get_ipython() is not None:
+        display(frame_image(img))
+
+
 # ===== Animator classes ===== #
 
 class PlotAnimate(object):
@@ -52,26 +254,378 @@ class PlotAnimate(object):
     
     __metaclass__ = ABCMeta
     
+    # Names of the dynamic artist attributes, rendered frame cache, on-disk
+    # output cache, phase profiler
+    _artist_names = ()
+    cache = None
+    diskcache = None
+    profiler = None
+    # Attributes set while displaying or derived from the data and the keyed
+    # parameters, left out of content keys
+    _transient_names = ('anim', 'cache', 'diskcache', 'profiler', 'scheduler', 'player', \
+                        'norm', 'limits', 'timeline')
+    # Canvas methods replaced to time the live view, frame opened by the live view
+    _canvashooks = None
+    _live = None
+    # Figure and axes created on first use, (parent animator, panel) of a panel
+    _f = None
+    _ax = None
+    _parent = None
+    pyplot = None
+    figsize = None
+    _fingerprint = None
+    _renderer = None
+    
+    @property
+    def f(self):
+        if self._f is None:
+            self.make_figure()
+        return self._f
+    
+    @f.setter
+    def f(self, fig):
+        self._f = fig
+    
+    @property
+    def ax(self):
+        if self._ax is None:
+            self.make_figure()
+        return self._ax
+    
+    @ax.setter
+    def ax(self, ax):
+        self._ax = ax
+    
+    def make_figure(self):
+        """
+        Create the figure and axes when they are first needed, panels of a
+        multi-panel animator take them from their parent
+        """
+        if self._parent is not None:
+            parent, k = self._parent
+            self.f, self.ax = parent.f, parent.panel_axes(k)
+        else:
+            self.f, self.ax = new_figure(self.figsize, pyplot=self.pyplot)
+        self.setup_axes()
+    
+    def setup_axes(self):
+        """
+        Static decoration of newly created axes
+        """
+        return
+    
     @abstractmethod
     def animator(self, iframe):
         """
-        Construct animation
+        Construct animation, returns the sequence of updated artists
         """
         return
     
     @abstractmethod
-    def view_frame(self, iframe):
+    def artists(self):
         """
-        Display a single frame of animation
+        Sequence of dynamic artists updated in every frame
         """
         return
+    
+    def set_param(self, prop_statement):
+        exec("self." + prop_statement)
+        self.reset()
+    
+    def reset(self):
+        """
+        Discard the dynamic artists and the cached frames after a change of
+        parameters, the artists are rebuilt at the next frame
+        """
+        self._fingerprint = None
+        if self._renderer is not None:
+            self._renderer.close()
+        self._renderer = None
+        if self.cache is not None:
+            self.cache.clear()
+        for name in self._artist_names:
+            a = self.__dict__.pop(name, None)
+            if a is not None:
+                a.remove()
+    
+    def fingerprint(self, memo=True):
+        """
+        Hash of the style parameters, memoized until the next reset unless
+        memo=False, used with the frame index as cache key
+        """
+        if memo and self._fingerprint is not None:
+            return self._fingerprint
+        # Unset (None) attributes are left out, they are filled lazily when drawn
+        items = [(k, v) for k, v in sorted(self.__dict__.items()) \
+                 if not k.startswith('_') and v is not None and is_style_value(v)]
+        items += [inst.fingerprint(memo) for inst in getattr(self, 'inst', [])]
+        self._fingerprint = hashlib.sha1(repr(items).encode('utf-8')).hexdigest()
+        return self._fingerprint
+    
+    def framekey(self, iframe, dpi=None):
+        """
+        Cache key of a rendered frame, at the current size and resolution of
+        the figure unless the rendering dpi is given
+        """
+        dpi = self.f.dpi if dpi is None else dpi
+        return (int(iframe), self.fingerprint(), float(dpi), tuple(self.f.get_size_inches()))
+    
+    def enable_cache(self, maxbytes=256*2**20, fmt='rgba'):
+        """
+        Keep rendered frames in an LRU cache with a memory budget in bytes,
+        as raw RGBA (fmt='rgba') or compressed PNG (fmt='png')
+        """
+        self.cache = FrameCache(maxbytes=maxbytes, fmt=fmt)
+        return self.cache
+    
+    def disable_cache(self):
+        self.cache = None
+    
+    def enable_diskcache(self, path=None, maxbytes=2*2**30):
+        """
+        Keep exports and JS embeddings in a persistent on-disk cache (by
+        default in ~/.cache/animo) with a size budget in bytes, shared across
+        processes and keyed on the content of the data and the parameters
+        """
+        self.diskcache = DiskCache(path=path, maxbytes=maxbytes)
+        return self.diskcache
+    
+    def disable_diskcache(self):
+        self.diskcache = None
+    
+    def contentkey(self, *params):
+        """
+        Content key of an output of the animation with the given parameters,
+        None if the data cannot be hashed (callables, generators, streams)
+        """
+        return animation_key(self, *params)
+    
+    def enable_profiling(self, on_frame_start=None, on_frame_end=None):
+        """
+        Time the rendering phases of every frame, with optional callbacks
+        on_frame_start(iframe) and on_frame_end(iframe, timings). The timings
+        are summarized by profiler.table() or saved by profiler.export_trace()
+        """
+        self.profiler = FrameProfiler(on_frame_start=on_frame_start, on_frame_end=on_frame_end)
+        for inst in getattr(self, 'inst', []):
+            inst.profiler = self.profiler
+        return self.profiler
+    
+    def disable_profiling(self):
+        self._end_live_frame()
+        self._unhook_canvas()
+        self.profiler = None
+        for inst in getattr(self, 'inst', []):
+            inst.profiler = None
+    
+    def phase(self, name):
+        """
+        Timer of a rendering phase of the current frame, a no-op without profiler
+        """
+        if self.profiler is None:
+            return NULLPHASE
+        return self.profiler.phase(name)
+    
+    def profiled_animator(self, iframe):
+        """
+        Animator of the live view wrapped in the frame boundaries of the
+        profiler, the frame stays open until the canvas is drawn
+        """
+        prof = self.profiler
+        if prof is None:
+            return self.animator(iframe)
+        # The draw of the previous frame may have been coalesced or skipped
+        self._end_live_frame()
+        prof.start_frame(iframe)
+        try:
+            artists = self.animator(iframe)
+        except Exception:
+            prof.end_frame()
+            raise
+        # Blitting draws each axes of the returned artists, a full draw the figure
+        blit = self._canvashooks is not None and self._canvashooks[-1]
+        nblits = len(unique_axes(artists)) if blit and artists else 0
+        self._live = [prof.serial, nblits, perf_counter()]
+        return artists
+    
+    def _end_live_frame(self):
+        """
+        Close the frame opened by the live view if it is still open, at the
+        end of its last drawing
+        """
+        live, self._live = self._live, None
+        prof = self.profiler
+        if live is not None and prof is not None and prof.serial == live[0]:
+            prof.end_frame(tend=live[2])
+    
+    def _timed_canvas(self, method, blit):
+        """
+        Canvas method timed as the 'draw' phase of the frame opened by the
+        live view, the frame is closed after the draw or the last blit
+        """
+        def wrapped(*args, **kwargs):
+            live, prof = self._live, self.profiler
+            if live is None or prof is None or prof.serial != live[0] or \
+                prof.current is None or blit != (live[1] > 0):
+                # Draws of other frames (view_frame, export) or outside of frames
+                return method(*args, **kwargs)
+            # Blits are timed from the end of the animator or of the last blit,
+            # which includes drawing the artists
+            tstart = live[2] if blit else perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                live[2] = perf_counter()
+                prof.record('draw', tstart, live[2] - tstart)
+                live[1] -= 1
+                if live[1] <= 0:
+                    self._end_live_frame()
+        return wrapped
+    
+    def _hook_canvas(self, blit):
+        """
+        Time the drawing of the live view on the current canvas
+        """
+        self._unhook_canvas()
+        canvas = self.f.canvas
+        self._canvashooks = (canvas, canvas.__dict__.get('draw'), canvas.__dict__.get('blit'), blit)
+        canvas.draw = self._timed_canvas(canvas.draw, False)
+        canvas.blit = self._timed_canvas(canvas.blit, True)
+    
+    def _unhook_canvas(self):
+        """
+        Restore the canvas methods replaced by _hook_canvas
+        """
+        if self._canvashooks is None:
+            return
+        canvas, draw, blit, _ = self._canvashooks
+        for name, method in (('draw', draw), ('blit', blit)):
+            if method is None:
+                canvas.__dict__.pop(name, None)
+            else:
+                setattr(canvas, name, method)
+        self._canvashooks = None
+    
+    def render_frame(self, iframe):
+        """
+        Render a frame into an RGBA array, revisited frames are served from
+        the frame cache when enabled
+        """
+        if self._renderer is None:
+            self._renderer = FrameRenderer(self, blit=False)
+        try:
+            return self._renderer.render(iframe)
+        finally:
+            # The figure is left drawable in full, e.g. with the raster engine
+            self._renderer.close()
+    
+    def view_frame(self, iframe):
+        """
+        Display a single frame of animation, the artists are created once
+        and updated in place afterwards through the animator. With the frame
+        cache enabled, the frame is rendered through the cache and displayed
+        as an image in IPython. Returns the figure and axes
+        """
+        if self.cache is not None:
+            show_frame(self.render_frame(iframe))
+            return self.f, self.ax
+        prof = self.profiler
+        if prof is not None:
+            prof.start_frame(iframe)
+        for a in self.animator(iframe):
+            a.set_animated(False)
+        with self.phase('draw'):
+            self.f.canvas.draw_idle()
+        if prof is not None:
+            prof.end_frame()
+        return self.f, self.ax
+    
+    def changed(self, iframe):
+        """
+        Whether a frame can differ from the last frame drawn, renderers reuse
+        the last rendered image otherwise
+        """
+        return True
+    
+    def paint(self, iframe, canvas):
+        """
+        Render the dynamic content of a frame directly into the canvas buffer
+        over the static background, returns False if the animator draws
+        through its artists instead
+        """
+        return False
+    
+    def init_anim(self):
+        """
+        Initialize the dynamic artists, used as init_func for blitting
+        """
+        return self.animator(0)
         
-    @abstractmethod
-    def view_anim(self, backend):
+    def view_anim(self, backend=None, blit=None, fps=None, **kwargs):
         """
-        Display the entire animation
+        Display the entire animation, with blit=True only the dynamic
+        artists are redrawn over a cached background. With a target fps,
+        playback follows the wall clock and skips frames when rendering lags
+        (see self.scheduler.report()). The JS backend embeds deduplicated
+        frames, its keyword arguments (fmt='png'|'jpeg'|'webp', quality,
+        width, maxbytes, workers) control the payload size. The player
+        backend renders frames on demand in a notebook widget (keyword
+        arguments prefetch, maxbytes, loop, dpi)
         """
-        return
+        if backend == 'JS':
+            return display_frames(self, fps=fps, **kwargs)
+        elif backend == 'player':
+            if getattr(self, 'player', None) is not None:
+                self.player.close()
+            self.player = FramePlayer(self, fps=fps, **kwargs)
+            try:
+                return self.player.widget()
+            except Exception:
+                self.player.close()
+                raise
+        from matplotlib import animation
+        if blit is None:
+            blit = self.blit
+        func = self.animator if self.profiler is None else self.profiled_animator
+        if fps is None:
+            frames, interval = self.nframes, self.interval
+        else:
+            self.scheduler = PlaybackScheduler(range(self.nframes), fps, \
+                                verbose=kwargs.get('verbose', False))
+            frames, interval = self.scheduler, 1000. / fps
+        self.anim = animation.FuncAnimation(self.f, func,\
+               frames=frames, init_func=self.init_anim, \
+               interval=interval, blit=blit, cache_frame_data=fps is None)
+        if self.profiler is not None:
+            # The canvas is drawn after the animator, deferred to the event
+            # loop by interactive backends
+            self._hook_canvas(blit)
+        if backend is None:
+            return self.anim
+    
+    def export(self, path, workers=1, fps=None, dpi=None, frames=None, **kwargs):
+        """
+        Render the animation headlessly and save it as a video (e.g. .mp4),
+        a GIF (.gif) or a PNG sequence (directory or pattern), the frame range
+        is split across a pool of worker processes when workers > 1. With
+        duration or budget (in seconds), frames are subsampled evenly to the
+        output length or to the rendering time. Frames are encoded in a
+        writer thread, returns the throughput summary
+        """
+        return export_animation(self, path, workers=workers, fps=fps, dpi=dpi, \
+                            frames=frames, **kwargs)
+    
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('anim', None)
+        state.pop('_renderer', None)
+        state.pop('cache', None)
+        state.pop('profiler', None)
+        state.pop('_canvashooks', None)
+        state.pop('_live', None)
+        state.pop('scheduler', None)
+        state.pop('player', None)
+        return state
     
 
 class LineAnimate(PlotAnimate):
@@ -79,14 +633,19 @@ class LineAnimate(PlotAnimate):
     Class for 1D line animation
     """
     
+    _artist_names = ('lines',)
+    
     def __init__(self, x, y, nframes, fixed='x', **kwargs):
-        self.x = x
-        self.y = y
+        # Only the moving coordinates are read ahead when prefetch > 0
+        self.prefetch = kwargs.get('prefetch', 0)
+        self.x = frame_stack(x, nframes=nframes, prefetch=0 if fixed == 'x' else self.prefetch)
+        self.y = frame_stack(y, nframes=nframes, prefetch=0 if fixed == 'y' else self.prefetch)
         self.nframes = nframes
         self.fixed = fixed
         self.figsize = kwargs.get('figsize', (6,4))
         self.interval = kwargs.get('interval', 100)
-        self.zorder = kwargs.get('zorder', 0)
+        self.blit = kwargs.get('blit', False)
+        self.linezorder = kwargs.get('zorder', 0)
         self.label = kwargs.get('label', '')
         self.legend = kwargs.get('legend', False)
         self.lgdloc = kwargs.get('legendloc', 'upper right')
@@ -94,101 +653,180 @@ class LineAnimate(PlotAnimate):
         self.linewidth = kwargs.get('linewidth', 2)
         self.linecolor = kwargs.get('linecolor', 'k')
         self.linestyle = kwargs.get('linestyle', '-')
+        # Decimation to the pixel columns of the axes, None, 'minmax' or 'lttb'
+        self.decimate = kwargs.get('decimate', None)
+        self.decimchunk = kwargs.get('decimchunk', 64)
+        self._dchunk = None
+        # Figure and axes are created on first use unless given
+        self.pyplot = kwargs.get('pyplot', None)
+        self._parent = kwargs.get('parent', None)
         if {'fig', 'ax'} <= set(kwargs.keys()):
             self.f, self.ax = kwargs['fig'], kwargs['ax']
-        else:
-            self.f, self.ax = plt.subplots(figsize=self.figsize)
 
-    def set_param(self, prop_statement):
-        exec("self." + prop_statement)
+    def reset(self):
+        self._dchunk = None
+        super(LineAnimate, self).reset()
 
-    def frame(self, iframe):
+    def linedata(self, iframe):
+        """
+        Retrieve the x and y values of the line at a frame
+        """
         if self.fixed == 'x':
-            self.lines, = self.ax.plot(self.x[0,:], self.y[iframe,:], linewidth=self.linewidth, \
-                        color=self.linecolor, linestyle=self.linestyle, label=self.label, \
-                        zorder=self.zorder)
+            return self.x[0], self.y[iframe]
         elif self.fixed == 'y':
-            self.lines, = self.ax.plot(self.x[iframe,:], self.y[0,:], linewidth=self.linewidth, \
-                        color=self.linecolor, linestyle=self.linestyle, label=self.label, \
-                        zorder=self.zorder)
+            return self.x[iframe], self.y[0]
         elif self.fixed is None:
-            self.lines, = self.ax.plot(self.x[iframe,:], self.y[iframe,:], linewidth=self.linewidth, \
-                        color=self.linecolor, linestyle=self.linestyle, label=self.label, \
-                        zorder=self.zorder)
+            return self.x[iframe], self.y[iframe]
+    
+    def plotdata(self, iframe):
+        """
+        Line data at a frame, decimated to the pixel width and x limits of
+        the axes if enabled. With fixed x, frames are decimated in chunks
+        """
+        if self.decimate is None or self.ax.get_xscale() != 'linear':
+            return self.linedata(iframe)
+        view = (self.ax.get_xlim(), int(np.ceil(self.ax.bbox.width)))
+        if self.fixed == 'x':
+            k = iframe // self.decimchunk
+            if self._dchunk is None or self._dchunk[:2] != (view, k):
+                start = k * self.decimchunk
+                ys = np.asarray(self.y[start:start+self.decimchunk])
+                self._dchunk = (view, k) + decimate_lines(self.x[0], ys, view[0], view[1], self.decimate)
+            xd, yd = self._dchunk[2:]
+            j = iframe % self.decimchunk
+            return (xd[j] if xd.ndim > 1 else xd), yd[j]
+        xd, yd = self.linedata(iframe)
+        xd, yd = decimate_lines(xd, yd, view[0], view[1], self.decimate)
+        return (xd[0] if xd.ndim > 1 else xd), yd[0]
+
+    def frame(self, iframe):
+        xd, yd = self.linedata(iframe)
+        self.lines, = self.ax.plot(xd, yd, linewidth=self.linewidth, \
+                    color=self.linecolor, linestyle=self.linestyle, label=self.label, \
+                    zorder=self.linezorder)
+        if self.decimate is not None:
+            # The full line sets the data limits, only the decimated one is drawn
+            self.lines.set_data(*self.plotdata(iframe))
         if self.legend == True:
             self.ax.legend(title=self.lgdttl, loc=self.lgdloc)
         return self.lines
     
-    def view_frame(self, iframe):
-        _ = self.frame(iframe)
-        return
+    def artists(self):
+        return (self.lines,)
         
     def animator(self, iframe):
         if not hasattr(self, 'lines'):
-            self.lines = self.frame(0)
+            self.frame(iframe)
         else:
-            if self.fixed == 'x':
-                self.lines.set_data(self.x, self.y[iframe,:])
-            elif self.fixed == 'y':
-                self.lines.set_data(self.x[iframe,:], self.y)
-            elif self.fixed is None:
-                self.lines.set_data(self.x[iframe,:], self.y[iframe,:])
-        return self.f
-    
-    def view_anim(self, backend=None):
-        anim = animation.FuncAnimation(self.f, self.animator,\
-                frames=self.nframes, interval=self.interval)
-        if backend == 'JS':
-            return display_animation(anim)
-        elif backend is None:
-            return self.anim
+            with self.phase('data'):
+                xd, yd = self.plotdata(iframe)
+            with self.phase('artists'):
+                self.lines.set_data(xd, yd)
+        return self.artists()
             
 
 class MultiLineAnimate(LineAnimate):
     """
-    Create multiline animation
+    Create multiline animation, with collection=True all traces are kept in
+    a single LineCollection and updated together at every frame
     """
     
     def __init__(self, dataset, fixed, nframes, figsize=(6,4), **kwargs):
-        self.f, self.ax = plt.subplots(figsize=figsize)
+        self.figsize = figsize
+        self.pyplot = kwargs.get('pyplot', None)
         self.dataset = dataset
         self.dscount = len(dataset)
         self.nframes = nframes
+        self.fixed = fixed
         self.labels = kwargs.get('labels', ['']*self.dscount)
         self.linewidths = kwargs.get('linewidths', [2]*self.dscount)
         self.linestyles = kwargs.get('linestyles', ['-']*self.dscount)
         self.linecolors = kwargs.get('linecolors', ['k']*self.dscount)
         self.zorders = kwargs.get('zorders', range(self.dscount))
+        self.blit = kwargs.get('blit', False)
+        self.collection = kwargs.get('collection', False)
         self.inst = []
+        if self.collection == True:
+            if 'zorders' in kwargs:
+                raise Exception('The traces in a collection share one zorder, set zorder instead of zorders.')
+            self.legend = kwargs.get('legend', False)
+            self.lgdloc = kwargs.get('legendloc', 'upper right')
+            self.lgdttl = kwargs.get('legendtitle', '')
+            # Traces stacked into arrays of shape (ntraces, nframes, npoints)
+            try:
+                self.xs = np.stack([np.asarray(d[0], dtype='float') for d in dataset])
+                self.ys = np.stack([np.asarray(d[1], dtype='float') for d in dataset])
+            except ValueError:
+                raise Exception('The traces in a collection need to have the same number of points.')
+            self.linezorder = kwargs.get('zorder', 0)
+            self.interval = kwargs.get('interval', 100)
+            return
         for i in range(self.dscount):
             self.inst.append(LineAnimate(*dataset[i], fixed=fixed, nframes=nframes,\
-                fig=self.f, ax=self.ax, linewidth=self.linewidths[i], linecolor=self.linecolors[i], \
+                parent=(self, i), linewidth=self.linewidths[i], linecolor=self.linecolors[i], \
                 linestyle=self.linestyles[i], label=self.labels[i], zorder=self.zorders[i], **kwargs))
+        self.interval = self.inst[0].interval
 
     def set_inst_param(self, n_inst, prop_statement):
         exec("self.inst[n_inst]." + prop_statement)
+        self.inst[n_inst].reset()
+        PlotAnimate.reset(self)
+
+    def panel_axes(self, k):
+        return self.ax
+
+    def legend_handles(self):
+        """
+        Legend entries of the labeled traces of a collection
+        """
+        from matplotlib.lines import Line2D
+        styles = zip(self.labels, self.linecolors, self.linewidths, self.linestyles)
+        return [Line2D([], [], color=c, linewidth=w, linestyle=ls, label=lbl) \
+                for lbl, c, w, ls in styles if lbl != '']
+    
+    def segments(self, iframe):
+        """
+        Vertices of all traces at a frame, shape (ntraces, npoints, 2)
+        """
+        xi = 0 if self.fixed == 'x' else iframe
+        yi = 0 if self.fixed == 'y' else iframe
+        segs = np.empty(self.ys.shape[:1] + self.ys.shape[2:] + (2,))
+        segs[..., 0] = self.xs[:, xi]
+        segs[..., 1] = self.ys[:, yi]
+        return segs
 
     def frame(self, iframe):
+        if self.collection == True:
+            from matplotlib.collections import LineCollection
+            self.lines = LineCollection(self.segments(iframe), linewidths=self.linewidths, \
+                        colors=self.linecolors, linestyles=self.linestyles, zorder=self.linezorder)
+            self.ax.add_collection(self.lines)
+            self.ax.autoscale_view()
+            if self.legend == True:
+                self.ax.legend(handles=self.legend_handles(), title=self.lgdttl, loc=self.lgdloc)
+            return self.lines
         for i in range(self.dscount):
             self.inst[i].frame(iframe)
         return
     
-    def view_frame(self, iframe):
-        _ = self.frame(iframe)
-        return
+    def artists(self):
+        if self.collection == True:
+            return (self.lines,)
+        return sum((inst.artists() for inst in self.inst), ())
     
     def animator(self, iframe):
+        if self.collection == True:
+            if getattr(self, 'lines', None) is None:
+                self.frame(iframe)
+            else:
+                with self.phase('data'):
+                    segs = self.segments(iframe)
+                with self.phase('artists'):
+                    self.lines.set_segments(segs)
+            return self.artists()
         for i in range(self.dscount):
             self.inst[i].animator(iframe)
-        return self.f
-    
-    def view_anim(self, backend=None):
-        anim = animation.FuncAnimation(self.f, self.animator,\
-                frames=self.nframes, interval=self.inst[0].interval)
-        if backend == 'JS':
-            return display_animation(anim)
-        elif backend is None:
-            return self.anim
+        return self.artists()
             
 
 class ImageAnimate(PlotAnimate):
@@ -196,24 +834,62 @@ class ImageAnimate(PlotAnimate):
     Class for 2D image animation
     """
     
+    _artist_names = ('qmesh', 'txt')
+    
     def __init__(self, data, axis=0, **kwargs):
-        if np.ndim(data) != 3:
+        self.prefetch = kwargs.get('prefetch', 0)
+        # Frames along a non-leading axis are copied frame-contiguous once (contiguous=True
+        # in memory, or a .npy path on disk), or read in slabs of consecutive frames
+        self.contiguous = kwargs.get('contiguous', False)
+        self.slab = kwargs.get('slab', 0)
+        if axis != 0 and hasattr(data, 'shape') and not isinstance(data, FrameSource):
+            if self.contiguous is not False:
+                data = contiguous_stack(data, axis, path=None if self.contiguous is True else self.contiguous)
+                axis = 0
+            elif self.slab > 0:
+                data = SlabSource(data, axis, nframes=kwargs.get('nframes', None), slab=self.slab)
+                axis = 0
+        stack = frame_stack(data, axis, nframes=kwargs.get('nframes', None), prefetch=self.prefetch)
+        if len(stack.shape) != 3:
             raise Exception('The input array needs to have dimension 3.')
         else:
             self.axis = axis
-            self.data = np.rollaxis(data, axis)
+            self.data = stack
             self.nl, self.nr, self.nc = self.data.shape
             self.interval = kwargs.get('interval', 100)
+            self.blit = kwargs.get('blit', False)
             self.colorbar = kwargs.get('colorbar', False)
             self.cscale = kwargs.get('cscale', 'linear')
-            self.nframes = kwargs.get('nframes', data.shape[axis])
-            self.xaxis = kwargs.get('imx', range(self.nc))
-            self.yaxis = kwargs.get('imy', range(self.nr))
+            self.nframes = kwargs.get('nframes', self.nl)
+            self.xaxis = np.asarray(kwargs.get('imx', range(self.nc)))
+            self.yaxis = np.asarray(kwargs.get('imy', range(self.nr)))
             self.xlabel = kwargs.get('xlabel', '')
             self.ylabel = kwargs.get('ylabel', '')
             self.axlabelsize = kwargs.get('axlabelsize', 15)
             self.figsize = kwargs.get('figsize', (5,6))
-            self.xgrid, self.ygrid = np.meshgrid(self.xaxis, self.yaxis)
+            # Rendering engine, imshow for uniform grids, pcolormesh otherwise,
+            # raster colormaps quantized frames without matplotlib drawing
+            self.engine = kwargs.get('engine', 'auto')
+            uniform = is_uniform(self.xaxis) and is_uniform(self.yaxis)
+            if self.engine == 'auto':
+                self.engine = 'imshow' if uniform else 'pcolormesh'
+            if self.engine in ('imshow', 'raster'):
+                if not uniform:
+                    raise Exception('The {} engine needs evenly spaced image axes.'.format(self.engine))
+                self.extent = image_extent(self.xaxis, self.yaxis)
+            elif self.engine == 'pcolormesh':
+                self.xgrid, self.ygrid = np.meshgrid(self.xaxis, self.yaxis)
+            else:
+                raise Exception('The rendering engine needs to be imshow, pcolormesh or raster.')
+            self.rasterchunk = kwargs.get('rasterchunk', 32)
+            self._qchunk, self._lut, self._pmap = None, None, None
+            # Resolution pyramid (None, 'mean' or 'max') matching the frames to the axes size
+            self.pyramid = kwargs.get('pyramid', None)
+            self.pyramidmode = kwargs.get('pyramidmode', 'lazy')
+            if self.pyramid is not None and self.engine != 'imshow':
+                raise Exception('The resolution pyramid needs the imshow engine.')
+            self.level = 0
+            self._pyr, self._iframe, self._zoomcids = None, 0, None
             self.cmap = kwargs.get('cmap', 'terrain_r')
             self.text = kwargs.get('text', ['']*self.nl)
             self.textpos = kwargs.get('textpos', (0.9, 0.9))
@@ -221,132 +897,735 @@ class ImageAnimate(PlotAnimate):
             self.textcolor = kwargs.get('textcolor', 'k')
             self.vmin = kwargs.get('vmin', None)
             self.vmax = kwargs.get('vmax', None)
-            self.zorder = kwargs.get('zorder', 0)
+            # Color limits, None (from the first frame drawn), 'global' or 'frame'
+            self.climits = kwargs.get('climits', None)
+            if self.engine == 'raster' and self.climits is None:
+                # Quantization needs limits fixed before the first frame is drawn
+                self.climits = 'global'
+            self.percentile = kwargs.get('percentile', None)
+            self.limits = kwargs.get('limits', None)
+            self.norm = None
+            self.cbar = None
+            self.imzorder = kwargs.get('zorder', 0)
+            # Compact storage of the stack as quantized codes (None, 'uint8' or 'uint16')
+            self.compact = kwargs.get('compact', None)
+            self.scale, self.offset, self.maxerror = 1., 0., 0.
+            self._cnorm = None
+            # Stack limits need a pass over all frames, which generators only allow once
+            if single_pass(self.data) and not self.fixedlimits() and \
+                (self.climits is not None or self.compact is not None):
+                raise Exception('Frames from a generator are read once, their color limits need climits=None or fixed vmin and vmax.')
+            if self.compact is not None:
+                self.compress(self.compact)
+            # Figure and axes are created on first use unless given
+            self.pyplot = kwargs.get('pyplot', None)
+            self._parent = kwargs.get('parent', None)
             if {'fig', 'ax'} <= set(kwargs.keys()):
                 self.f, self.ax = kwargs['fig'], kwargs['ax']
+                self.setup_axes()
+    
+    def setup_axes(self):
+        self.ax.set_xlabel(self.xlabel, fontsize=self.axlabelsize)
+        self.ax.set_ylabel(self.ylabel, fontsize=self.axlabelsize)
+
+    def compress(self, dtype='uint8'):
+        """
+        Replace the stack by its linear quantization to uint8 or uint16 codes
+        over the range of values the color limits can reach. Data values are
+        kept to within maxerror = (vmax - vmin)/(2*(2**bits - 2))
+        """
+        if self.vmin is not None and self.vmax is not None:
+            vmin, vmax = self.vmin, self.vmax
+        elif self.climits == 'global':
+            vmin, vmax = self.stacklimits().get()
+        elif self.climits == 'frame':
+            limits = self.stacklimits()
+            vmin, vmax = np.fmin.reduce(limits.fmin), np.fmax.reduce(limits.fmax)
+            if np.isnan(vmin):
+                vmin, vmax = limits.get()
+        else:
+            # Limits taken from the first frame drawn, which can be any frame
+            if self.percentile is None:
+                vmin, vmax = self.stacklimits().get()
             else:
-                self.f, self.ax = plt.subplots(figsize=self.figsize)
-            self.ax.set_xlabel(self.xlabel, fontsize=self.axlabelsize)
-            self.ax.set_ylabel(self.ylabel, fontsize=self.axlabelsize)
-            
-    def set_param(self, prop_statement):
-        exec("self." + prop_statement)
+                vmin, vmax = StackLimits(self.data).get()
+        vmin = vmin if self.vmin is None else self.vmin
+        vmax = vmax if self.vmax is None else self.vmax
+        self.data, self.scale, self.offset = cpt.quantize_stack(self.data, vmin, vmax, dtype)
+        self.maxerror = self.scale / 2.
+        self.compact = dtype
+        self._cnorm = None
+    
+    def codenorm(self, norm):
+        """
+        Normalization of the quantized codes of compact stacks, tied to the
+        color normalization in data units
+        """
+        if self.compact is None:
+            return norm
+        if self._cnorm is None or self._cnorm.datanorm is not norm:
+            self._cnorm = cpt.CompactNorm(norm, self.scale, self.offset, cpt.nan_code(self.compact))
+        return self._cnorm
+
+    def reset(self):
+        self.norm = None
+        self._qchunk, self._lut, self._pmap = None, None, None
+        self._pyr = None
+        super(ImageAnimate, self).reset()
+    
+    def stacklimits(self):
+        """
+        Color limits of the image stack, computed once and cached
+        """
+        if self.limits is None:
+            self.limits = StackLimits(self.data, percentile=self.percentile)
+        return self.limits
+    
+    def fixedlimits(self):
+        """
+        Check if both color limits are fixed, so that the stack limits are not needed
+        """
+        return self.vmin is not None and self.vmax is not None
+    
+    def framelimits(self, iframe):
+        if self.fixedlimits():
+            return self.vmin, self.vmax
+        elif self.climits == 'global':
+            vmin, vmax = self.stacklimits().get()
+        elif self.climits == 'frame':
+            vmin, vmax = self.stacklimits().get(iframe)
+        else:
+            vmin, vmax = None, None
+        vmin = vmin if self.vmin is None else self.vmin
+        vmax = vmax if self.vmax is None else self.vmax
+        return vmin, vmax
+    
+    def colornorm(self, imgframe, iframe):
+        """
+        Color normalization created once and reused for all frames
+        """
+        if self.norm is None:
+            vmin, vmax = self.framelimits(iframe)
+            self.norm = parse_norm(imgframe, self.cscale, vmin, vmax)
+        elif self.climits == 'frame':
+            self.norm.vmin, self.norm.vmax = self.framelimits(iframe)
+        return self.norm
+    
+    def quantized(self, iframe):
+        """
+        Frame quantized to uint8 color codes, the stack is normalized and
+        quantized chunk by chunk
+        """
+        k = iframe // self.rasterchunk
+        if self._qchunk is None or self._qchunk[0] != k:
+            start = k * self.rasterchunk
+            with self.phase('data'):
+                chunk = np.asarray(self.data[start:start+self.rasterchunk])
+            with self.phase('norm'):
+                if self.climits == 'frame':
+                    codes = np.empty(chunk.shape, dtype='uint8')
+                    for j in range(len(chunk)):
+                        codes[j] = raster.quantize(chunk[j], self.codenorm(self.colornorm(chunk[j], start + j)))
+                else:
+                    codes = raster.quantize(chunk, self.codenorm(self.colornorm(chunk[0], start)))
+            self._qchunk = (k, codes)
+        return self._qchunk[1][iframe % self.rasterchunk]
+    
+    def display_level(self):
+        """
+        Coarsest pyramid level that still has at least one data pixel per
+        display pixel over the visible part of the image
+        """
+        left, right, bottom, top = self.extent
+        if hasattr(self, 'qmesh'):
+            (x0, x1), (y0, y1) = self.ax.get_xlim(), self.ax.get_ylim()
+        else:
+            (x0, x1), (y0, y1) = (left, right), (bottom, top)
+        cols = self.nc * min(abs(x1 - x0) / abs(right - left), 1.)
+        rows = self.nr * min(abs(y1 - y0) / abs(top - bottom), 1.)
+        bbox = self.ax.bbox
+        ratio = min(cols / max(bbox.width, 1.), rows / max(bbox.height, 1.))
+        if ratio < 2:
+            return 0
+        return min(int(np.log2(ratio)), self._pyr.nlevels - 1)
+    
+    def leveldata(self, iframe):
+        """
+        Frame at the pyramid level matching the current view of the axes
+        """
+        if self._pyr is None:
+            self._pyr = FramePyramid(self.data, method=self.pyramid, \
+                                    eager=self.pyramidmode == 'eager')
+        self._iframe = iframe
+        self.level = self.display_level()
+        return self._pyr.get(iframe, self.level)
+    
+    def refine(self, ax):
+        """
+        Switch to the pyramid level of a new view after zooming or panning
+        """
+        if hasattr(self, 'qmesh') and self.display_level() != self.level:
+            self.qmesh.set_data(self.leveldata(self._iframe))
+    
+    def colorized(self, iframe):
+        """
+        RGBA frame colored through the lookup table of the colormap
+        """
+        if self._lut is None:
+            self._lut = raster.colormap_lut(self.cmap)
+        codes = self.quantized(iframe)
+        with self.phase('norm'):
+            return raster.colorize(codes, self._lut)
+    
+    def paint(self, iframe, canvas):
+        if self.engine != 'raster':
+            return False
+        if not hasattr(self, 'qmesh'):
+            self.frame(iframe)
+        if self._lut is None:
+            self._lut = raster.colormap_lut(self.cmap)
+        buf = np.asarray(canvas.buffer_rgba())
+        key = (tuple(self.ax.bbox.bounds), self.ax.get_xlim(), self.ax.get_ylim(), buf.shape)
+        if self._pmap is None or self._pmap[0] != key:
+            self._pmap = (key, raster.pixel_map(self.ax, self.xaxis, self.yaxis, buf.shape))
+        pmap = self._pmap[1]
+        if pmap is not None:
+            rs, cs, ri, ci = pmap
+            codes = self.quantized(iframe)
+            with self.phase('draw'):
+                raster.composite(buf[rs, cs], codes[np.ix_(ri, ci)], self._lut)
+        self.update_text(iframe)
+        with self.phase('draw'):
+            for a in list(self.ax.spines.values()) + list(self.artists()):
+                if a is not self.qmesh:
+                    a.axes.draw_artist(a)
+        return True
     
     def frame(self, iframe):
-        imgframe = self.data[iframe,:,:]
-        self.qmesh = self.ax.pcolormesh(self.xgrid, self.ygrid, imgframe, \
-              cmap=self.cmap, vmin=self.vmin, vmax=self.vmax, zorder=self.zorder)
-        self.qmesh.set_norm(parse_norm(imgframe, self.cscale))
-        self.txt = self.ax.text(self.textpos[0], self.textpos[1], self.text[iframe], \
+        imgframe = self.data[iframe]
+        if self.compact is None:
+            norm = self.colornorm(imgframe, iframe)
+        else:
+            # Unset limits are taken from the data values of the frame
+            values = cpt.decode(imgframe, self.scale, self.offset)
+            norm = self.colornorm(values, iframe)
+            norm.autoscale_None(np.ma.masked_invalid(values))
+        if self.engine == 'raster':
+            self.qmesh = self.ax.imshow(self.colorized(iframe), zorder=self.imzorder, \
+                  origin='lower', aspect='auto', extent=self.extent, interpolation='nearest')
+        elif self.engine == 'imshow':
+            if self.pyramid is not None:
+                imgframe = self.leveldata(iframe)
+            self.qmesh = self.ax.imshow(imgframe, cmap=self.cmap, norm=self.codenorm(norm), \
+                  zorder=self.imzorder, origin='lower', aspect='auto', \
+                  extent=self.extent, interpolation='nearest')
+            if self.pyramid is not None and self._zoomcids is None:
+                self._zoomcids = [self.ax.callbacks.connect(lim, self.refine) \
+                                  for lim in ('xlim_changed', 'ylim_changed')]
+        else:
+            self.qmesh = self.ax.pcolormesh(self.xgrid, self.ygrid, imgframe, shading='nearest', \
+                  cmap=self.cmap, norm=self.codenorm(norm), zorder=self.imzorder)
+        self.txt = self.ax.text(self.textpos[0], self.textpos[1], '', \
                      fontsize=self.textsize, color=self.textcolor, \
                      zorder=1, transform=self.ax.transAxes)
+        self.update_text(iframe)
         if self.colorbar == True:
-            self.f.colorbar(self.qmesh)
+            mappable = self.qmesh
+            if self.engine == 'raster' or self.compact is not None:
+                mappable = mpl.cm.ScalarMappable(norm=norm, cmap=self.cmap)
+            if self.cbar is None:
+                self.cbar = self.f.colorbar(mappable, ax=self.ax)
+            else:
+                self.cbar.update_normal(mappable)
         return self.f, self.qmesh
         
-    def view_frame(self, iframe):
-        _ = self.frame(iframe)
-        return
+    def artists(self):
+        return (self.qmesh, self.txt)
         
+    def update_text(self, iframe):
+        with self.phase('artists'):
+            self.txt.set_text(self.text[iframe])
+    
+    def update_image(self, iframe):
+        """
+        Update the image artist to a frame
+        """
+        if self.engine == 'raster':
+            rgba = self.colorized(iframe)
+            with self.phase('artists'):
+                self.qmesh.set_data(rgba)
+        else:
+            with self.phase('data'):
+                if self.pyramid is not None:
+                    imgcurr = self.leveldata(iframe)
+                else:
+                    imgcurr = self.data[iframe]
+            if self.climits == 'frame':
+                with self.phase('norm'):
+                    self.colornorm(imgcurr, iframe)
+            with self.phase('artists'):
+                if self.engine == 'imshow':
+                    self.qmesh.set_data(imgcurr)
+                else:
+                    self.qmesh.set_array(imgcurr.ravel())
+    
     def animator(self, iframe):
         if not hasattr(self, 'qmesh'):
-            self.qmesh = self.frame(0)[1]
+            self.frame(iframe)
         else:
-            imgcurr = self.data[iframe,:,:]
-            self.qmesh.set_array(imgcurr[:-1,:-1].flatten())
-            self.txt.set_text(self.text[iframe])
-        return self.f
-    
-    def view_anim(self, backend=None):
-        self.anim = animation.FuncAnimation(self.f, self.animator,\
-               frames=self.nframes, interval=self.interval)
-        if backend == 'JS':
-            return display_animation(self.anim)
-        elif backend is None:
-            return self.anim
+            self.update_image(iframe)
+            self.update_text(iframe)
+        return self.artists()
 
 
 class MultiImageAnimate(ImageAnimate):
     """
-    Create connected multi-image animation
+    Create connected multi-image animation, with atlas=True the panels are
+    tiled into a single image on one axes
     """
     
     def __init__(self, dataset, axis=0, nrow=1, ncol=2, figsize=(12, 4), **kwargs):
-        self.f, axs = plt.subplots(nrow, ncol, figsize=figsize)
-        if np.ndim(axs) > 1:
-            self.axs = axs.flatten()
-        else:
-            self.axs = axs
+        self.figsize = figsize
+        self.nrow, self.ncol = nrow, ncol
+        self.pyplot = kwargs.get('pyplot', None)
         self.dataset = dataset
         self.dscount = len(dataset)
+        self.blit = kwargs.get('blit', False)
+        self.sharenorm = kwargs.get('sharenorm', False)
+        self.atlas = kwargs.get('atlas', False)
         self.inst = []
-        for i in range(self.dscount):
-            self.inst.append(ImageAnimate(dataset[i], axis=axis, \
-                            fig=self.f, ax=self.axs[i], **kwargs))
+        # Static artists drawn over the panels
+        self.overlays = []
+        if self.atlas == True:
+            self.atlas_layout(axis, ncol, **kwargs)
+        else:
+            for i in range(self.dscount):
+                self.inst.append(ImageAnimate(dataset[i], axis=axis, \
+                                parent=(self, i), **kwargs))
+        if self.sharenorm == True:
+            self.share_norm()
+        self.engine = self.inst[0].engine
+        self.nframes = self.inst[0].nframes
+        self.interval = self.inst[0].interval
+
+    def atlas_layout(self, axis, ncol, **kwargs):
+        """
+        Tile the panels into one mosaic image read through an AtlasSource
+        """
+        prefetch = kwargs.pop('prefetch', 0)
+        self.atlasgap = kwargs.pop('atlasgap', 0)
+        self.labels = kwargs.pop('labels', None)
+        self.gridcolor = kwargs.get('gridcolor', 'w')
+        self.gridwidth = kwargs.get('gridwidth', 1)
+        self.labelsize = kwargs.get('labelsize', 10)
+        self.labelcolor = kwargs.get('labelcolor', 'k')
+        for key in ('imx', 'imy', 'fig', 'ax'):
+            kwargs.pop(key, None)
+        panels = [frame_stack(d, axis, nframes=kwargs.get('nframes', None), prefetch=prefetch) \
+                  for d in self.dataset]
+        self.source = AtlasSource(panels, ncol, gap=self.atlasgap, nframes=kwargs.get('nframes', None))
+        self.inst.append(ImageAnimate(self.source, parent=(self, 0), **kwargs))
+    
+    def make_figure(self):
+        if self.atlas == True:
+            self.f, self.ax = new_figure(self.figsize, pyplot=self.pyplot)
+            self.axs = [self.ax]
+            self.setup_atlas()
+        else:
+            self.f, axs = new_figure(self.figsize, self.nrow, self.ncol, pyplot=self.pyplot)
+            self.axs = np.ravel(axs)
+            self.ax = self.axs[0]
+    
+    def panel_axes(self, k):
+        return self.axs[k]
+    
+    def setup_atlas(self):
+        """
+        Gridlines between the panels of the atlas and the panel labels
+        """
+        from matplotlib.collections import LineCollection
+        gap, source = self.atlasgap, self.source
+        pr, pc = source.panelshape
+        height, width = source.frameshape
+        xs = [c0 - 0.5 - gap/2. for c0 in range(pc + gap, width, pc + gap)]
+        ys = [r0 - 0.5 - gap/2. for r0 in range(pr + gap, height, pr + gap)]
+        segs = [[(x, -0.5), (x, height - 0.5)] for x in xs] + \
+               [[(-0.5, y), (width - 0.5, y)] for y in ys]
+        self.grid = LineCollection(segs, colors=self.gridcolor, linewidths=self.gridwidth, zorder=1)
+        self.ax.add_collection(self.grid, autolim=False)
+        self.overlays.append(self.grid)
+        if self.labels is not None:
+            for (r0, c0), lbl in zip(source.origins, self.labels):
+                self.overlays.append(self.ax.text(c0, r0 + pr - 1, lbl, ha='left', va='top', \
+                    fontsize=self.labelsize, color=self.labelcolor, zorder=1))
+        self.ax.set_xticks([])
+        self.ax.set_yticks([])
 
     def set_inst_param(self, n_inst, prop_statement):
         exec("self.inst[n_inst]." + prop_statement)
+        self.inst[n_inst].reset()
+        PlotAnimate.reset(self)
+        if self.sharenorm == True:
+            self.share_norm()
+    
+    def share_norm(self):
+        """
+        Use the same color limits and normalization for all panels
+        """
+        first = self.inst[0]
+        if first.climits is not None and not first.fixedlimits():
+            limits = StackLimits.merge([inst.stacklimits() for inst in self.inst])
+            for inst in self.inst:
+                inst.limits = limits
+        imgframe = first.data[0]
+        if first.compact is not None:
+            imgframe = cpt.decode(imgframe, first.scale, first.offset)
+        norm = first.colornorm(imgframe, 0)
+        for inst in self.inst:
+            inst.norm = norm
     
     def frame(self, iframe):
-        for i in range(self.dscount):
-            self.inst[i].frame(iframe)
+        for inst in self.inst:
+            inst.frame(iframe)
         
-    def view_frame(self, iframe):
-        _ = self.frame(iframe)
-        return
+    def artists(self):
+        return sum((inst.artists() for inst in self.inst), tuple(self.overlays))
+    
+    def paint(self, iframe, canvas):
+        if not all([inst.paint(iframe, canvas) for inst in self.inst]):
+            return False
+        for a in self.overlays:
+            a.axes.draw_artist(a)
+        return True
     
     def animator(self, iframe):
-        for i in range(self.dscount):
-            self.inst[i].animator(iframe)
-        return self.f
+        for inst in self.inst:
+            inst.animator(iframe)
+        return self.artists()
+
+
+
+class OrthoSliceAnimate(MultiImageAnimate):
+    """
+    Orthogonal xy, xz and yz slices of one volume of shape (nz, ny, nx) side
+    by side. The planes read from the same volume, with one normalization
+    from the color limits of the whole volume. All planes sweep through the
+    volume together, or only the plane across the sweep axis ('x', 'y' or
+    'z') moves while the others stay at the cursor (z, y, x)
+    """
     
-    def view_anim(self, backend):
-        self.anim = animation.FuncAnimation(self.f, self.animator,\
-               frames=self.inst[0].nframes, interval=self.inst[0].interval)
-        if backend == 'JS':
-            return display_animation(self.anim)
-        elif backend is None:
-            return self.anim
+    # Plane, sweep axis and axis labels of the slices along each volume axis
+    planes = (('xy', 'z', ('x', 'y')), ('xz', 'y', ('x', 'z')), ('yz', 'x', ('y', 'z')))
+    
+    def __init__(self, volume, sweep=None, cursor=None, figsize=(12, 4), **kwargs):
+        if len(volume.shape) != 3:
+            raise Exception('The volume needs to have dimension 3.')
+        if kwargs.get('climits', 'global') == 'frame':
+            raise Exception('The slices of a volume need global or fixed color limits.')
+        if sweep not in (None, 'z', 'y', 'x'):
+            raise Exception("The sweep axis needs to be None, 'z', 'y' or 'x'.")
+        self.volume = volume
+        self.figsize = figsize
+        self.nrow, self.ncol = 1, 3
+        self.pyplot = kwargs.get('pyplot', None)
+        self.blit = kwargs.get('blit', False)
+        self.atlas = False
+        self.sharenorm = True
+        self.overlays = []
+        self.dims = tuple(volume.shape)
+        self.sweep = sweep
+        self.cursor = tuple(n // 2 for n in self.dims) if cursor is None else tuple(cursor)
+        if sweep is None:
+            nframes = max(self.dims)
+        else:
+            nframes = self.dims['zyx'.index(sweep)]
+        self.nframes = kwargs.get('nframes', nframes)
+        # Sequential slices across the strided axes are read in slabs unless copied
+        kwargs['slab'] = kwargs.get('slab', 16)
+        kwargs['climits'] = kwargs.get('climits', 'global')
+        self.labels = kwargs.pop('labels', ('z = {}', 'y = {}', 'x = {}'))
+        self.inst = []
+        for k, (plane, ax, (xlabel, ylabel)) in enumerate(self.planes):
+            opts = dict(kwargs, xlabel=kwargs.get('xlabel', xlabel), ylabel=kwargs.get('ylabel', ylabel))
+            opts.pop('nframes', None)
+            if isinstance(opts.get('contiguous'), str):
+                # The y and x planes are copied into files of their own
+                root, ext = os.path.splitext(opts['contiguous'])
+                opts['contiguous'] = '{}.axis{}{}'.format(root, k, ext or '.npy')
+            self.inst.append(ImageAnimate(volume, axis=k, parent=(self, k), **opts))
+            self.inst[k].text = FrameLabels(self.labels[k])
+        self.share_norm()
+        self.engine = self.inst[0].engine
+        self.interval = self.inst[0].interval
+        self._shown = None
+    
+    def share_norm(self):
+        """
+        One normalization for all planes, from the limits of the whole volume
+        """
+        first = self.inst[0]
+        limits = first.stacklimits()
+        norm = first.colornorm(first.data[0], 0)
+        for inst in self.inst:
+            inst.limits, inst.norm = limits, norm
+    
+    def positions(self, iframe):
+        """
+        Slice index of each plane (along z, y and x) at a frame
+        """
+        if self.sweep is None:
+            return tuple(min(int(iframe * n / float(self.nframes)), n - 1) for n in self.dims)
+        k = 'zyx'.index(self.sweep)
+        pos = list(self.cursor)
+        pos[k] = min(int(iframe), self.dims[k] - 1)
+        return tuple(pos)
+    
+    def reset(self):
+        self._shown = None
+        super(OrthoSliceAnimate, self).reset()
+    
+    def changed(self, iframe):
+        return self._shown != self.positions(iframe)
+    
+    def frame(self, iframe):
+        self._shown = self.positions(iframe)
+        for inst, pos in zip(self.inst, self._shown):
+            inst.frame(pos)
+    
+    def paint(self, iframe, canvas):
+        pos = self.positions(iframe)
+        if not all([inst.paint(p, canvas) for inst, p in zip(self.inst, pos)]):
+            return False
+        self._shown = pos
+        return True
+    
+    def animator(self, iframe):
+        pos = self.positions(iframe)
+        if self._shown is None or not hasattr(self.inst[0], 'qmesh'):
+            self.frame(iframe)
+            return self.artists()
+        # Only the planes whose slice moves are updated
+        for inst, p, q in zip(self.inst, pos, self._shown):
+            if p != q:
+                inst.animator(p)
+        self._shown = pos
+        return self.artists()
 
             
 class CompositePlotAnimate(LineAnimate, ImageAnimate):
     """
-    Class for composite image and line animation
+    Class for composite image and line animation. The image, line and text
+    tracks run on a timeline of fps ticks per second, each with its own
+    frame count, rate or time stamps (tracks={'line':{'fps':25}, ...}), and
+    only the tracks whose content changes at a tick are updated
     """
     
+    _artist_names = ('qmesh', 'lines', 'txt')
+    
     def __init__(self, x, y, data, fixed='x', axis=0, **kwargs):
         
-        # Construct figure and axes objects
-        self.figsize = kwargs.get('figsize', (5,6))
-        if {'fig', 'ax'} <= set(kwargs.keys()):
-            self.f, self.ax = kwargs['fig'], kwargs['ax']
-        else:
-            self.f, self.ax = plt.subplots(figsize=self.figsize)
-        
-        # Initiate animation with existing figure and axes handles
-        ImageAnimate.__init__(self, data, axis=axis, fig=self.f, \
-                ax=self.ax, figsize=self.figsize, zorder=0, **kwargs)
-        LineAnimate.__init__(self, x, y, self.nframes, fixed=fixed, \
-                fig=self.f, ax=self.ax, figsize=self.figsize, zorder=1, **kwargs)
+        # Both parts share the figure and axes, created on first use unless given,
+        # the line is drawn above the image by default
+        kwargs['figsize'] = kwargs.get('figsize', (5,6))
+        ImageAnimate.__init__(self, data, axis=axis, \
+                            **dict(kwargs, zorder=kwargs.get('imzorder', 0)))
+        self.tracks = kwargs.get('tracks', {})
+        imageframes = self.tracks.get('image', {}).get('nframes', self.nframes)
+        lineframes = self.tracks.get('line', {}).get('nframes', self.nframes)
+        LineAnimate.__init__(self, x, y, lineframes, fixed=fixed, \
+                            **dict(kwargs, zorder=kwargs.get('linezorder', 1)))
+        # Skip frames identical to the one on display, compared by content hashes
+        self.dedup = kwargs.get('dedup', True)
+        self.fps = kwargs.get('fps', 1000. / self.interval)
+        nframes = {'image':imageframes, 'line':lineframes, 'text':len(self.text)}
+        self.timeline = Timeline([(name, Track(**dict(self.tracks.get(name, {}), \
+                                nframes=nframes[name]))) for name in ('image', 'line', 'text')], \
+                                self.fps, duration=kwargs.get('duration', None))
+        self.nframes = self.timeline.nticks
+        self.interval = 1000. / self.fps
+    
+    def reset(self):
+        self.timeline.reset()
+        super(CompositePlotAnimate, self).reset()
+    
+    def trackkey(self, name, index):
+        """
+        Content key of a track frame, the text itself for the text track
+        """
+        if name == 'text':
+            return self.text[index]
+        elif not self.dedup:
+            return index
+        elif name == 'image':
+            return content_key(self.data[index])
+        return content_key(self.linedata(index))
     
     def frame(self, iframe):
-        self.lines = LineAnimate.frame(self, iframe)
-        self.qmesh = ImageAnimate.frame(self, iframe)[1]
+        shown = self.timeline.indices(iframe)
+        self.lines = LineAnimate.frame(self, shown['line'])
+        self.qmesh = ImageAnimate.frame(self, shown['image'])[1]
+        self.txt.set_text(self.text[shown['text']])
+        self.timeline.reset()
+        self.timeline.commit(shown, self.trackkey)
         return self.lines, self.qmesh
     
-    def view_frame(self, iframe):
-        _ = self.frame(iframe)
+    def update_text(self, iframe):
+        # The text is a track of its own, updated with the other tracks
         return
     
+    def update_tracks(self, iframe):
+        """
+        Update the line and text tracks whose content changes at a tick,
+        returns the changed tracks
+        """
+        with self.phase('data'):
+            dirty = self.timeline.changes(iframe, self.trackkey)
+        if 'line' in dirty:
+            LineAnimate.animator(self, dirty['line'])
+        if 'text' in dirty:
+            with self.phase('artists'):
+                self.txt.set_text(self.text[dirty['text']])
+        self.timeline.commit(dirty, self.trackkey)
+        return dirty
+    
+    def changed(self, iframe):
+        if not hasattr(self, 'qmesh'):
+            return True
+        return len(self.timeline.changes(iframe, self.trackkey)) > 0
+    
+    def artists(self):
+        return (self.qmesh, self.lines, self.txt)
+    
+    def paint(self, iframe, canvas):
+        if self.engine != 'raster':
+            return False
+        if not hasattr(self, 'qmesh'):
+            self.frame(iframe)
+        self.update_tracks(iframe)
+        return ImageAnimate.paint(self, self.timeline.shown['image'][0], canvas)
+    
     def animator(self, iframe):
-        LineAnimate.animator(self, iframe)
-        ImageAnimate.animator(self, iframe)
-        return self.f
+        if not hasattr(self, 'qmesh'):
+            self.frame(iframe)
+            return self.artists()
+        dirty = self.update_tracks(iframe)
+        if 'image' in dirty:
+            self.update_image(dirty['image'])
+        return self.artists()
+
+
+# ===== Live stream animators ===== #
+
+class StreamAnimate(PlotAnimate):
+    """
+    Base class of live animations, frames pushed by a producer are kept in a
+    fixed-capacity ring buffer and the view refreshes at a target rate with
+    the newest frame. Pushes between refreshes are coalesced into one redraw
+    """
+    
+    # Sequence number of the frame on display, number of frames never displayed
+    shown = -1
+    skipped = 0
     
-    def view_anim(self, backend=None):
-        self.anim = animation.FuncAnimation(self.f, self.animator,\
-               frames=self.nframes, interval=self.interval)
+    def push(self, frame):
+        """
+        Append a frame to the stream, safe to call from a producer thread or an
+        asyncio task. The oldest frame is overwritten when the buffer is full
+        """
+        return self.stream.push(frame)
+    
+    def refreshes(self):
+        """
+        Frame to draw at each refresh of the live view, the newest pushed
+        frame or None if nothing new has arrived since the last refresh
+        """
+        while True:
+            seq = self.stream.count - 1
+            yield seq if seq > self.shown else None
+    
+    def init_anim(self):
+        if self.stream.count == 0:
+            return ()
+        return self.animator(self.stream.count - 1)
+    
+    def animator(self, iframe):
+        if iframe is None:
+            return self.artists() if self.shown >= 0 else ()
+        if iframe > self.shown:
+            self.skipped += iframe - self.shown - 1
+        self.shown = iframe
+        return super(StreamAnimate, self).animator(iframe)
+    
+    def view_anim(self, backend=None, blit=None, **kwargs):
+        """
+        Display the live stream, refreshing every interval (1000/fps ms)
+        """
         if backend == 'JS':
-            return display_animation(self.anim)
-        elif backend is None:
-            return self.anim
\ No newline at end of file
+            raise Exception('Live streams cannot be embedded with the JS backend.')
+        from matplotlib import animation
+        if blit is None:
+            blit = self.blit
+        self.anim = animation.FuncAnimation(self.f, self.animator, frames=self.refreshes, \
+               init_func=self.init_anim, interval=self.interval, blit=blit, \
+               cache_frame_data=False)
+        if backend is None:
+            return self.anim
+    
+    def stop(self):
+        """
+        Stop refreshing the live view
+        """
+        if getattr(self, 'anim', None) is not None and self.anim.event_source is not None:
+            self.anim.event_source.stop()
+    
+    def export(self, path, frames=None, **kwargs):
+        """
+        Save the frames currently held in the ring buffer
+        """
+        if frames is None:
+            frames = self.stream.window()
+        return PlotAnimate.export(self, path, frames=frames, **kwargs)
+
+
+class StreamImageAnimate(StreamAnimate, ImageAnimate):
+    """
+    Live image animation of frames pushed into a ring buffer
+    """
+    
+    def __init__(self, frameshape, capacity=64, fps=10, dtype='float64', **kwargs):
+        self.stream = RingSource(frameshape, capacity=capacity, dtype=dtype)
+        if kwargs.get('climits', None) == 'global' or kwargs.get('engine', None) == 'raster':
+            raise Exception('Live streams need per-frame or fixed color limits.')
+        if kwargs.get('compact', None) is not None:
+            raise Exception('Live streams cannot be stored compactly.')
+        kwargs['interval'] = 1000. / fps
+        ImageAnimate.__init__(self, self.stream, **kwargs)
+        self.nframes = capacity
+        # Frame annotation as a format string of the sequence number
+        self.text = FrameLabels(kwargs.get('text', ''))
+    
+    def colornorm(self, imgframe, iframe):
+        """
+        Color normalization, with climits='frame' the limits follow each frame
+        """
+        if self.climits != 'frame':
+            return ImageAnimate.colornorm(self, imgframe, iframe)
+        vmin = np.nanmin(imgframe) if self.vmin is None else self.vmin
+        vmax = np.nanmax(imgframe) if self.vmax is None else self.vmax
+        if self.norm is None:
+            self.norm = parse_norm(imgframe, self.cscale, vmin, vmax)
+        else:
+            self.norm.vmin, self.norm.vmax = vmin, vmax
+        return self.norm
+
+
+class StreamLineAnimate(StreamAnimate, LineAnimate):
+    """
+    Live line animation of y values pushed into a ring buffer, on fixed x values
+    """
+    
+    def __init__(self, x, capacity=64, fps=10, dtype='float64', **kwargs):
+        x = np.atleast_2d(np.asarray(x))
+        self.stream = RingSource(x.shape[1:], capacity=capacity, dtype=dtype)
+        kwargs['interval'] = 1000. / fps
+        LineAnimate.__init__(self, x, self.stream, capacity, fixed='x', **kwargs)
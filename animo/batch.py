@@ -0,0 +1,406 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@author: R. Patrick Xian
+"""
+
+from __future__ import print_function, division
+from multiprocessing.connection import wait
+from collections import deque
+import multiprocessing as mp
+import numpy as np
+import traceback
+import warnings
+import tempfile
+import shutil
+import mmap
+import time
+import os
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+
+# ===== Shared array references ===== #
+
+class SharedArray(object):
+    """
+    Reference to an array held in shared memory (kind='shm') or in a memory
+    mapped file (kind='memmap'), it pickles to its name and workers attach
+    to the data without copying it
+    """
+
+    def __init__(self, name, shape, dtype, kind='shm', offset=0, order='C'):
+        self.name = name
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.kind = kind
+        self.offset = offset
+        self.order = order
+        self._shm = None
+
+    @property
+    def nbytes(self):
+        return int(np.prod(self.shape)) * self.dtype.itemsize
+
+    @classmethod
+    def from_memmap(cls, mm):
+        """
+        Reference to a memory mapped array, e.g. from np.load(path, mmap_mode='r')
+        """
+        order = 'F' if mm.flags.f_contiguous and not mm.flags.c_contiguous else 'C'
+        return cls(mm.filename, mm.shape, mm.dtype, kind='memmap', offset=mm.offset, order=order)
+
+    @classmethod
+    def from_npy(cls, path):
+        """
+        Reference to the array stored in a .npy file
+        """
+        return cls.from_memmap(np.load(path, mmap_mode='r'))
+
+    def attach(self):
+        """
+        Read-only array view of the shared data
+        """
+        if self.kind == 'memmap':
+            return np.memmap(self.name, dtype=self.dtype, mode='r', offset=self.offset, \
+                            shape=self.shape, order=self.order)
+        if self._shm is None:
+            self._shm = shared_memory.SharedMemory(name=self.name)
+        arr = np.ndarray(self.shape, dtype=self.dtype, buffer=self._shm.buf, order=self.order)
+        arr.flags.writeable = False
+        return arr
+
+    def detach(self):
+        if self._shm is not None:
+            try:
+                self._shm.close()
+            except BufferError:
+                # Views of the data are still alive, the mapping is released with them
+                pass
+            self._shm = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_shm'] = None
+        return state
+
+    def __repr__(self):
+        return 'SharedArray({!r}, shape={}, dtype={}, kind={!r})'.format(\
+                self.name, self.shape, self.dtype, self.kind)
+
+
+def is_mapped(arr):
+    """
+    Whether an array is a whole memory mapped file rather than a view of one
+    """
+    return isinstance(arr, np.memmap) and isinstance(arr.base, mmap.mmap) \
+        and (arr.flags.c_contiguous or arr.flags.f_contiguous)
+
+
+class SharedStore(object):
+    """
+    Owner of the shared copies of arrays, in shared memory or in .npy files
+    of a temporary directory, which are released on close
+    """
+
+    def __init__(self, dirname=None):
+        self.dirname = dirname
+        self._tmpdir = None
+        self._segments = []
+        self._refs = {}
+
+    def put(self, arr, memmap=False):
+        """
+        Share an array, returns its SharedArray reference. Memory mapped files
+        are referenced in place, other arrays are copied once into shared
+        memory, or into a .npy file with memmap=True
+        """
+        key = (id(arr), memmap)
+        if key in self._refs:
+            return self._refs[key][1]
+        if is_mapped(arr):
+            ref = SharedArray.from_memmap(arr)
+        else:
+            arr = np.asarray(arr)
+            if memmap or shared_memory is None:
+                ref = self._put_file(arr)
+            else:
+                shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+                np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+                self._segments.append(shm)
+                ref = SharedArray(shm.name, arr.shape, arr.dtype)
+        # The array is kept so that its id is not reused while shared
+        self._refs[key] = (arr, ref)
+        return ref
+
+    def _put_file(self, arr):
+        if self.dirname is None:
+            self._tmpdir = self._tmpdir or tempfile.mkdtemp(prefix='animo_')
+            dirname = self._tmpdir
+        else:
+            dirname = self.dirname
+        path = os.path.join(dirname, 'array_{}.npy'.format(len(self._refs)))
+        out = np.lib.format.open_memmap(path, mode='w+', dtype=arr.dtype, shape=arr.shape)
+        out[...] = arr
+        out.flush()
+        del out
+        return SharedArray.from_npy(path)
+
+    def share(self, obj, minbytes=0):
+        """
+        Replace the arrays of at least minbytes nested in lists, tuples and
+        dicts by their shared references
+        """
+        if isinstance(obj, np.ndarray) and obj.nbytes >= minbytes:
+            return self.put(obj)
+        elif isinstance(obj, (list, tuple)):
+            return type(obj)(self.share(o, minbytes) for o in obj)
+        elif isinstance(obj, dict):
+            return dict((k, self.share(v, minbytes)) for k, v in obj.items())
+        return obj
+
+    def close(self):
+        for shm in self._segments:
+            shm.close()
+            shm.unlink()
+        self._segments, self._refs = [], {}
+        if self._tmpdir is not None:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+            self._tmpdir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+def attach(obj, refs):
+    """
+    Replace the shared references nested in lists, tuples and dicts by the
+    attached arrays, the references are collected in refs
+    """
+    if isinstance(obj, SharedArray):
+        refs.append(obj)
+        return obj.attach()
+    elif isinstance(obj, (list, tuple)):
+        return type(obj)(attach(o, refs) for o in obj)
+    elif isinstance(obj, dict):
+        return dict((k, attach(v, refs)) for k, v in obj.items())
+    return obj
+
+
+# ===== Animation specs ===== #
+
+class AnimSpec(object):
+    """
+    Declarative animation job, the animator cls(*args, **kwargs) exported
+    to path with the export keyword arguments. Arrays are given directly or
+    as SharedArray references, cls is a class or the name of an animo class.
+    Each job is exported in a single process, export workers are clamped to 1
+    since the batch already runs one job per worker process (whose children
+    could not be killed along with it on timeout)
+    """
+
+    def __init__(self, cls, args=(), kwargs=None, path=None, export=None, timeout=None, name=None):
+        if path is None:
+            raise Exception('The animation spec needs an output path.')
+        self.cls = cls
+        self.args = tuple(args)
+        self.kwargs = {} if kwargs is None else dict(kwargs)
+        self.path = path
+        self.export = {} if export is None else dict(export)
+        if (self.export.get('workers') or 1) > 1:
+            warnings.warn('Batch jobs are exported in one process each, workers={} is reduced to 1.'.format(\
+                            self.export['workers']))
+            self.export['workers'] = 1
+        self.timeout = timeout
+        self.name = path if name is None else name
+
+    def build(self):
+        """
+        Construct the animator of the spec
+        """
+        cls = self.cls
+        if isinstance(cls, str):
+            from . import animo
+            cls = getattr(animo, cls)
+        return cls(*self.args, **self.kwargs)
+
+
+def run_spec(spec):
+    """
+    Build and export the animator of a spec, returns the export summary
+    """
+    refs = []
+    job = AnimSpec(spec.cls, attach(spec.args, refs), attach(spec.kwargs, refs), \
+                   spec.path, spec.export, spec.timeout, spec.name)
+    try:
+        anim = job.build()
+        stats = anim.export(job.path, **job.export)
+        anim.reset()
+        del anim, job
+        return stats
+    finally:
+        for ref in refs:
+            ref.detach()
+
+
+# ===== Batch rendering ===== #
+
+def _batch_worker(conn):
+    """
+    Worker loop running the jobs sent through its connection until None
+    """
+    import matplotlib as mpl
+    mpl.use('Agg', force=True)
+    while True:
+        try:
+            msg = conn.recv()
+        except EOFError:
+            return
+        if msg is None:
+            return
+        jobid, spec = msg
+        tstart = time.time()
+        try:
+            stats = run_spec(spec)
+            conn.send((jobid, 'done', time.time() - tstart, stats, None))
+        except Exception:
+            conn.send((jobid, 'failed', time.time() - tstart, None, traceback.format_exc()))
+
+
+class _Worker(object):
+
+    def __init__(self, ctx):
+        self.conn, child = ctx.Pipe()
+        self.proc = ctx.Process(target=_batch_worker, args=(child,))
+        self.proc.daemon = True
+        self.proc.start()
+        child.close()
+        self.job = None
+
+    def submit(self, jobid, spec, timeout):
+        self.conn.send((jobid, spec))
+        self.job = (jobid, time.time(), None if timeout is None else time.time() + timeout)
+
+    def kill(self):
+        self.proc.terminate()
+        self.proc.join()
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, EOFError):
+            pass
+        self.proc.join(5)
+        if self.proc.is_alive():
+            self.proc.terminate()
+        self.conn.close()
+
+
+def format_result(result, ndone, njobs):
+    line = '[{}/{}] {}: {} in {:.2f} s'.format(ndone, njobs, result['name'], \
+                                               result['status'], result['seconds'])
+    if result['stats'] is not None:
+        line += ' ({} frames)'.format(result['stats']['frames'])
+    elif result['error'] is not None:
+        line += '\n' + result['error'].rstrip()
+    return line
+
+
+def render_batch(specs, workers=None, timeout=None, sharebytes=2**20, on_result=None, \
+                verbose=False, context=None):
+    """
+    Export many animations over a pool of worker processes. Arrays of at
+    least sharebytes in the specs are moved into shared memory once, so
+    that the workers attach to them instead of unpickling copies. Jobs
+    running longer than their timeout (in seconds) are killed along with
+    their worker, which is replaced. on_result(result, ndone, njobs) is
+    called as jobs finish. Returns the summary of the batch with the
+    result of each job (name, path, status, seconds, stats, error)
+    """
+    specs = [s if isinstance(s, AnimSpec) else AnimSpec(**s) for s in specs]
+    njobs = len(specs)
+    workers = max(1, min(workers or os.cpu_count() or 1, njobs))
+    ctx = mp.get_context(context)
+    results = [None]*njobs
+    tstart = time.time()
+    with SharedStore() as store:
+        if sharebytes is not None:
+            specs = [AnimSpec(s.cls, store.share(s.args, sharebytes), store.share(s.kwargs, sharebytes), \
+                     s.path, s.export, s.timeout, s.name) for s in specs]
+        pending = deque(range(njobs))
+        pool = [_Worker(ctx) for _ in range(workers)]
+        ndone = 0
+        try:
+            while ndone < njobs:
+                for w in pool:
+                    if w.job is None and pending:
+                        jobid = pending.popleft()
+                        spec = specs[jobid]
+                        w.submit(jobid, spec, spec.timeout if spec.timeout is not None else timeout)
+                busy = [w for w in pool if w.job is not None]
+                deadlines = [w.job[2] for w in busy if w.job[2] is not None]
+                wait_for = None if not deadlines else max(min(deadlines) - time.time(), 0)
+                ready = wait([w.conn for w in busy], wait_for)
+                for w in busy:
+                    jobid, started, deadline = w.job
+                    if w.conn in ready:
+                        try:
+                            _, status, seconds, stats, error = w.conn.recv()
+                            lost = False
+                        except EOFError:
+                            w.proc.join(1)
+                            status, seconds, stats = 'failed', time.time() - started, None
+                            error = 'The worker exited with code {}.'.format(w.proc.exitcode)
+                            lost = True
+                    elif deadline is not None and time.time() >= deadline:
+                        status, seconds, stats = 'timeout', time.time() - started, None
+                        error = 'Killed after {:.1f} s.'.format(seconds)
+                        lost = True
+                    else:
+                        continue
+                    if lost:
+                        # Replace the worker that crashed or ran out of time
+                        w.kill()
+                        pool[pool.index(w)] = _Worker(ctx)
+                    w.job = None
+                    spec = specs[jobid]
+                    results[jobid] = {'job':jobid, 'name':spec.name, 'path':spec.path, \
+                        'status':status, 'seconds':seconds, 'stats':stats, 'error':error}
+                    ndone += 1
+                    if verbose:
+                        print(format_result(results[jobid], ndone, njobs))
+                    if on_result is not None:
+                        on_result(results[jobid], ndone, njobs)
+        finally:
+            for w in pool:
+                w.stop()
+    summary = batch_summary(results, time.time() - tstart)
+    if verbose:
+        print(format_summary(summary))
+    return summary
+
+
+def batch_summary(results, seconds):
+    """
+    Job counts by status and the throughput of a batch
+    """
+    done = [r for r in results if r is not None and r['status'] == 'done']
+    frames = sum(r['stats']['frames'] for r in done)
+    counts = dict((s, sum(1 for r in results if r is not None and r['status'] == s)) \
+                  for s in ('done', 'failed', 'timeout'))
+    return dict(counts, jobs=len(results), seconds=seconds, frames=frames, \
+                jobs_per_s=len(results) / seconds if seconds > 0 else float('inf'), \
+                fps=frames / seconds if seconds > 0 else float('inf'), results=results)
+
+
+def format_summary(summary):
+    return '{jobs} jobs ({done} done, {failed} failed, {timeout} timed out) in {seconds:.2f} s, ' \
+           '{jobs_per_s:.2f} jobs/s, {fps:.1f} frames/s'.format(**summary)
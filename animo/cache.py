@@ -0,0 +1,384 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@author: R. Patrick Xian
+"""
+
+from __future__ import print_function, division
+from collections import OrderedDict
+from .sources import FrameSource, ArraySource, PrefetchSource, AtlasSource
+import matplotlib as mpl
+import matplotlib.artist
+import matplotlib.colors
+import numpy as np
+import threading
+import hashlib
+import shutil
+import json
+import os
+import io
+
+
+# ===== Image encoding ===== #
+
+def encode_png(img, compress_level=1):
+    """
+    Encode an RGBA array into PNG bytes
+    """
+    from PIL import Image
+    buf = io.BytesIO()
+    Image.fromarray(img).save(buf, format='PNG', compress_level=compress_level)
+    return buf.getvalue()
+
+
+def decode_png(data):
+    """
+    Decode PNG bytes into an RGBA array
+    """
+    from PIL import Image
+    return np.asarray(Image.open(io.BytesIO(data)).convert('RGBA'))
+
+
+# ===== Rendered frame caches ===== #
+
+class FrameCache(object):
+    """
+    In-memory LRU cache of rendered frames with a memory budget in bytes,
+    frames are stored as raw RGBA arrays (fmt='rgba') or PNG bytes (fmt='png')
+    """
+
+    def __init__(self, maxbytes=256*2**20, fmt='rgba'):
+        if fmt not in ('rgba', 'png'):
+            raise Exception('The cache format needs to be rgba or png.')
+        self.maxbytes = maxbytes
+        self.fmt = fmt
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        """
+        Retrieve a frame as an RGBA array, returns None if it is not cached
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        if self.fmt == 'png':
+            return decode_png(entry)
+        return entry
+
+    def get_png(self, key):
+        """
+        Retrieve a frame as PNG bytes, encoded once when stored with fmt='png'
+        """
+        if self.fmt == 'png':
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+            return entry
+        img = self.get(key)
+        return None if img is None else encode_png(img)
+
+    def put(self, key, img):
+        """
+        Store a rendered RGBA frame, evicting the least recently used frames
+        """
+        if self.fmt == 'png':
+            entry = encode_png(img)
+            size = len(entry)
+        else:
+            entry = np.array(img)
+            entry.setflags(write=False)
+            size = entry.nbytes
+        if size > self.maxbytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= self._size(old)
+            self._entries[key] = entry
+            self.nbytes += size
+            while self.nbytes > self.maxbytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= self._size(evicted)
+
+    def _size(self, entry):
+        return len(entry) if self.fmt == 'png' else entry.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def __getstate__(self):
+        return {'maxbytes':self.maxbytes, 'fmt':self.fmt}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+
+# ===== Content hashing ===== #
+
+# Bytes of data hashed at once, chunks follow the leading axis
+HASH_CHUNKBYTES = 64*2**20
+
+
+def _hash_array(arr, h, chunkbytes=HASH_CHUNKBYTES):
+    h.update(repr((arr.shape, str(arr.dtype))).encode('utf-8'))
+    if arr.ndim == 0 or arr.size == 0:
+        h.update(np.ascontiguousarray(arr).tobytes())
+        return
+    step = max(1, int(chunkbytes // max(arr[:1].nbytes, 1)))
+    for k in range(0, len(arr), step):
+        h.update(np.ascontiguousarray(arr[k:k+step]))
+
+
+def digest_data(value, h, memo=None, chunkbytes=HASH_CHUNKBYTES):
+    """
+    Feed the content of arrays, frame sources and containers thereof into
+    the hash h, chunk by chunk so that memory-mapped data is streamed.
+    Arrays already hashed (by memory address) are referenced instead,
+    numbers and strings are hashed by their repr, colormaps by their colors
+    and norms by their parameters. Objects may provide their content with a
+    content_state() method. Returns False if the content cannot be hashed
+    without computing it, e.g. for callables, generators and live streams,
+    or if it is of any other type
+    """
+    memo = {} if memo is None else memo
+    if isinstance(value, np.ndarray) and value.dtype == object:
+        # Object arrays hold references, their elements are hashed instead
+        h.update(repr(('objects', value.shape)).encode('utf-8'))
+        return digest_data(list(value.ravel()), h, memo, chunkbytes)
+    elif isinstance(value, np.ndarray):
+        ident = (value.__array_interface__['data'][0], value.shape, value.strides, value.dtype.str)
+        if ident in memo:
+            h.update(repr(('ref', memo[ident])).encode('utf-8'))
+        else:
+            memo[ident] = len(memo)
+            _hash_array(value, h, chunkbytes)
+        return True
+    elif isinstance(value, PrefetchSource):
+        return digest_data(value.source, h, memo, chunkbytes)
+    elif isinstance(value, AtlasSource):
+        h.update(repr(('atlas', value.ncol, value.gap, value.nframes)).encode('utf-8'))
+        return digest_data(list(value.panels), h, memo, chunkbytes)
+    elif isinstance(value, ArraySource) and isinstance(value.data, np.ndarray):
+        h.update(repr(('source', value.axis, value.nframes)).encode('utf-8'))
+        return digest_data(value.data, h, memo, chunkbytes)
+    elif isinstance(value, ArraySource):
+        h.update(repr(('source', value.shape)).encode('utf-8'))
+        for k in range(0, value.nframes, 16):
+            _hash_array(np.asarray(value.readrange(k, min(k + 16, value.nframes))), h, chunkbytes)
+        return True
+    elif isinstance(value, FrameSource):
+        return False
+    elif isinstance(value, (list, tuple)):
+        return all(digest_data(v, h, memo, chunkbytes) for v in value)
+    elif isinstance(value, dict):
+        return all(digest_data(value[k], h, memo, chunkbytes) for k in sorted(value, key=repr))
+    elif isinstance(value, (str, bytes, bool, int, float, complex, np.generic, type(None))):
+        h.update(repr(value).encode('utf-8'))
+    elif isinstance(value, range):
+        h.update(repr(('range', value.start, value.stop, value.step)).encode('utf-8'))
+    elif isinstance(value, mpl.colors.Colormap):
+        # Colormaps of the same name can differ in their colors
+        h.update(repr(('cmap', value.name, value.N)).encode('utf-8'))
+        _hash_array(np.asarray(value(np.linspace(0, 1, value.N))), h, chunkbytes)
+        _hash_array(np.array([value.get_bad(), value.get_under(), value.get_over()]), h, chunkbytes)
+    elif isinstance(value, mpl.colors.Normalize):
+        params = sorted((k.lstrip('_'), v) for k, v in vars(value).items() \
+                        if isinstance(v, (str, bool, int, float, np.generic, type(None))))
+        h.update(repr(('norm', type(value).__name__, params)).encode('utf-8'))
+    elif hasattr(value, 'content_state'):
+        h.update(type(value).__name__.encode('utf-8'))
+        return digest_data(value.content_state(), h, memo, chunkbytes)
+    else:
+        return False
+    return True
+
+
+def is_artists(value):
+    """
+    Whether a value is a matplotlib artist or a container of artists
+    """
+    if isinstance(value, mpl.artist.Artist):
+        return True
+    elif isinstance(value, (list, tuple)) or (isinstance(value, np.ndarray) and value.dtype == object):
+        return len(value) > 0 and all(is_artists(v) for v in value)
+    return False
+
+
+def animation_key(anim, *params):
+    """
+    Content key of an animator output, from the data of the animator (and of
+    its panels), its style parameters, the matplotlib version and the output
+    parameters. Artists and the transient attributes of the animator
+    (display objects and state derived from the data) are left out.
+    Returns None if the data or any other attribute cannot be hashed
+    """
+    h = hashlib.sha1()
+    size = tuple(anim.f.get_size_inches()) + (anim.f.dpi,)
+    # Attributes may have been set directly since the fingerprint was memoized
+    fingerprint = anim.fingerprint(memo=False)
+    h.update(repr((type(anim).__name__, fingerprint, size, mpl.__version__, params)).encode('utf-8'))
+    memo = {}
+    for obj in [anim] + list(getattr(anim, 'inst', [])):
+        skip = ('inst',) + tuple(getattr(obj, '_transient_names', ()))
+        for name, value in sorted(obj.__dict__.items()):
+            if name.startswith('_') or name in skip or is_artists(value):
+                continue
+            h.update(name.encode('utf-8'))
+            if not digest_data(value, h, memo):
+                return None
+    return h.hexdigest()
+
+
+# ===== Persistent output cache ===== #
+
+def default_cachedir():
+    base = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(base, 'animo')
+
+
+class DiskCache(object):
+    """
+    Content-addressed on-disk cache of rendered outputs (videos, GIFs,
+    encoded frames) with a size budget in bytes. Each entry is a data file
+    and a JSON metadata file written atomically, so that the cache can be
+    shared by concurrent processes. The least recently used entries are
+    evicted first
+    """
+
+    def __init__(self, path=None, maxbytes=2*2**30):
+        self.path = default_cachedir() if path is None else path
+        self.maxbytes = maxbytes
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+
+    def _paths(self, key):
+        base = os.path.join(self.path, key)
+        return base + '.bin', base + '.json'
+
+    def _write(self, dest, data=None, src=None):
+        tmp = '{}.{}.{}.tmp'.format(dest, os.getpid(), threading.current_thread().ident)
+        if src is not None:
+            shutil.copyfile(src, tmp)
+        else:
+            with open(tmp, 'wb') as f:
+                f.write(data)
+        os.replace(tmp, dest)
+
+    def meta(self, key):
+        """
+        Metadata of a cached entry, None if the entry does not exist
+        """
+        metapath = self._paths(key)[1]
+        try:
+            with open(metapath) as f:
+                meta = json.load(f)
+            # The access time of the metadata orders the eviction
+            os.utime(metapath, None)
+        except (IOError, OSError, ValueError):
+            return None
+        return meta
+
+    def __contains__(self, key):
+        return os.path.exists(self._paths(key)[1])
+
+    def get(self, key):
+        """
+        Retrieve the bytes of an entry, returns None if it is not cached
+        """
+        if self.meta(key) is None:
+            return None
+        try:
+            with open(self._paths(key)[0], 'rb') as f:
+                return f.read()
+        except (IOError, OSError):
+            return None
+
+    def put(self, key, data, meta=None):
+        """
+        Store bytes under a key
+        """
+        datapath, metapath = self._paths(key)
+        self._write(datapath, data=data)
+        self._write(metapath, data=json.dumps(meta or {}).encode('utf-8'))
+        self.evict()
+
+    def fetch(self, key, dest):
+        """
+        Copy a cached file to dest, returns its metadata or None if not cached
+        """
+        meta = self.meta(key)
+        if meta is None:
+            return None
+        try:
+            shutil.copyfile(self._paths(key)[0], dest)
+        except (IOError, OSError):
+            return None
+        return meta
+
+    def store(self, key, src, meta=None):
+        """
+        Store a copy of the file src under a key
+        """
+        datapath, metapath = self._paths(key)
+        self._write(datapath, src=src)
+        self._write(metapath, data=json.dumps(meta or {}).encode('utf-8'))
+        self.evict()
+
+    def entries(self):
+        """
+        Cached entries as (last access time, key, bytes), oldest first
+        """
+        entries = []
+        for fname in os.listdir(self.path):
+            if not fname.endswith('.json'):
+                continue
+            key = fname[:-5]
+            try:
+                size = sum(os.path.getsize(p) for p in self._paths(key))
+                atime = os.path.getmtime(self._paths(key)[1])
+            except OSError:
+                # Removed by another process in the meantime
+                continue
+            entries.append((atime, key, size))
+        return sorted(entries)
+
+    @property
+    def nbytes(self):
+        return sum(e[2] for e in self.entries())
+
+    def evict(self, maxbytes=None):
+        """
+        Remove the least recently used entries beyond the size budget
+        """
+        maxbytes = self.maxbytes if maxbytes is None else maxbytes
+        entries = self.entries()
+        total = sum(e[2] for e in entries)
+        for _, key, size in entries:
+            if total <= maxbytes:
+                break
+            for p in reversed(self._paths(key)):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+            total -= size
+
+    def clear(self):
+        self.evict(0)
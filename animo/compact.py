@@ -0,0 +1,79 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@author: R. Patrick Xian
+"""
+
+from __future__ import print_function, division
+import numpy as np
+import matplotlib.colors as colors
+
+
+# ===== Quantized frame storage ===== #
+
+# Storage types of compact stacks, the largest code of each is reserved for NaN
+DTYPES = ('uint8', 'uint16')
+
+
+def nan_code(dtype):
+    return np.iinfo(np.dtype(dtype)).max
+
+
+def quantize_stack(stack, vmin, vmax, dtype='uint8', chunksize=16):
+    """
+    Quantize a frame stack linearly between vmin and vmax to integer codes,
+    chunk by chunk. Returns the codes with the scale and offset of the data
+    values, value = offset + scale*code. Values within the limits are kept
+    to within scale/2, values outside are clamped to the limits
+    """
+    if str(np.dtype(dtype)) not in DTYPES:
+        raise Exception('The compact storage type needs to be uint8 or uint16.')
+    nancode = nan_code(dtype)
+    vmin, vmax = float(vmin), float(vmax)
+    scale = (vmax - vmin) / (nancode - 1) if vmax > vmin else 1.
+    codes = np.empty(stack.shape, dtype=dtype)
+    for k in range(0, len(stack), chunksize):
+        chunk = np.array(stack[k:k+chunksize], dtype='float64')
+        bad = ~np.isfinite(chunk)
+        chunk -= vmin
+        chunk /= scale
+        np.clip(chunk, 0, nancode - 1, out=chunk)
+        chunk += 0.5
+        chunk[bad] = nancode
+        codes[k:k+len(chunk)] = chunk
+    return codes, scale, vmin
+
+
+def decode(codes, scale, offset):
+    """
+    Data values of quantized codes, the reserved code is decoded to NaN
+    """
+    codes = np.asarray(codes)
+    values = offset + scale*codes.astype('float64')
+    if codes.dtype.kind in 'ui':
+        values[codes == nan_code(codes.dtype)] = np.nan
+    return values
+
+
+class CompactNorm(colors.Normalize):
+    """
+    Color normalization of quantized codes through the normalization of the
+    data values they stand for, so that the images are colored from the codes
+    while limits, scales and colorbars stay in data units
+    """
+
+    def __init__(self, norm, scale, offset, nancode):
+        self.datanorm = norm
+        self.scale, self.offset, self.nancode = scale, offset, nancode
+        super(CompactNorm, self).__init__(vmin=0, vmax=nancode - 1)
+
+    def __call__(self, value, clip=None):
+        codes = np.ma.asarray(value)
+        data = np.ma.getdata(codes)
+        # Codes resampled by matplotlib can fall between the integers
+        mask = np.ma.getmaskarray(codes) | (data > self.nancode - 0.5)
+        values = np.ma.masked_array(self.offset + self.scale*data.astype('float32'), mask)
+        return self.datanorm(values, clip)
+
+    def inverse(self, value):
+        return (np.asarray(self.datanorm.inverse(value)) - self.offset) / self.scale
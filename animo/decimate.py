@@ -0,0 +1,84 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@author: R. Patrick Xian
+"""
+
+from __future__ import print_function, division
+import numpy as np
+
+
+# ===== Line decimation to the pixel resolution ===== #
+
+def window(x, xlim):
+    """
+    Index range of the samples within the x limits, extended by one sample
+    on each side so that the line reaches the edges of the axes
+    """
+    i0 = max(np.searchsorted(x, xlim[0], side='left') - 1, 0)
+    i1 = min(np.searchsorted(x, xlim[1], side='right') + 1, x.size)
+    return i0, i1
+
+
+def minmax(x, Y, xlim, npix):
+    """
+    Keep the first, minimum, maximum and last sample of each pixel column,
+    which draws identically to the full line. Y has shape (nlines, nsamples)
+    and the decimated x values are shared by all lines
+    """
+    i0, i1 = window(x, xlim)
+    x, Y = x[i0:i1], Y[:, i0:i1]
+    if x.size <= 4 * npix:
+        return x, Y
+    edges = np.linspace(xlim[0], xlim[1], npix + 1)[1:-1]
+    starts = np.unique(np.concatenate([[0], np.searchsorted(x, edges, side='left')]))
+    starts = starts[starts < x.size]
+    ends = np.append(starts[1:], x.size) - 1
+    lo = np.fmin.reduceat(Y, starts, axis=1)
+    hi = np.fmax.reduceat(Y, starts, axis=1)
+    xd = np.stack([x[starts], x[starts], x[ends], x[ends]], axis=-1).ravel()
+    Yd = np.stack([Y[:, starts], lo, hi, Y[:, ends]], axis=-1).reshape(len(Y), -1)
+    return xd, Yd
+
+
+def lttb(x, Y, xlim, npix):
+    """
+    Largest-Triangle-Three-Buckets downsampling to two samples per pixel
+    column, vectorized over the lines in Y of shape (nlines, nsamples)
+    """
+    i0, i1 = window(x, xlim)
+    x, Y = x[i0:i1], Y[:, i0:i1]
+    n, nout = x.size, 2 * npix
+    if n <= nout:
+        return x, Y
+    nl, rows = len(Y), np.arange(len(Y))
+    bounds = np.linspace(1, n - 1, nout - 1).astype('int')
+    idx = np.zeros((nl, nout), dtype='int')
+    idx[:, -1] = n - 1
+    a = np.zeros(nl, dtype='int')
+    for b in range(nout - 2):
+        s, e = bounds[b], bounds[b+1]
+        ns, ne = (bounds[b+1], bounds[b+2]) if b + 2 < len(bounds) else (n - 1, n)
+        avgx, avgy = x[ns:ne].mean(), Y[:, ns:ne].mean(axis=1)
+        xa, ya = x[a], Y[rows, a]
+        area = np.abs((xa - avgx)[:, None] * (Y[:, s:e] - ya[:, None]) - \
+                    (xa[:, None] - x[None, s:e]) * (avgy - ya)[:, None])
+        a = s + np.argmax(area, axis=1)
+        idx[:, b+1] = a
+    return x[idx], np.take_along_axis(Y, idx, axis=1)
+
+
+METHODS = {'minmax':minmax, 'lttb':lttb}
+
+
+def decimate_lines(x, Y, xlim, npix, method='minmax'):
+    """
+    Decimate lines sharing increasing x values to the pixel width of the axes,
+    returns the x values (shared or per line) and the decimated lines
+    """
+    x, Y = np.asarray(x), np.atleast_2d(np.asarray(Y))
+    if method not in METHODS:
+        raise Exception('The decimation method needs to be minmax or lttb.')
+    if npix < 1 or x.size < 2 or np.any(np.diff(x) < 0):
+        return x, Y
+    return METHODS[method](x, Y, sorted(xlim), npix)
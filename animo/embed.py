@@ -0,0 +1,140 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@author: R. Patrick Xian
+"""
+
+from __future__ import print_function, division
+from base64 import b64encode, b64decode
+from .export import iter_frames
+import numpy as np
+import hashlib
+import json
+import io
+
+
+# ===== Compact frame embedding for the JS player ===== #
+
+FILL_FRAMES = """
+    var payloads = [{payloads}];
+    var index = [{index}];
+    for (var i=0; i<index.length; i++){{
+      frames[i] = payloads[index[i]];
+    }}
+"""
+
+FORMATS = {'png':'PNG', 'jpeg':'JPEG', 'jpg':'JPEG', 'webp':'WEBP'}
+
+
+def encode_frame(img, fmt='png', quality=75, width=None):
+    """
+    Encode an RGBA frame as PNG, JPEG or WebP bytes, optionally downscaled
+    to a target pixel width
+    """
+    from PIL import Image
+    fmt = fmt.lower()
+    if fmt not in FORMATS:
+        raise Exception('The frame format needs to be png, jpeg or webp.')
+    im = Image.fromarray(np.asarray(img))
+    if width is not None and width < im.width:
+        height = max(1, int(round(im.height * width / float(im.width))))
+        im = im.resize((int(width), height), Image.BOX)
+    buf = io.BytesIO()
+    if FORMATS[fmt] == 'PNG':
+        im.save(buf, format='PNG')
+    elif FORMATS[fmt] == 'JPEG':
+        im.convert('RGB').save(buf, format='JPEG', quality=quality)
+    else:
+        im.save(buf, format='WEBP', quality=quality)
+    return buf.getvalue()
+
+
+def embed_frames(frames, fmt='png', quality=75, width=None, dedup=True):
+    """
+    Encode frames into base64 data URIs, identical frames are hashed and
+    stored once. Returns the unique payloads and the payload index of each frame
+    """
+    mime = 'data:image/{};base64,'.format('jpeg' if FORMATS[fmt.lower()] == 'JPEG' else fmt.lower())
+    payloads, index, seen = [], [], {}
+    for img in frames:
+        key = hashlib.sha1(np.ascontiguousarray(img)).digest() if dedup else None
+        k = seen.get(key)
+        if k is None:
+            k = len(payloads)
+            payloads.append(mime + b64encode(encode_frame(img, fmt, quality, width)).decode('ascii'))
+            if dedup:
+                seen[key] = k
+        index.append(k)
+    return payloads, index
+
+
+def pack_payloads(payloads, index):
+    """
+    Compact binary form of embedded payloads for the disk cache, a JSON
+    header line followed by the raw encoded images
+    """
+    mimes, blobs = [], []
+    for p in payloads:
+        mime, data = p.split(',', 1)
+        mimes.append(mime + ',')
+        blobs.append(b64decode(data))
+    header = {'index':index, 'mimes':mimes, 'sizes':[len(b) for b in blobs]}
+    return json.dumps(header).encode('utf-8') + b'\n' + b''.join(blobs)
+
+
+def unpack_payloads(data):
+    """
+    Payloads and payload index from their packed binary form
+    """
+    head, body = data.split(b'\n', 1)
+    header = json.loads(head.decode('utf-8'))
+    payloads, pos = [], 0
+    for mime, size in zip(header['mimes'], header['sizes']):
+        payloads.append(mime + b64encode(body[pos:pos+size]).decode('ascii'))
+        pos += size
+    return payloads, header['index']
+
+
+def anim_to_html(anim, fps=None, fmt='png', quality=75, width=None, dedup=True, \
+                default_mode='loop', frames=None, workers=1, maxbytes=None, verbose=True):
+    """
+    HTML of the JS animation player with compactly embedded frames, the
+    payload size is reported (and checked against maxbytes) before embedding
+    """
+    from JSAnimation.html_writer import JS_INCLUDE, DISPLAY_TEMPLATE, HTMLWriter, _Icons
+    if fps is None:
+        fps = 1000. / anim.interval
+    payloads, key, diskcache = None, None, anim.diskcache
+    if diskcache is not None:
+        # The encoded frames are cached, the player is rebuilt around them
+        key = anim.contentkey('embed', fmt, quality, width, dedup, None if frames is None else list(frames))
+        data = None if key is None else diskcache.get(key)
+        if data is not None:
+            payloads, index = unpack_payloads(data)
+    if payloads is None:
+        payloads, index = embed_frames(iter_frames(anim, frames=frames, workers=workers), \
+                                fmt=fmt, quality=quality, width=width, dedup=dedup)
+        if key is not None:
+            diskcache.put(key, pack_payloads(payloads, index), \
+                        meta={'frames':len(index), 'unique':len(payloads)})
+    size = sum(len(p) for p in payloads)
+    if verbose:
+        print('Embedding {} frames ({} unique) as {}, payload {:.2f} MB'.format(\
+                len(index), len(payloads), fmt, size / 2.**20))
+    if maxbytes is not None and size > maxbytes:
+        raise Exception('The embedded payload ({:.2f} MB) exceeds maxbytes.'.format(size / 2.**20))
+
+    fill_frames = FILL_FRAMES.format(payloads=',\n'.join('"{}"'.format(p) for p in payloads), \
+                                    index=','.join(str(k) for k in index))
+    mode_dict = dict(once_checked='', loop_checked='', reflect_checked='')
+    mode_dict[default_mode + '_checked'] = 'checked'
+    return JS_INCLUDE + DISPLAY_TEMPLATE.format(id=HTMLWriter.new_id(), Nframes=len(index), \
+                fill_frames=fill_frames, interval=int(1000. / fps), icons=_Icons(), **mode_dict)
+
+
+def display_frames(anim, **kwargs):
+    """
+    Display the animation in IPython with the JS player
+    """
+    from IPython.display import HTML
+    return HTML(anim_to_html(anim, **kwargs))
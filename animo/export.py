@@ -0,0 +1,536 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@author: R. Patrick Xian
+"""
+
+from __future__ import print_function, division
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from threading import Thread
+from .schedule import plan_export
+import matplotlib as mpl
+import numpy as np
+import subprocess
+import pickle
+import time
+import os
+
+try:
+    from queue import Queue
+except ImportError:
+    from Queue import Queue
+
+
+# ===== Frame rendering ===== #
+
+def unique_axes(artists):
+    """
+    Axes of a sequence of artists, in order of first appearance
+    """
+    axes = []
+    for a in artists:
+        if a.axes is not None and a.axes not in axes:
+            axes.append(a.axes)
+    return axes
+
+
+class FrameRenderer(object):
+    """
+    Headless renderer of animator frames into RGBA buffers on an Agg canvas
+    """
+
+    def __init__(self, anim, dpi=None, blit=None):
+        self.anim = anim
+        self.blit = anim.blit if blit is None else blit
+        # Animators painting their frames directly always render over a background
+        self.raster = getattr(anim, 'engine', None) == 'raster'
+        if self.raster:
+            self.blit = True
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        self.fig = anim.f
+        self.dpi = dpi
+        # Resolution and canvas of the figure, restored when closing
+        self.figdpi, self.figcanvas = self.fig.dpi, self.fig.canvas
+        self.layers = []
+        self.closed = False
+        if dpi is not None:
+            self.fig.set_dpi(dpi)
+        if isinstance(self.fig.canvas, FigureCanvasAgg):
+            self.canvas = self.fig.canvas
+        else:
+            self.canvas = FigureCanvasAgg(self.fig)
+        try:
+            self._setup()
+        except Exception:
+            self.close()
+            raise
+        # Last rendered image, reused while the content of the frames is unchanged
+        self.last = None
+
+    def _setup(self):
+        self.size = tuple(self.fig.get_size_inches())
+        # Draw the initial frame first so that autoscaled limits match across workers
+        self.anim.init_anim()
+        self.artists = self.anim.artists()
+        self.background = None
+        # Dynamic artists with the spines of their axes, which are drawn above
+        # images, in drawing order
+        self.layers = list(self.artists)
+        for ax in unique_axes(self.artists):
+            self.layers += list(ax.spines.values())
+        self.layers.sort(key=lambda a: a.get_zorder())
+        if self.blit:
+            # Cache the static background and only redraw the dynamic layers
+            for a in self.layers:
+                a.set_animated(True)
+        self.canvas.draw()
+        if self.blit:
+            self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+
+    def render(self, iframe):
+        """
+        Render a frame, returns an RGBA array of shape (height, width, 4)
+        """
+        if self.closed:
+            self._resume()
+        prof = self.anim.profiler
+        if prof is None:
+            return self._render(iframe)
+        prof.start_frame(iframe)
+        try:
+            return self._render(iframe)
+        finally:
+            prof.end_frame()
+
+    def _render(self, iframe):
+        anim, cache = self.anim, self.anim.cache
+        if cache is not None:
+            key = anim.framekey(iframe)
+            with anim.phase('cache'):
+                img = cache.get(key)
+            if img is not None:
+                return img
+        if self.last is not None and not anim.changed(iframe):
+            img = self.last
+        else:
+            img = self._draw(iframe)
+            self.last = img
+        if cache is not None:
+            with anim.phase('cache'):
+                cache.put(key, img)
+        return img
+
+    def _draw(self, iframe):
+        anim = self.anim
+        if self.raster:
+            with anim.phase('draw'):
+                self.canvas.restore_region(self.background)
+            anim.paint(iframe, self.canvas)
+        elif self.background is None:
+            anim.animator(iframe)
+            with anim.phase('draw'):
+                self.canvas.draw()
+        else:
+            anim.animator(iframe)
+            with anim.phase('draw'):
+                self.canvas.restore_region(self.background)
+                for a in self.layers:
+                    a.axes.draw_artist(a)
+        with anim.phase('copy'):
+            return np.array(self.canvas.buffer_rgba())
+
+    def _resume(self):
+        """
+        Take over the figure again after closing, the background is drawn
+        again if the figure was resized in the meantime
+        """
+        self.figdpi, self.figcanvas = self.fig.dpi, self.fig.canvas
+        self.closed = False
+        if self.dpi is not None:
+            self.fig.set_dpi(self.dpi)
+        if self.fig.canvas is not self.canvas:
+            self.fig.set_canvas(self.canvas)
+        # The figure may have been drawn with other frames in the meantime
+        self.last = None
+        try:
+            if tuple(self.fig.get_size_inches()) != self.size:
+                self._setup()
+            elif self.blit:
+                for a in self.layers:
+                    a.set_animated(True)
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        """
+        Restore the artists, resolution and canvas of the figure, rendering
+        again takes them over anew
+        """
+        self.closed = True
+        for a in self.layers:
+            a.set_animated(False)
+        if self.fig.dpi != self.figdpi:
+            self.fig.set_dpi(self.figdpi)
+        if self.fig.canvas is not self.figcanvas:
+            self.fig.set_canvas(self.figcanvas)
+
+
+_worker_renderer = None
+
+
+def _init_worker(payload, dpi):
+    """
+    Rebuild the animator on a headless canvas once per worker process
+    """
+    global _worker_renderer
+    mpl.use('Agg', force=True)
+    _worker_renderer = FrameRenderer(pickle.loads(payload), dpi=dpi)
+
+
+def _render_chunk(frames):
+    return [_worker_renderer.render(i) for i in frames]
+
+
+def _bounded_map(pool, func, chunks, window):
+    """
+    Results of func over the chunks in order, flattened, with at most window
+    chunks submitted to the pool at any time
+    """
+    pending = deque()
+    try:
+        for chunk in chunks:
+            if len(pending) >= window:
+                for item in pending.popleft().result():
+                    yield item
+            pending.append(pool.submit(func, chunk))
+        while pending:
+            for item in pending.popleft().result():
+                yield item
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def iter_frames(anim, frames=None, workers=1, dpi=None, chunksize=None, maxframes=None):
+    """
+    Generator of rendered RGBA frames in order, the frame range is split
+    into contiguous chunks over a process pool when workers > 1. Chunks are
+    submitted in a window of 2*workers, sized so that about maxframes
+    rendered frames are held at once
+    """
+    if frames is None:
+        frames = range(anim.nframes)
+    frames = list(frames)
+
+    if workers <= 1:
+        renderer = FrameRenderer(anim, dpi=dpi)
+        try:
+            for i in frames:
+                yield renderer.render(i)
+        finally:
+            renderer.close()
+        return
+
+    # Only the frames missing from the frame cache are sent to the workers
+    cache = anim.cache
+    if cache is None:
+        todo = frames
+    else:
+        todo = [i for i in frames if anim.framekey(i, dpi) not in cache]
+    window = 2 * workers
+    if chunksize is None:
+        chunksize = max(1, int(np.ceil(len(todo) / (4 * workers))))
+        if maxframes is not None:
+            chunksize = max(1, min(chunksize, maxframes // window))
+    chunks = [todo[k:k+chunksize] for k in range(0, len(todo), chunksize)]
+    payload = pickle.dumps(anim, protocol=pickle.HIGHEST_PROTOCOL)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, \
+                            initargs=(payload, dpi)) as pool:
+        rendered = _bounded_map(pool, _render_chunk, chunks, window)
+        if cache is None:
+            for img in rendered:
+                yield img
+            return
+        todo, renderer = set(todo), None
+        try:
+            for i in frames:
+                # Keys at the rendering dpi, the figure of this process keeps its own
+                img = next(rendered) if i in todo else cache.get(anim.framekey(i, dpi))
+                if i in todo:
+                    cache.put(anim.framekey(i, dpi), img)
+                elif img is None:
+                    # Evicted in the meantime, render in-process instead
+                    if renderer is None:
+                        renderer = FrameRenderer(anim, dpi=dpi)
+                    img = renderer.render(i)
+                yield img
+        finally:
+            if renderer is not None:
+                renderer.close()
+
+
+# ===== Frame writers ===== #
+
+class FFMpegFrameWriter(object):
+    """
+    Video writer piping raw RGBA frames into an ffmpeg subprocess
+    """
+
+    def __init__(self, path, fps, codec='libx264', bitrate=None, extra_args=()):
+        self.path = path
+        self.fps = fps
+        self.codec = codec
+        self.bitrate = bitrate
+        self.extra_args = list(extra_args)
+        self.proc = None
+        self.nbytes = 0
+
+    def _open(self, height, width):
+        cmd = [mpl.rcParams['animation.ffmpeg_path'], '-y', '-loglevel', 'error', \
+            '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', '{}x{}'.format(width, height), \
+            '-r', str(self.fps), '-i', '-', '-vcodec', self.codec, '-pix_fmt', 'yuv420p', \
+            '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2']
+        if self.bitrate is not None:
+            cmd += ['-b:v', '{}k'.format(self.bitrate)]
+        self.proc = subprocess.Popen(cmd + self.extra_args + [self.path], stdin=subprocess.PIPE)
+
+    def write(self, img):
+        if self.proc is None:
+            self._open(*img.shape[:2])
+        self.proc.stdin.write(np.ascontiguousarray(img).tobytes())
+
+    def close(self):
+        if self.proc is not None:
+            self.proc.stdin.close()
+            if self.proc.wait() != 0:
+                raise Exception('ffmpeg exited with code {}.'.format(self.proc.returncode))
+            self.nbytes = os.path.getsize(self.path)
+
+
+class GIFFrameWriter(object):
+    """
+    Animated GIF writer using Pillow, each frame is palettized and appended
+    to the file as it arrives, so that memory does not grow with the number
+    of frames
+    """
+
+    def __init__(self, path, fps, loop=0):
+        self.path = path
+        self.fps = fps
+        self.loop = loop
+        self.duration = int(round(1000. / fps))
+        self.file = None
+        self.nbytes = 0
+
+    def write(self, img):
+        from PIL import Image, GifImagePlugin
+        frame = Image.fromarray(np.ascontiguousarray(img[..., :3])).quantize(256)
+        if self.file is None:
+            header, _ = GifImagePlugin.getheader(frame, info={'loop':self.loop, \
+                                                'duration':self.duration})
+            self.file = open(self.path, 'wb')
+            self.file.write(b''.join(header))
+        # Every frame carries its own palette
+        for block in GifImagePlugin.getdata(frame, duration=self.duration, include_color_table=True):
+            self.file.write(block)
+
+    def close(self):
+        if self.file is not None:
+            self.file.write(b';')
+            self.file.close()
+            self.file = None
+            self.nbytes = os.path.getsize(self.path)
+
+
+class PNGFrameWriter(object):
+    """
+    Writer of numbered PNG files, path is a directory or a pattern like frame_%05d.png
+    """
+
+    def __init__(self, path, fps=None):
+        if '%' in os.path.basename(path):
+            self.pattern = path
+        else:
+            self.pattern = os.path.join(path, 'frame_%05d.png')
+        dirname = os.path.dirname(self.pattern)
+        if dirname and not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        self.count = 0
+        self.nbytes = 0
+
+    def write(self, img):
+        from PIL import Image
+        fname = self.pattern % self.count
+        Image.fromarray(img).save(fname)
+        self.nbytes += os.path.getsize(fname)
+        self.count += 1
+
+    def close(self):
+        return
+
+
+def writer_format(path, fmt=None):
+    """
+    Output format given explicitly or from the file extension of the path
+    """
+    if fmt is not None:
+        return fmt
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.gif':
+        return 'gif'
+    elif ext in ('', '.png'):
+        return 'png'
+    return 'ffmpeg'
+
+
+def open_writer(path, fps, fmt=None, **kwargs):
+    """
+    Select the frame writer from the format or the file extension of the path
+    """
+    fmt = writer_format(path, fmt)
+    if fmt == 'gif':
+        return GIFFrameWriter(path, fps, **kwargs)
+    elif fmt == 'png':
+        return PNGFrameWriter(path, fps, **kwargs)
+    elif fmt == 'ffmpeg':
+        return FFMpegFrameWriter(path, fps, **kwargs)
+    else:
+        raise Exception('The output format needs to be ffmpeg, gif or png.')
+
+
+# ===== Encoder pipeline ===== #
+
+class EncoderPipeline(object):
+    """
+    Bounded queue of rendered frames drained by a writer thread, so that
+    rendering and encoding overlap with memory capped at maxsize frames
+    """
+
+    _done = object()
+
+    def __init__(self, writer, maxsize=16, profiler=None):
+        self.writer = writer
+        self.profiler = profiler
+        self.queue = Queue(maxsize=maxsize)
+        self.error = None
+        self.nframes = 0
+        self.tstart = time.time()
+        self.stats = None
+        self.thread = Thread(target=self._drain)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _drain(self):
+        while True:
+            item = self.queue.get()
+            if item is self._done:
+                break
+            iframe, img = item
+            if self.error is None:
+                try:
+                    if self.profiler is None:
+                        self.writer.write(img)
+                    else:
+                        with self.profiler.phase('encode', iframe):
+                            self.writer.write(img)
+                    self.nframes += 1
+                except Exception as e:
+                    # Keep draining so that the producer never blocks on a full queue
+                    self.error = e
+        try:
+            self.writer.close()
+        except Exception as e:
+            if self.error is None:
+                self.error = e
+
+    def put(self, img, iframe=None):
+        """
+        Queue a frame for writing, blocks while the queue is full
+        """
+        if self.error is not None:
+            raise self.error
+        if self.profiler is None:
+            self.queue.put((iframe, img))
+        else:
+            with self.profiler.phase('queue', iframe):
+                self.queue.put((iframe, img))
+
+    def close(self):
+        """
+        Flush the queue and finish writing, returns the throughput summary
+        """
+        if self.stats is None:
+            self.queue.put(self._done)
+            self.thread.join()
+            elapsed = time.time() - self.tstart
+            self.stats = {'frames':self.nframes, 'bytes':self.writer.nbytes, 'seconds':elapsed, \
+                          'fps':self.nframes / elapsed if elapsed > 0 else float('inf')}
+        if self.error is not None:
+            raise self.error
+        return self.stats
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+            return False
+        # Finish writing without replacing the error raised by the producer
+        try:
+            self.close()
+        except Exception:
+            pass
+        return False
+
+
+def format_stats(stats):
+    return 'Wrote {frames} frames ({mb:.2f} MB) in {seconds:.2f} s, {fps:.1f} frames/s'.format(\
+                    mb=stats['bytes'] / 2.**20, **stats)
+
+
+def export_animation(anim, path, workers=1, fps=None, dpi=None, frames=None, \
+                    chunksize=None, fmt=None, queuesize=16, verbose=False, \
+                    duration=None, budget=None, **kwargs):
+    """
+    Render the frames of an animator and stream them in order through the
+    encoder pipeline into a video, GIF or PNG sequence, returns the
+    throughput summary (frames, bytes, seconds, fps) and the phase timings
+    when the animator is profiled. The frames are subsampled evenly to an
+    output lasting duration seconds and/or rendering within budget seconds
+    """
+    if fps is None:
+        fps = 1000. / anim.interval
+    # Single-file outputs of unchanged data and parameters are copied from the disk cache
+    key, diskcache = None, anim.diskcache
+    if diskcache is not None and writer_format(path, fmt) != 'png':
+        key = anim.contentkey('export', fps, dpi, None if frames is None else list(frames), \
+                    writer_format(path, fmt), os.path.splitext(path)[1].lower(), \
+                    duration, budget, sorted(kwargs.items()))
+        tstart = time.time()
+        meta = None if key is None else diskcache.fetch(key, path)
+        if meta is not None:
+            stats = dict(meta, path=path, seconds=time.time() - tstart, cached=True)
+            if verbose:
+                print('Copied {frames} frames ({mb:.2f} MB) from the disk cache'.format(\
+                    mb=stats['bytes'] / 2.**20, **stats))
+            return stats
+    frames = plan_export(anim, fps, frames=frames, duration=duration, budget=budget, \
+                        workers=workers, dpi=dpi)
+    writer = open_writer(path, fps, fmt=fmt, **kwargs)
+    with EncoderPipeline(writer, maxsize=queuesize, profiler=anim.profiler) as pipe:
+        for i, img in zip(frames, iter_frames(anim, frames=frames, workers=workers, \
+                            dpi=dpi, chunksize=chunksize, maxframes=queuesize)):
+            pipe.put(img, i)
+    stats = dict(pipe.stats, path=path)
+    if key is not None:
+        diskcache.store(key, path, meta={'frames':stats['frames'], 'bytes':stats['bytes']})
+    if anim.profiler is not None:
+        stats['profile'] = anim.profiler.summary()
+    if verbose:
+        print(format_stats(stats))
+        if anim.profiler is not None:
+            print(anim.profiler.table())
+    return stats
@@ -0,0 +1,183 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@author: R. Patrick Xian
+"""
+
+from __future__ import print_function, division
+from collections import OrderedDict
+import numpy as np
+import threading
+import json
+import time
+
+try:
+    perf_counter = time.perf_counter
+except AttributeError:
+    perf_counter = time.time
+
+
+# ===== Per-frame phase timing ===== #
+
+# Rendering phases in the order they appear in a frame
+PHASES = ('cache', 'data', 'norm', 'artists', 'draw', 'copy', 'queue', 'encode')
+# Phases running outside of the frame, in the writer thread or while waiting for it
+OUTSIDE = ('queue', 'encode')
+
+
+class _NullPhase(object):
+    """
+    Phase timer used while profiling is disabled, it does nothing
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NULLPHASE = _NullPhase()
+
+
+class _Phase(object):
+
+    __slots__ = ('profiler', 'name', 'iframe', 'tstart')
+
+    def __init__(self, profiler, name, iframe=None):
+        self.profiler = profiler
+        self.name = name
+        self.iframe = iframe
+
+    def __enter__(self):
+        self.tstart = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.record(self.name, self.tstart, perf_counter() - self.tstart, self.iframe)
+        return False
+
+
+class FrameProfiler(object):
+    """
+    Timing of the rendering phases of each frame (data slicing, normalization,
+    artist updates, canvas drawing, buffer copies and encoding) with optional
+    callbacks on_frame_start(iframe) and on_frame_end(iframe, timings)
+    """
+
+    def __init__(self, on_frame_start=None, on_frame_end=None):
+        self.on_frame_start = on_frame_start
+        self.on_frame_end = on_frame_end
+        self.clear()
+
+    def clear(self):
+        """
+        Discard the recorded timings
+        """
+        # Events are (iframe, phase, start, duration, thread id)
+        self.events = []
+        self.current = None
+        # Count of the frames started, identifies the open frame
+        self.serial = 0
+        self._tframe = None
+        self._timings = None
+        self.tzero = perf_counter()
+
+    def phase(self, name, iframe=None):
+        """
+        Context manager timing a phase of the current (or the given) frame
+        """
+        return _Phase(self, name, iframe)
+
+    def record(self, name, tstart, duration, iframe=None):
+        if iframe is None:
+            iframe = self.current
+            if iframe is None:
+                # Outside of a frame, e.g. while setting up the artists
+                return
+        self.events.append((iframe, name, tstart, duration, threading.current_thread().ident))
+        if iframe is not None and iframe == self.current and self._timings is not None:
+            self._timings[name] = self._timings.get(name, 0.) + duration
+
+    def start_frame(self, iframe):
+        self.serial += 1
+        self.current = iframe
+        self._timings = OrderedDict()
+        if self.on_frame_start is not None:
+            self.on_frame_start(iframe)
+        self._tframe = perf_counter()
+
+    def end_frame(self, tend=None):
+        """
+        Close the current frame (at time tend if given) and pass its phase
+        timings (in seconds, 'frame' being the total) to the on_frame_end
+        callback, returns None if no frame is open
+        """
+        if self.current is None:
+            return None
+        duration = (perf_counter() if tend is None else tend) - self._tframe
+        iframe, timings = self.current, self._timings
+        self.events.append((iframe, 'frame', self._tframe, duration, threading.current_thread().ident))
+        timings['frame'] = duration
+        self.current, self._timings = None, None
+        if self.on_frame_end is not None:
+            self.on_frame_end(iframe, timings)
+        return timings
+
+    def frame_timings(self):
+        """
+        Total time per phase of each frame, as {iframe: {phase: seconds}}
+        """
+        frames = OrderedDict()
+        for iframe, name, _, duration, _ in self.events:
+            timings = frames.setdefault(iframe, {})
+            timings[name] = timings.get(name, 0.) + duration
+        return frames
+
+    def summary(self):
+        """
+        Statistics of each phase over the frames (count, total, mean, p50,
+        p90, max in seconds). 'other' is the frame time outside of the phases
+        """
+        perphase = OrderedDict()
+        for timings in self.frame_timings().values():
+            if 'frame' in timings:
+                inside = sum(v for k, v in timings.items() if k != 'frame' and k not in OUTSIDE)
+                timings['other'] = max(timings['frame'] - inside, 0.)
+            for name, duration in timings.items():
+                perphase.setdefault(name, []).append(duration)
+        order = [p for p in PHASES + ('other', 'frame') if p in perphase] + \
+                [p for p in perphase if p not in PHASES + ('other', 'frame')]
+        stats = OrderedDict()
+        for name in order:
+            d = np.asarray(perphase[name])
+            stats[name] = {'count':d.size, 'total':d.sum(), 'mean':d.mean(), \
+                    'p50':np.percentile(d, 50), 'p90':np.percentile(d, 90), 'max':d.max()}
+        return stats
+
+    def table(self):
+        """
+        Summary table of the phase timings in milliseconds
+        """
+        stats = self.summary()
+        ftotal = stats['frame']['total'] if 'frame' in stats else None
+        lines = ['{:10s} {:>7s} {:>10s} {:>9s} {:>9s} {:>9s} {:>9s} {:>7s}'.format(\
+                'phase', 'count', 'total ms', 'mean ms', 'p50 ms', 'p90 ms', 'max ms', 'share')]
+        for name, s in stats.items():
+            share = '' if ftotal in (None, 0) or name == 'frame' or name in OUTSIDE else '{:.1%}'.format(s['total'] / ftotal)
+            lines.append('{:10s} {:7d} {:10.2f} {:9.3f} {:9.3f} {:9.3f} {:9.3f} {:>7s}'.format(\
+                name, s['count'], 1e3*s['total'], 1e3*s['mean'], 1e3*s['p50'], \
+                1e3*s['p90'], 1e3*s['max'], share))
+        return '\n'.join(lines)
+
+    def export_trace(self, path):
+        """
+        Save the recorded phases in the Chrome trace event format, viewable
+        in chrome://tracing or Perfetto
+        """
+        events = [{'name':name, 'ph':'X', 'pid':0, 'tid':tid, \
+                   'ts':1e6*(tstart - self.tzero), 'dur':1e6*duration, \
+                   'args':{'frame':iframe}} for iframe, name, tstart, duration, tid in self.events]
+        with open(path, 'w') as f:
+            json.dump({'traceEvents':events, 'displayTimeUnit':'ms'}, f)
+        return path
@@ -0,0 +1,159 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@author: R. Patrick Xian
+"""
+
+from __future__ import print_function, division
+from .export import FrameRenderer
+from .cache import FrameCache
+import threading
+import warnings
+import sys
+
+
+# ===== On-demand frame player ===== #
+
+class FramePlayer(object):
+    """
+    Interactive player rendering frames on demand. Only the first frame is
+    rendered up front, a background thread renders the frame requested by
+    the slider or playback first and then prefetches a window of frames
+    ahead, the encoded frames are kept in a bounded LRU cache. The window
+    is shrunk when the frames do not fit in maxbytes. Frames failing to
+    render are reported through errors and on_error, and retried after a seek
+    """
+
+    def __init__(self, anim, fps=None, prefetch=8, maxbytes=64*2**20, loop=True, dpi=None):
+        self.anim = anim
+        self.nframes = anim.nframes
+        self.fps = 1000. / anim.interval if fps is None else fps
+        self.prefetch = prefetch
+        self.loop = loop
+        self.cache = FrameCache(maxbytes=maxbytes, fmt='png')
+        self.position = 0
+        self.rendered = 0
+        # Callback on_frame(iframe, png) of a frame becoming available for display,
+        # on_error(iframe, exception) of a frame failing to render
+        self.on_frame = None
+        self.on_error = None
+        # Exceptions of the frames that failed to render, by frame, and the last one
+        self.errors = {}
+        self.error = None
+        self._closed = False
+        self._cond = threading.Condition()
+        # The renderer is only used by the render thread after the first frame
+        self.renderer = FrameRenderer(anim, dpi=dpi)
+        # Frames rendered since the last seek, evicted ones are not rendered again
+        self._tried = set()
+        self._render(0)
+        if 0 not in self.cache:
+            self.renderer.close()
+            raise Exception('The frame player needs maxbytes of at least one encoded frame.')
+        # The prefetch window and the frame on display need to fit in the cache
+        fit = maxbytes // len(self.cache.get_png(0)) - 1
+        if self.prefetch > fit:
+            warnings.warn('Prefetch reduced from {} to {} frames to fit in maxbytes.'.format(\
+                            self.prefetch, max(fit, 0)))
+            self.prefetch = max(fit, 0)
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _render(self, iframe):
+        self.cache.put(iframe, self.renderer.render(iframe))
+        self._tried.add(iframe)
+        self.rendered += 1
+
+    def _window(self):
+        ahead = [self.position + k for k in range(self.prefetch + 1)]
+        if self.loop:
+            return [i % self.nframes for i in ahead]
+        return [i for i in ahead if i < self.nframes]
+
+    def _pending(self):
+        for i in self._window():
+            if i not in self.cache and i not in self._tried:
+                return i
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                i = self._pending()
+                while i is None and not self._closed:
+                    self._cond.wait()
+                    i = self._pending()
+                if self._closed:
+                    self.renderer.close()
+                    return
+            try:
+                self._render(i)
+            except Exception as e:
+                # The frame is skipped until the next seek, the thread keeps running
+                self._tried.add(i)
+                self.errors[i] = self.error = e
+                if self.on_error is not None:
+                    self.on_error(i, e)
+                continue
+            self.errors.pop(i, None)
+            if i == self.position and self.on_frame is not None:
+                self.on_frame(i, self.cache.get_png(i))
+            elif i != self.position:
+                # The frame on display is the last one evicted by the prefetching
+                self.cache.get_png(self.position)
+
+    def frame(self, iframe):
+        """
+        PNG bytes of a frame, None if it has not been rendered yet
+        """
+        return self.cache.get_png(iframe)
+
+    def seek(self, iframe):
+        """
+        Move the player to a frame, shown at once if it is cached and as soon
+        as it is rendered otherwise
+        """
+        with self._cond:
+            self.position = int(iframe)
+            self._tried.clear()
+            self._cond.notify_all()
+        png = self.cache.get_png(self.position)
+        if png is not None and self.on_frame is not None:
+            self.on_frame(self.position, png)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def widget(self):
+        """
+        Notebook widget with the frame image, a play button and a slider
+        """
+        try:
+            import ipywidgets as widgets
+        except ImportError:
+            raise Exception('The frame player needs ipywidgets.')
+        if 'matplotlib.pyplot' in sys.modules:
+            # Only the player displays the figure
+            import matplotlib.pyplot as plt
+            plt.close(self.anim.f)
+        image = widgets.Image(value=self.frame(self.position), format='png')
+        play = widgets.Play(min=0, max=self.nframes - 1, value=self.position, \
+                            interval=int(round(1000. / self.fps)), repeat=self.loop)
+        slider = widgets.IntSlider(min=0, max=self.nframes - 1, value=self.position)
+        widgets.jslink((play, 'value'), (slider, 'value'))
+        slider.observe(lambda change: self.seek(change['new']), names='value')
+
+        status = widgets.Label(value='')
+
+        def show(iframe, png):
+            image.value = png
+            status.value = ''
+
+        def fail(iframe, error):
+            status.value = 'Frame {} failed: {!r}'.format(iframe, error)
+        self.on_frame = show
+        self.on_error = fail
+        return widgets.VBox([image, widgets.HBox([play, slider]), status])
@@ -0,0 +1,99 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@author: R. Patrick Xian
+"""
+
+from __future__ import print_function, division
+from collections import OrderedDict
+import numpy as np
+import threading
+
+
+# ===== Multi-resolution frames ===== #
+
+REDUCERS = {'mean':np.mean, 'max':np.max}
+
+
+def block_reduce(frames, factor, method='mean'):
+    """
+    Downsample the last two axes of a frame or a stack of frames by an
+    integer factor with block means or maxima, ragged edges are padded by
+    repeating the last row and column
+    """
+    frames = np.asarray(frames)
+    if factor == 1:
+        return frames
+    h, w = frames.shape[-2:]
+    nh, nw = -(-h // factor), -(-w // factor)
+    if (nh*factor, nw*factor) != (h, w):
+        pad = [(0, 0)]*(frames.ndim - 2) + [(0, nh*factor - h), (0, nw*factor - w)]
+        frames = np.pad(frames, pad, mode='edge')
+    blocks = frames.reshape(frames.shape[:-2] + (nh, factor, nw, factor))
+    reduced = REDUCERS[method](blocks, axis=(-3, -1))
+    if reduced.dtype == np.float64 and frames.dtype != np.float64:
+        reduced = reduced.astype('float32')
+    return reduced
+
+
+class FramePyramid(object):
+    """
+    Resolution pyramid of a frame stack, level k is downsampled by 2**k in
+    both directions. The levels are computed for the whole stack in chunks
+    up front (eager=True), or per frame on request and kept in an LRU cache
+    """
+
+    def __init__(self, stack, method='mean', eager=False, minsize=16, chunksize=16, cachesize=64):
+        if method not in REDUCERS:
+            raise Exception('The pyramid method needs to be mean or max.')
+        self.stack = stack
+        self.method = method
+        self.eager = eager
+        self.cachesize = cachesize
+        nframes, h, w = stack.shape
+        self.nlevels = max(1, int(np.floor(np.log2(max(min(h, w), 1) / float(minsize)))) + 1)
+        self.levels = None
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        if eager:
+            self.levels = [None]*self.nlevels
+            for start in range(0, nframes, chunksize):
+                chunk = np.asarray(stack[start:start+chunksize])
+                for k in range(1, self.nlevels):
+                    # Each level is reduced from the full-resolution chunk
+                    reduced = block_reduce(chunk, 2**k, method)
+                    if self.levels[k] is None:
+                        self.levels[k] = np.empty((nframes,) + reduced.shape[1:], dtype=reduced.dtype)
+                    self.levels[k][start:start+len(chunk)] = reduced
+
+    def get(self, iframe, level):
+        """
+        Frame at a pyramid level, level 0 is the full resolution
+        """
+        level = min(max(int(level), 0), self.nlevels - 1)
+        if level == 0:
+            return np.asarray(self.stack[iframe])
+        if self.levels is not None:
+            return self.levels[level][iframe]
+        key = (iframe, level)
+        with self._lock:
+            img = self._cache.get(key)
+            if img is not None:
+                self._cache.move_to_end(key)
+                return img
+        img = block_reduce(self.stack[iframe], 2**level, self.method)
+        with self._lock:
+            self._cache[key] = img
+            while len(self._cache) > self.cachesize:
+                self._cache.popitem(last=False)
+        return img
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_cache'] = OrderedDict()
+        state.pop('_lock')
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
@@ -0,0 +1,116 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@author: R. Patrick Xian
+"""
+
+from __future__ import print_function, division
+import numpy as np
+import matplotlib as mpl
+
+
+# ===== Vectorized colormapping ===== #
+
+# Number of color levels, the last uint8 code is reserved for invalid values
+NLEVELS = 255
+BADCODE = 255
+
+
+def colormap_lut(cmap, nlevels=NLEVELS):
+    """
+    Lookup table of uint8 RGBA colors for the quantized color codes
+    """
+    if not isinstance(cmap, mpl.colors.Colormap):
+        cmap = mpl.colormaps[cmap]
+    lut = np.empty((nlevels + 1, 4))
+    lut[:nlevels] = cmap(np.linspace(0, 1, nlevels))
+    lut[nlevels] = cmap.get_bad()
+    return np.round(lut * 255).astype('uint8')
+
+
+def quantize(frames, norm, nlevels=NLEVELS):
+    """
+    Normalize a frame or a chunk of frames at once and quantize it to uint8
+    color codes, invalid values are mapped to BADCODE
+    """
+    normed = np.ma.asarray(norm(frames))
+    bad = np.ma.getmaskarray(normed) | ~np.isfinite(np.ma.getdata(normed))
+    codes = np.ma.getdata(normed).astype('float', copy=True)
+    codes[bad] = 0
+    np.clip(codes, 0, 1, out=codes)
+    codes *= nlevels - 1
+    codes += 0.5
+    codes = codes.astype('uint8')
+    codes[bad] = BADCODE
+    return codes
+
+
+def colorize(codes, lut):
+    """
+    Apply the color lookup table to quantized codes with a single take
+    """
+    return lut.take(codes, axis=0)
+
+
+def composite(region, codes, lut):
+    """
+    Paint colorized codes over a region of the canvas buffer in place,
+    blending only the pixels with translucent colors (e.g. invalid values)
+    """
+    colors = colorize(codes, lut)
+    translucent = lut[:, 3] < 255
+    part = translucent.take(codes) if translucent.any() else None
+    if part is None or not part.any():
+        region[...] = colors
+        return
+    region[~part] = colors[~part]
+    a = colors[part, 3:] / 255.
+    region[part] = np.round(colors[part] * a + region[part] * (1 - a)).astype('uint8')
+
+
+def grid_index(axis, coords):
+    """
+    Index of the nearest grid point along a monotonic axis for each
+    coordinate, -1 for coordinates outside the grid
+    """
+    axis = np.asarray(axis, dtype='float')
+    coords = np.asarray(coords, dtype='float')
+    flip = axis.size > 1 and axis[0] > axis[-1]
+    if flip:
+        axis = axis[::-1]
+    if axis.size > 1:
+        lo = axis[0] - (axis[1] - axis[0]) / 2.
+        hi = axis[-1] + (axis[-1] - axis[-2]) / 2.
+    else:
+        lo, hi = axis[0] - 0.5, axis[0] + 0.5
+    edges = np.concatenate([[lo], (axis[1:] + axis[:-1]) / 2., [hi]])
+    idx = np.searchsorted(edges, coords, side='right') - 1
+    idx[(coords < lo) | (coords >= hi)] = -1
+    if flip:
+        idx = np.where(idx >= 0, axis.size - 1 - idx, -1)
+    return idx
+
+
+def pixel_map(ax, xaxis, yaxis, shape):
+    """
+    Canvas buffer slices covered by an image inside the axes and the
+    nearest data indices of the pixel rows and columns
+    """
+    height, width = shape[:2]
+    bb = ax.bbox
+    # Pixels with their centers inside the axes
+    cols = np.arange(int(np.ceil(bb.x0 - 0.5)), int(np.floor(bb.x1 - 0.5)) + 1)
+    rows = np.arange(int(np.ceil(bb.y0 - 0.5)), int(np.floor(bb.y1 - 0.5)) + 1)
+    inv = ax.transData.inverted()
+    xd = inv.transform(np.column_stack([cols + 0.5, np.full(cols.size, bb.y0)]))[:, 0]
+    yd = inv.transform(np.column_stack([np.full(rows.size, bb.x0), rows + 0.5]))[:, 1]
+    ci, ri = grid_index(xaxis, xd), grid_index(yaxis, yd)
+    # Canvas buffer rows run from the top, display rows from the bottom
+    brows = height - 1 - rows
+    keepc = (ci >= 0) & (cols >= 0) & (cols < width)
+    keepr = (ri >= 0) & (brows >= 0) & (brows < height)
+    cols, ci = cols[keepc], ci[keepc]
+    brows, ri = brows[keepr][::-1], ri[keepr][::-1]
+    if cols.size == 0 or brows.size == 0:
+        return None
+    return slice(brows[0], brows[-1] + 1), slice(cols[0], cols[-1] + 1), ri, ci
@@ -0,0 +1,130 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@author: R. Patrick Xian
+"""
+
+from __future__ import print_function, division
+import numpy as np
+import time
+
+try:
+    perf_counter = time.perf_counter
+except AttributeError:
+    perf_counter = time.time
+
+
+# ===== Frame planning ===== #
+
+def plan_frames(nframes, count, frames=None):
+    """
+    Temporally subsample (or repeat) frames evenly to count frames spanning
+    the whole range, from range(nframes) or the given frame list
+    """
+    frames = list(range(nframes)) if frames is None else list(frames)
+    count = max(1, int(round(count)))
+    idx = np.round(np.linspace(0, len(frames) - 1, count)).astype('int')
+    return [frames[i] for i in idx]
+
+
+def estimate_frametime(anim, nsample=3, dpi=None):
+    """
+    Mean render time of a frame, measured on a few evenly spaced frames
+    after the artists are set up
+    """
+    from .export import FrameRenderer
+    renderer = FrameRenderer(anim, dpi=dpi)
+    try:
+        frames = plan_frames(anim.nframes, min(nsample, anim.nframes))
+        tstart = perf_counter()
+        for i in frames:
+            renderer.render(i)
+        return (perf_counter() - tstart) / len(frames)
+    finally:
+        renderer.close()
+
+
+def plan_export(anim, fps, frames=None, duration=None, budget=None, workers=1, dpi=None):
+    """
+    Frames of an export lasting duration seconds at fps, and/or rendering
+    within a wall-clock budget in seconds given the measured frame time
+    """
+    if frames is None:
+        frames = range(anim.nframes)
+    frames = list(frames)
+    count = len(frames)
+    if duration is not None:
+        count = duration * fps
+    if budget is not None:
+        frametime = estimate_frametime(anim, dpi=dpi)
+        count = min(count, len(frames), budget * max(workers, 1) / frametime)
+    if count == len(frames):
+        return frames
+    return plan_frames(len(frames), count, frames)
+
+
+# ===== Playback scheduling ===== #
+
+class PlaybackScheduler(object):
+    """
+    Iterable of the frames to draw during playback at a target wall-clock
+    rate. The frame on display follows the elapsed time, so frames are
+    skipped when rendering falls behind and playback ends on time
+    """
+
+    def __init__(self, frames, fps, verbose=False):
+        self.frames = list(frames)
+        self.fps = fps
+        self.verbose = verbose
+        self.reset()
+
+    def reset(self):
+        self.tstart = None
+        self.tlast = None
+        self.shown = 0
+        self.skipped = 0
+        self.position = -1
+        self.frametimes = []
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __iter__(self):
+        self.reset()
+        nframes = len(self.frames)
+        while True:
+            now = perf_counter()
+            if self.tstart is None:
+                self.tstart = now
+            else:
+                # Time between two frames, rendering included
+                self.frametimes.append(now - self.tlast)
+            self.tlast = now
+            # Advance with the clock, but by at least one frame per refresh
+            pos = max(int((now - self.tstart) * self.fps), self.position + 1)
+            if pos >= nframes:
+                if self.position == nframes - 1:
+                    break
+                # Always end on the last frame
+                pos = nframes - 1
+            self.skipped += pos - self.position - 1
+            self.position = pos
+            self.shown += 1
+            yield self.frames[pos]
+        if self.verbose:
+            print(self.format_report())
+
+    def report(self):
+        """
+        Requested and achieved rates of the last playback, the achieved
+        rate counts the frames actually drawn per second
+        """
+        elapsed = (self.tlast - self.tstart) if self.tstart is not None else 0.
+        frametime = float(np.mean(self.frametimes)) if self.frametimes else float('nan')
+        return {'requested_fps':self.fps, 'achieved_fps':self.shown / elapsed if elapsed > 0 else float('nan'), \
+                'shown':self.shown, 'skipped':self.skipped, 'seconds':elapsed, 'frametime':frametime}
+
+    def format_report(self):
+        return 'Played {shown} frames ({skipped} skipped) in {seconds:.2f} s, ' \
+               '{achieved_fps:.1f} of {requested_fps:.1f} frames/s requested, ' \
+               '{ms:.1f} ms per frame'.format(ms=1e3*self.report()['frametime'], **self.report())
@@ -0,0 +1,458 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@author: R. Patrick Xian
+"""
+
+from __future__ import print_function, division
+from collections import deque
+import numpy as np
+import threading
+import hashlib
+import json
+import mmap
+import os
+
+
+# ===== Frame sources ===== #
+
+class FrameSource(object):
+    """
+    Base class of lazy frame sources, frames are read on request by index
+    """
+
+    nframes = 0
+    frameshape = ()
+
+    @property
+    def shape(self):
+        return (self.nframes,) + tuple(self.frameshape)
+
+    def __len__(self):
+        return self.nframes
+
+    def __getitem__(self, iframe):
+        if isinstance(iframe, slice):
+            start, stop, step = iframe.indices(self.nframes)
+            if step == 1:
+                return self.readrange(start, max(start, stop))
+            return np.stack([self.read(i) for i in range(start, stop, step)])
+        iframe = int(iframe)
+        if iframe < 0:
+            iframe += self.nframes
+        if not 0 <= iframe < self.nframes:
+            raise IndexError('Frame index {} is out of range.'.format(iframe))
+        return self.read(iframe)
+
+    def __iter__(self):
+        for i in range(self.nframes):
+            yield self[i]
+
+    def read(self, iframe):
+        """
+        Read a single frame as an array
+        """
+        raise NotImplementedError
+
+    def readrange(self, start, stop):
+        """
+        Read a contiguous range of frames as an array
+        """
+        return np.stack([self.read(i) for i in range(start, stop)])
+
+    def close(self):
+        return
+
+
+class ArraySource(FrameSource):
+    """
+    Frames sliced along an axis of an array-like object, such as np.memmap
+    or HDF5/zarr-like datasets, without loading the whole array
+    """
+
+    def __init__(self, data, axis=0, nframes=None):
+        self.data = data
+        self.axis = axis
+        shape = tuple(data.shape)
+        self.frameshape = shape[:axis] + shape[axis+1:]
+        self.nframes = shape[axis] if nframes is None else nframes
+
+    def read(self, iframe):
+        return np.asarray(self.data[(slice(None),)*self.axis + (iframe,)])
+
+    def readrange(self, start, stop):
+        block = np.asarray(self.data[(slice(None),)*self.axis + (slice(start, stop),)])
+        return np.moveaxis(block, self.axis, 0)
+
+
+class SlabSource(ArraySource):
+    """
+    Frames along a non-leading axis read in slabs of consecutive frames, each
+    slab is made frame-contiguous once so that sequential playback touches
+    the strided (e.g. memory mapped) data once per slab instead of per frame
+    """
+
+    def __init__(self, data, axis=0, nframes=None, slab=16):
+        super(SlabSource, self).__init__(data, axis=axis, nframes=nframes)
+        self.slab = max(int(slab), 1)
+        self._slab = None
+        self._lock = threading.Lock()
+
+    def read(self, iframe):
+        k = iframe // self.slab
+        with self._lock:
+            if self._slab is None or self._slab[0] != k:
+                start = k * self.slab
+                block = self.readrange(start, min(start + self.slab, self.nframes))
+                self._slab = (k, np.ascontiguousarray(block))
+            return self._slab[1][iframe - k*self.slab]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_slab'] = None
+        state.pop('_lock')
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+def stack_digest(data):
+    """
+    Identity of the content of an array or array-like volume. A whole memory
+    mapped file is identified by its path, size and modification time without
+    reading it, other data are hashed in chunks (a full read)
+    """
+    if isinstance(data, np.memmap) and isinstance(data.base, mmap.mmap) \
+        and data.filename is not None and (data.flags.c_contiguous or data.flags.f_contiguous):
+        stat = os.stat(data.filename)
+        return {'file':os.path.realpath(data.filename), 'offset':data.offset, \
+                'size':stat.st_size, 'mtime':stat.st_mtime_ns, 'order':'F' if not data.flags.c_contiguous else 'C'}
+    # The cache module builds on the sources
+    from .cache import digest_data
+    h = hashlib.sha1()
+    digest_data(data if isinstance(data, np.ndarray) else ArraySource(data), h)
+    return h.hexdigest()
+
+
+def contiguous_stack(data, axis=0, path=None, chunkbytes=64*2**20):
+    """
+    Copy of a volume with the frames along axis made contiguous, in memory or
+    in a .npy file at path that is memory mapped. The file is reused while
+    the content identity of the data (see stack_digest) and the axis recorded
+    next to it (in path + '.json') match. The data are read in chunks along
+    their leading axis
+    """
+    shape = tuple(data.shape)
+    outshape = (shape[axis],) + shape[:axis] + shape[axis+1:]
+    dtype = np.dtype(getattr(data, 'dtype', np.float64))
+    if path is not None:
+        meta = {'axis':axis, 'digest':stack_digest(data), 'shape':list(outshape), 'dtype':dtype.str}
+        try:
+            with open(path + '.json') as f:
+                reusable = json.load(f) == meta and os.path.exists(path)
+        except (IOError, OSError, ValueError):
+            reusable = False
+        if reusable:
+            return np.load(path, mmap_mode='r')
+        if os.path.exists(path + '.json'):
+            os.remove(path + '.json')
+    if path is None:
+        out = np.empty(outshape, dtype=dtype)
+    else:
+        # Built aside and swapped in, so that a partial file is never reused
+        tmp = '{}.{}.tmp.npy'.format(path, os.getpid())
+        out = np.lib.format.open_memmap(tmp, mode='w+', dtype=dtype, shape=outshape)
+    rowbytes = max(int(np.prod(shape[1:])) * dtype.itemsize, 1)
+    step = max(1, int(chunkbytes // rowbytes))
+    for k in range(0, shape[0], step):
+        chunk = np.asarray(data[k:k+step])
+        if axis == 0:
+            out[k:k+len(chunk)] = chunk
+        else:
+            # The leading axis of the data becomes the first frame axis
+            out[:, k:k+len(chunk)] = np.moveaxis(chunk, axis, 0)
+    if path is not None:
+        out.flush()
+        del out
+        os.replace(tmp, path)
+        with open(path + '.json', 'w') as f:
+            json.dump(meta, f)
+        return np.load(path, mmap_mode='r')
+    return out
+
+
+class CallableSource(FrameSource):
+    """
+    Frames computed by a function f(iframe) -> array
+    """
+
+    def __init__(self, func, nframes, frameshape=None):
+        if nframes is None:
+            raise Exception('The number of frames needs to be specified for a callable.')
+        self.func = func
+        self.nframes = nframes
+        if frameshape is None:
+            frameshape = np.shape(func(0))
+        self.frameshape = tuple(frameshape)
+
+    def read(self, iframe):
+        return np.asarray(self.func(iframe))
+
+
+class GeneratorSource(FrameSource):
+    """
+    Frames consumed once from a generator or iterator, the most recent
+    frames are kept in a bounded history for repeated access
+    """
+
+    def __init__(self, gen, nframes, history=2):
+        if nframes is None:
+            raise Exception('The number of frames needs to be specified for a generator.')
+        self.gen = iter(gen)
+        self.nframes = nframes
+        self.history = deque(maxlen=max(history, 1))
+        self.pos = 0
+        self.frameshape = np.shape(self.read(0))
+
+    def read(self, iframe):
+        if iframe < self.pos - len(self.history):
+            raise Exception('Frame {} is no longer available from the generator.'.format(iframe))
+        while self.pos <= iframe:
+            self.history.append(np.asarray(next(self.gen)))
+            self.pos += 1
+        return self.history[iframe - self.pos]
+
+    def __getstate__(self):
+        raise Exception('Generator sources cannot be pickled.')
+
+
+class PrefetchSource(FrameSource):
+    """
+    Bounded read-ahead wrapper, a background thread loads the frames
+    iframe+1 ... iframe+depth while frame iframe is being drawn
+    """
+
+    def __init__(self, source, depth=4):
+        self.source = source
+        self.depth = depth
+        self.nframes = source.nframes
+        self.frameshape = source.frameshape
+        self._start()
+
+    def _start(self):
+        self._cache = {}
+        self._current = -1
+        self._loading = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self._readlock = threading.Lock()
+        self._thread = threading.Thread(target=self._prefetch)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _inwindow(self, j):
+        return self._current <= j <= self._current + self.depth
+
+    def _pending(self):
+        for j in range(self._current + 1, min(self._current + self.depth + 1, self.nframes)):
+            if j not in self._cache:
+                return j
+        return None
+
+    def _prefetch(self):
+        while True:
+            with self._cond:
+                j = self._pending()
+                while j is None and not self._closed:
+                    self._cond.wait()
+                    j = self._pending()
+                if self._closed:
+                    return
+                self._loading = j
+            with self._readlock:
+                frame = self.source[j]
+            with self._cond:
+                self._loading = None
+                if self._inwindow(j):
+                    self._cache[j] = frame
+                self._cond.notify_all()
+
+    def read(self, iframe):
+        with self._cond:
+            self._current = iframe
+            for j in [j for j in self._cache if not self._inwindow(j)]:
+                del self._cache[j]
+            self._cond.notify_all()
+            while self._loading == iframe:
+                self._cond.wait()
+            frame = self._cache.get(iframe)
+        if frame is None:
+            with self._readlock:
+                frame = self.source[iframe]
+            with self._cond:
+                if self._inwindow(iframe):
+                    self._cache[iframe] = frame
+        return frame
+
+    def readrange(self, start, stop):
+        with self._readlock:
+            return self.source[start:stop]
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cache = {}
+            self._cond.notify_all()
+        self.source.close()
+
+    def __getstate__(self):
+        return {'source':self.source, 'depth':self.depth, \
+                'nframes':self.nframes, 'frameshape':self.frameshape}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._start()
+
+
+class AtlasSource(FrameSource):
+    """
+    Frames of equally shaped panels tiled row by row into one mosaic, with
+    the first panel at the top left. Single frames are copied into a
+    preallocated buffer that is reused, gaps and empty tiles are NaN
+    """
+
+    def __init__(self, panels, ncol, gap=0, nframes=None):
+        shapes = set(tuple(p.shape[1:]) for p in panels)
+        if len(shapes) != 1 or len(shapes.copy().pop()) != 2:
+            raise Exception('The panels of an atlas need to have the same 2D frame shape.')
+        self.panels = panels
+        self.ncol = ncol
+        self.nrow = -(-len(panels) // ncol)
+        self.gap = gap
+        self.panelshape = shapes.pop()
+        self.nframes = min(len(p) for p in panels) if nframes is None else nframes
+        pr, pc = self.panelshape
+        self.frameshape = (self.nrow*(pr + gap) - gap, self.ncol*(pc + gap) - gap)
+        self.dtype = np.result_type(np.float32, *[getattr(p, 'dtype', np.float64) for p in panels])
+        # Origins of the tiles in the mosaic, rows run from the bottom
+        self.origins = [((self.nrow - 1 - i // ncol)*(pr + gap), (i % ncol)*(pc + gap)) \
+                        for i in range(len(panels))]
+        self._buf = np.full(self.frameshape, np.nan, dtype=self.dtype)
+
+    def _tiles(self, out):
+        pr, pc = self.panelshape
+        for (r0, c0), panel in zip(self.origins, self.panels):
+            yield out[..., r0:r0+pr, c0:c0+pc], panel
+
+    def read(self, iframe):
+        for tile, panel in self._tiles(self._buf):
+            tile[...] = panel[iframe]
+        return self._buf
+
+    def readrange(self, start, stop):
+        out = np.full((stop - start,) + self.frameshape, np.nan, dtype=self.dtype)
+        for tile, panel in self._tiles(out):
+            tile[...] = panel[start:stop]
+        return out
+
+    def close(self):
+        for panel in self.panels:
+            if isinstance(panel, FrameSource):
+                panel.close()
+
+
+class RingSource(FrameSource):
+    """
+    Fixed-capacity ring buffer of a live stream, frames are indexed by their
+    sequence number and the oldest frames are overwritten by new pushes
+    """
+
+    def __init__(self, frameshape, capacity=64, dtype='float64'):
+        self.frameshape = tuple(frameshape)
+        self.capacity = capacity
+        self.buffer = np.zeros((capacity,) + self.frameshape, dtype=dtype)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    @property
+    def nframes(self):
+        return self.count
+
+    def push(self, frame):
+        """
+        Append a frame, returns its sequence number. Thread-safe and
+        non-blocking, so it can be called from producer threads or asyncio tasks
+        """
+        frame = np.asarray(frame)
+        if frame.shape != self.frameshape:
+            raise Exception('The pushed frame needs to have shape {}.'.format(self.frameshape))
+        with self._lock:
+            self.buffer[self.count % self.capacity] = frame
+            self.count += 1
+            return self.count - 1
+
+    def window(self):
+        """
+        Sequence numbers of the frames currently held in the buffer
+        """
+        count = self.count
+        return range(max(0, count - self.capacity), count)
+
+    def read(self, iframe):
+        with self._lock:
+            if not self.count - self.capacity <= iframe < self.count:
+                raise Exception('Frame {} is no longer in the ring buffer.'.format(iframe))
+            return self.buffer[iframe % self.capacity].copy()
+
+    def __getstate__(self):
+        with self._lock:
+            return {'frameshape':self.frameshape, 'capacity':self.capacity, \
+                    'buffer':self.buffer.copy(), 'count':self.count}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+def single_pass(stack):
+    """
+    Check if the frames of a stack can only be read once and in order, as
+    from a generator
+    """
+    if isinstance(stack, PrefetchSource):
+        return single_pass(stack.source)
+    return isinstance(stack, GeneratorSource)
+
+
+def as_source(data, axis=0, nframes=None, prefetch=0):
+    """
+    Wrap arrays, datasets, callables or generators into a frame source,
+    with a read-ahead thread of the given depth if prefetch > 0
+    """
+    if isinstance(data, FrameSource):
+        source = data
+    elif callable(data):
+        source = CallableSource(data, nframes)
+    elif hasattr(data, '__next__') or hasattr(data, 'next'):
+        source = GeneratorSource(data, nframes, history=prefetch+2)
+    else:
+        if isinstance(data, (list, tuple)):
+            data = np.asarray(data)
+        source = ArraySource(data, axis=axis, nframes=nframes)
+    if prefetch > 0:
+        source = PrefetchSource(source, depth=prefetch)
+    return source
+
+
+def frame_stack(data, axis=0, nframes=None, prefetch=0):
+    """
+    Indexable stack of frames along the leading axis, in-memory arrays are
+    returned as views and everything else is wrapped into a frame source
+    """
+    if isinstance(data, (list, tuple)):
+        data = np.asarray(data)
+    if isinstance(data, np.ndarray) and prefetch == 0:
+        return np.rollaxis(data, axis)
+    return as_source(data, axis=axis, nframes=nframes, prefetch=prefetch)
@@ -0,0 +1,133 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@author: R. Patrick Xian
+"""
+
+from __future__ import print_function, division
+from collections import OrderedDict
+import numpy as np
+import zlib
+
+
+# ===== Content keys ===== #
+
+def content_key(data):
+    """
+    Cheap content hash of an array or a tuple of arrays (CRC32 of the bytes
+    with the shapes and types), equal for identical frames
+    """
+    if isinstance(data, (tuple, list)):
+        return tuple(content_key(d) for d in data)
+    arr = np.ascontiguousarray(data)
+    return (arr.shape, arr.dtype.str, zlib.crc32(arr.view('uint8').ravel()))
+
+
+# ===== Multi-track timeline ===== #
+
+class Track(object):
+    """
+    Frame index of a track over time. Frames follow at a fixed rate (fps)
+    from the start time or at the given time stamps (in seconds), the last
+    frame is held after the end unless the track loops
+    """
+
+    def __init__(self, nframes, fps=None, times=None, start=0., loop=False):
+        self.nframes = nframes
+        self.fps = fps
+        self.times = None if times is None else np.asarray(times, dtype='float')
+        self.start = start
+        self.loop = loop
+        if self.times is not None and len(self.times) != nframes:
+            raise Exception('The track needs one time stamp per frame.')
+
+    @property
+    def duration(self):
+        if self.times is not None:
+            step = self.times[-1] - self.times[-2] if self.nframes > 1 else 0.
+            return self.times[-1] + step
+        return self.start + self.nframes / float(self.fps)
+
+    def index(self, t):
+        """
+        Frame of the track shown at time t
+        """
+        if self.times is not None:
+            i = int(np.searchsorted(self.times, t + 1e-9, side='right')) - 1
+        else:
+            i = int(np.floor((t - self.start) * self.fps + 1e-9))
+        if self.loop and i >= 0:
+            return i % self.nframes
+        return min(max(i, 0), self.nframes - 1)
+
+
+class Timeline(object):
+    """
+    Tracks of a composite animation on a common clock of fps ticks per
+    second. The frame shown by each track is kept, so that only the tracks
+    whose content changes at a tick are updated. Tracks without a rate or
+    time stamps advance one frame per tick
+    """
+
+    def __init__(self, tracks, fps, duration=None):
+        self.tracks = OrderedDict(tracks)
+        self.fps = fps
+        for track in self.tracks.values():
+            if track.fps is None and track.times is None:
+                track.fps = fps
+        if duration is None:
+            duration = max(track.duration for track in self.tracks.values())
+        self.duration = duration
+        self.nticks = max(1, int(np.ceil(duration * fps - 1e-9)))
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the frames on display, all tracks are changed at the next tick
+        """
+        self.shown = {}
+        self._keys = {}
+
+    def time(self, tick):
+        return tick / float(self.fps)
+
+    def indices(self, tick):
+        """
+        Frame index of every track at a tick
+        """
+        t = self.time(tick)
+        return OrderedDict((name, track.index(t)) for name, track in self.tracks.items())
+
+    def _key(self, name, index, key):
+        if key is None:
+            return index
+        if (name, index) not in self._keys:
+            if len(self._keys) > 4 * len(self.tracks):
+                self._keys = {}
+            self._keys[(name, index)] = key(name, index)
+        return self._keys[(name, index)]
+
+    def changes(self, tick, key=None):
+        """
+        Tracks whose frame at a tick differs in content from the frame on
+        display, as {name: index}. Contents are compared by key(name, index),
+        tracks moving to an identical frame are not reported
+        """
+        dirty = OrderedDict()
+        for name, index in self.indices(tick).items():
+            shown = self.shown.get(name)
+            if shown is not None and shown[0] == index:
+                continue
+            k = self._key(name, index, key)
+            if shown is not None and shown[1] == k:
+                self.shown[name] = (index, k)
+            else:
+                dirty[name] = index
+        return dirty
+
+    def commit(self, shown, key=None):
+        """
+        Record the frames put on display, as {name: index}
+        """
+        for name, index in shown.items():
+            self.shown[name] = (index, self._key(name, index, key))
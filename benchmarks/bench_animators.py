@@ -0,0 +1,259 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@author: R. Patrick Xian
+
+Throughput, latency and memory benchmarks of the animators on the Agg backend.
+
+    python benchmarks/bench_animators.py --quick -o results.json
+    python benchmarks/bench_animators.py -o new.json --baseline results.json --threshold 0.1
+
+Each case runs in a fresh process, so that the peak resident memory is
+attributed to that case alone. After a warmup pass, the frames are rendered
+--repeat times and the medians over the repeats are reported with their
+relative spread. The exit status is 1 if any case regressed beyond both
+the threshold and the measured spread relative to the baseline.
+"""
+
+from __future__ import print_function, division
+import multiprocessing as mp
+import itertools as it
+import argparse
+import platform
+import resource
+import json
+import time
+import sys
+import os
+
+import numpy as np
+import matplotlib as mpl
+mpl.use('Agg')
+
+# Benchmark the animo of this checkout rather than an installed one
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+
+# ===== Benchmark cases ===== #
+
+def line_case(nframes, npoints):
+    from animo import LineAnimate
+    x = np.linspace(0, 10, npoints)[None, :]
+    y = np.sin(x + 0.1*np.arange(nframes)[:, None])
+    return LineAnimate(x, y, nframes, fixed='x')
+
+
+def multiline_case(nframes, npoints, ntraces, collection):
+    from animo import MultiLineAnimate
+    x = np.linspace(0, 10, npoints)[None, :]
+    dataset = [(x, np.sin(x + 0.1*np.arange(nframes)[:, None] + 0.05*i)) for i in range(ntraces)]
+    return MultiLineAnimate(dataset, 'x', nframes, collection=collection, \
+                linewidths=[1]*ntraces)
+
+
+def image_case(nframes, size, engine):
+    from animo import ImageAnimate
+    data = np.random.RandomState(0).rand(nframes, size, size)
+    return ImageAnimate(data, engine=engine, climits='global')
+
+
+def multiimage_case(nframes, size, npanels, atlas):
+    from animo import MultiImageAnimate
+    rs = np.random.RandomState(0)
+    ncol = int(np.ceil(np.sqrt(npanels)))
+    nrow = int(np.ceil(npanels / ncol))
+    dataset = [rs.rand(nframes, size, size) for i in range(npanels)]
+    return MultiImageAnimate(dataset, nrow=nrow, ncol=ncol, figsize=(8, 8), \
+                atlas=atlas, climits='global')
+
+
+def composite_case(nframes, size, npoints):
+    from animo import CompositePlotAnimate
+    data = np.random.RandomState(0).rand(nframes, size, size)
+    x = np.linspace(0, size - 1, npoints)[None, :]
+    y = size/2. + size/4.*np.sin(x/10. + 0.1*np.arange(nframes)[:, None])
+    return CompositePlotAnimate(x, y, data, fixed='x', climits='global')
+
+
+# Parameter sweeps of each case, full and quick
+CASES = {
+    'LineAnimate': (line_case,
+        {'nframes':[50, 200], 'npoints':[1000, 100000]},
+        {'nframes':[20], 'npoints':[1000]}),
+    'MultiLineAnimate': (multiline_case,
+        {'nframes':[50], 'npoints':[1000], 'ntraces':[10, 100, 1000], 'collection':[False, True]},
+        {'nframes':[20], 'npoints':[200], 'ntraces':[10], 'collection':[False, True]}),
+    'ImageAnimate': (image_case,
+        {'nframes':[50, 200], 'size':[128, 512], 'engine':['imshow', 'pcolormesh', 'raster']},
+        {'nframes':[20], 'size':[128], 'engine':['imshow', 'raster']}),
+    'MultiImageAnimate': (multiimage_case,
+        {'nframes':[50], 'size':[64], 'npanels':[4, 16, 64], 'atlas':[False, True]},
+        {'nframes':[20], 'size':[32], 'npanels':[4], 'atlas':[False, True]}),
+    'CompositePlotAnimate': (composite_case,
+        {'nframes':[50, 200], 'size':[128, 512], 'npoints':[1000]},
+        {'nframes':[20], 'size':[128], 'npoints':[200]}),
+    }
+
+
+def sweep(grid):
+    """
+    All parameter combinations of a sweep grid
+    """
+    keys = sorted(grid)
+    for values in it.product(*[grid[k] for k in keys]):
+        yield dict(zip(keys, values))
+
+
+def peak_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return rss / 2.**20 if sys.platform == 'darwin' else rss / 2.**10
+
+
+def render_pass(renderer, nframes, mintime=0.):
+    """
+    Render all frames, repeatedly until mintime seconds have passed, returns
+    the number of frames, the total time and the per-frame latencies
+    """
+    latency = []
+    t1 = time.perf_counter()
+    while True:
+        for i in range(nframes):
+            ts = time.perf_counter()
+            renderer.render(i)
+            latency.append(time.perf_counter() - ts)
+        total = time.perf_counter() - t1
+        if total >= mintime:
+            return len(latency), total, np.asarray(latency)
+
+
+def spread(values):
+    """
+    Relative spread (max - min) / median of repeated measurements
+    """
+    values = np.asarray(values, dtype='float')
+    med = np.median(values)
+    return float((values.max() - values.min()) / med) if med > 0 else 0.
+
+
+def run_case(name, params, repeat=5, warmup=1, mintime=0.5):
+    """
+    Construct an animator and render all of its frames headlessly, warmup
+    passes first and then repeat timed passes of at least mintime seconds.
+    Returns the setup time, the median frames/s and per-frame latency
+    percentiles over the repeats with their relative spread, and the peak RSS
+    """
+    from animo.export import FrameRenderer
+    import matplotlib.pyplot as plt
+    t0 = time.perf_counter()
+    anim = CASES[name][0](**params)
+    renderer = FrameRenderer(anim)
+    setup = time.perf_counter() - t0
+    for k in range(warmup):
+        render_pass(renderer, anim.nframes)
+    fps, p50, p90, p99 = [], [], [], []
+    for k in range(max(repeat, 1)):
+        nrendered, total, latency = render_pass(renderer, anim.nframes, mintime)
+        fps.append(nrendered / total)
+        for values, q in zip((p50, p90, p99), (50, 90, 99)):
+            values.append(np.percentile(latency, q) * 1e3)
+    renderer.close()
+    plt.close('all')
+    return {'case':name, 'params':params, 'nframes':int(anim.nframes), 'repeat':len(fps), \
+            'setup_s':setup, 'fps':float(np.median(fps)), 'latency_p50_ms':float(np.median(p50)), \
+            'latency_p90_ms':float(np.median(p90)), 'latency_p99_ms':float(np.median(p99)), \
+            'peak_rss_mb':peak_rss_mb(), 'fps_runs':fps, \
+            'spread':{'fps':spread(fps), 'latency_p90_ms':spread(p90)}}
+
+
+def _run_isolated(args):
+    return run_case(*args)
+
+
+# ===== Baseline comparison ===== #
+
+# Metrics compared against the baseline, with +1 if larger is better
+METRICS = {'fps':1, 'latency_p90_ms':-1, 'peak_rss_mb':-1}
+
+
+def case_key(result):
+    return result['case'], json.dumps(result['params'], sort_keys=True)
+
+
+def compare(results, baseline, threshold=0.1):
+    """
+    Relative changes of the median metrics against a baseline, a change is
+    a regression if it is worse than the threshold (a fraction) and than the
+    relative spreads measured over the repeats of both runs together
+    """
+    base = dict((case_key(r), r) for r in baseline['results'])
+    rows, regressions = [], []
+    for r in results:
+        b = base.get(case_key(r))
+        if b is None:
+            continue
+        for metric, sign in METRICS.items():
+            if not b.get(metric):
+                continue
+            change = (r[metric] - b[metric]) / b[metric]
+            noise = r.get('spread', {}).get(metric, 0.) + b.get('spread', {}).get(metric, 0.)
+            regressed = sign * change < -max(threshold, noise)
+            rows.append((r['case'], r['params'], metric, b[metric], r[metric], change, regressed))
+            if regressed:
+                regressions.append(rows[-1])
+    return rows, regressions
+
+
+def format_params(params):
+    return ' '.join('{}={}'.format(k, v) for k, v in sorted(params.items()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the animo animators on Agg.')
+    parser.add_argument('-o', '--output', default='benchmark_results.json', help='JSON file of the results')
+    parser.add_argument('--cases', nargs='*', default=sorted(CASES), choices=sorted(CASES), help='Animator cases to run')
+    parser.add_argument('--quick', action='store_true', help='Run the reduced parameter sweep')
+    parser.add_argument('--baseline', default=None, help='JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1, help='Tolerated relative slowdown')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed passes per case, medians are reported')
+    parser.add_argument('--warmup', type=int, default=1, help='Untimed passes per case before timing')
+    parser.add_argument('--mintime', type=float, default=0.5, help='Minimum seconds of each timed pass')
+    args = parser.parse_args(argv)
+
+    jobs = [(name, params, args.repeat, args.warmup, args.mintime) for name in args.cases \
+            for params in sweep(CASES[name][2 if args.quick else 1])]
+    results = []
+    ctx = mp.get_context('spawn')
+    for job in jobs:
+        # A fresh process per case keeps the peak RSS measurements separate
+        with ctx.Pool(1) as pool:
+            r = pool.apply(_run_isolated, (job,))
+        results.append(r)
+        print('{:22s} {:48s} {:8.1f} fps +/-{:5.1%}  p50 {:7.1f} ms  p90 {:7.1f} ms  {:7.1f} MB'.format(\
+            r['case'], format_params(r['params']), r['fps'], r['spread']['fps'], r['latency_p50_ms'], \
+            r['latency_p90_ms'], r['peak_rss_mb']))
+
+    meta = {'time':time.strftime('%Y-%m-%dT%H:%M:%S'), 'python':platform.python_version(), \
+            'platform':platform.platform(), 'machine':platform.machine(), 'cpus':os.cpu_count(), \
+            'numpy':np.__version__, 'matplotlib':mpl.__version__, 'quick':args.quick, \
+            'repeat':args.repeat, 'warmup':args.warmup, 'mintime':args.mintime}
+    with open(args.output, 'w') as f:
+        json.dump({'meta':meta, 'results':results}, f, indent=1)
+    print('Results written to {}'.format(args.output))
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows, regressions = compare(results, baseline, args.threshold)
+        print('\nComparison with {} (threshold {:.0%})'.format(args.baseline, args.threshold))
+        for case, params, metric, old, new, change, regressed in rows:
+            print('{:22s} {:48s} {:15s} {:10.2f} -> {:10.2f} {:+7.1%}{}'.format(case, \
+                format_params(params), metric, old, new, change, '  REGRESSION' if regressed else ''))
+        if regressions:
+            print('{} regression(s) beyond the threshold'.format(len(regressions)))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,69 @@
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import pytest
+from animo.animo import MultiImageAnimate
+from animo.sources import AtlasSource
+
+
+def panels(counts=(4, 4, 4), shape=(2, 3)):
+    return [np.full((n,) + shape, 1.) * (10*k + np.arange(n)[:, None, None]) \
+            for k, n in enumerate(counts)]
+
+
+def test_tile_placement():
+    atlas = AtlasSource(panels(), ncol=2, gap=1)
+    assert (atlas.nrow, atlas.frameshape) == (2, (5, 7))
+    # The first row of panels is at the top, image rows run from the bottom
+    assert atlas.origins == [(3, 0), (3, 4), (0, 0)]
+    frame = atlas.read(1)
+    assert np.all(frame[3:5, 0:3] == 1.)
+    assert np.all(frame[3:5, 4:7] == 11.)
+    assert np.all(frame[0:2, 0:3] == 21.)
+
+
+def test_gaps_and_empty_tiles_are_nan():
+    frame = AtlasSource(panels(), ncol=2, gap=1).read(0)
+    assert np.all(np.isnan(frame[2, :]))
+    assert np.all(np.isnan(frame[:, 3]))
+    # The last row has a single panel, its second tile stays empty
+    assert np.all(np.isnan(frame[0:2, 4:7]))
+    assert np.isnan(frame).sum() == 7 + 4 + 6
+    with pytest.raises(Exception):
+        AtlasSource([np.zeros((2, 3, 3)), np.zeros((2, 3, 4))], ncol=2)
+
+
+def test_readrange_matches_read():
+    atlas = AtlasSource(panels(), ncol=2, gap=1)
+    block = atlas.readrange(1, 4)
+    assert block.shape == (3, 5, 7)
+    for i in range(1, 4):
+        assert np.array_equal(block[i-1], atlas.read(i), equal_nan=True)
+    # Single frames reuse one buffer, ranges are fresh arrays
+    assert atlas.read(0) is atlas.read(2)
+    assert not np.shares_memory(block, atlas.read(0))
+
+
+def test_panels_with_different_frame_counts():
+    data = panels(counts=(5, 3, 4))
+    atlas = AtlasSource(data, ncol=3)
+    assert atlas.nframes == 3
+    assert np.all(atlas.read(2)[:, 6:9] == 22.)
+    anm = MultiImageAnimate(data, nrow=1, ncol=3, atlas=True, climits='global', \
+                            labels=['a', 'b', 'c'], pyplot=False)
+    assert anm.nframes == 3
+    anm.view_frame(2)
+    shown = np.asarray(anm.inst[0].qmesh.get_array()).reshape(atlas.frameshape)
+    assert np.array_equal(shown, atlas.read(2), equal_nan=True)
+    assert [t.get_text() for t in anm.overlays[1:]] == ['a', 'b', 'c']
+
+
+def test_atlas_labels_start_top_left():
+    anm = MultiImageAnimate(panels(), nrow=2, ncol=2, atlas=True, atlasgap=1, \
+                            labels=['a', 'b', 'c'], pyplot=False)
+    anm.view_frame(0)
+    pos = dict((t.get_text(), t.get_position()) for t in anm.overlays[1:])
+    assert pos['a'] == (0, 4) and pos['b'] == (4, 4) and pos['c'] == (0, 1)
+    # The image origin is at the bottom, so the first panel is drawn at the top
+    ylim = anm.ax.get_ylim()
+    assert ylim[0] < ylim[1]
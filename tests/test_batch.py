@@ -0,0 +1,102 @@
+import matplotlib
+matplotlib.use('Agg')
+import os
+import time
+import pickle
+import numpy as np
+import pytest
+from animo.batch import SharedArray, SharedStore, AnimSpec, attach, is_mapped, run_spec, render_batch
+
+
+class SlowAnimate(object):
+
+    def __init__(self, seconds):
+        time.sleep(seconds)
+
+
+def test_shared_memory_roundtrip():
+    data = np.random.RandomState(0).rand(4, 8, 8)
+    with SharedStore() as store:
+        ref = store.put(data)
+        assert ref.kind == 'shm'
+        assert store.put(data) is ref
+        ref = pickle.loads(pickle.dumps(ref))
+        arr = ref.attach()
+        assert np.array_equal(arr, data)
+        assert not arr.flags.writeable
+        del arr
+        ref.detach()
+
+
+def test_memmap_shared_in_place(tmp_path):
+    path = str(tmp_path / 'data.npy')
+    np.save(path, np.arange(60.).reshape(3, 4, 5))
+    mm = np.load(path, mmap_mode='r')
+    assert is_mapped(mm)
+    assert not is_mapped(mm[1:])
+    with SharedStore() as store:
+        ref = store.put(mm)
+        assert ref.kind == 'memmap' and ref.name == path
+        assert np.array_equal(ref.attach(), mm)
+        fileref = store.put(np.ones((2, 3)), memmap=True)
+        assert fileref.kind == 'memmap'
+        assert np.array_equal(fileref.attach(), np.ones((2, 3)))
+
+
+def test_share_and_attach_nested():
+    big, small = np.ones((64, 64)), np.zeros(3)
+    with SharedStore() as store:
+        shared = store.share({'a':[big, small], 'b':(1, 'x')}, minbytes=1024)
+        assert isinstance(shared['a'][0], SharedArray)
+        assert shared['a'][1] is small
+        refs = []
+        attached = attach(shared, refs)
+        assert len(refs) == 1
+        assert np.array_equal(attached['a'][0], big)
+        assert attached['b'] == (1, 'x')
+        del attached
+        for ref in refs:
+            ref.detach()
+
+
+def test_spec_needs_path():
+    with pytest.raises(Exception):
+        AnimSpec('ImageAnimate')
+
+
+def test_run_spec_with_shared_data(tmp_path):
+    data = np.random.RandomState(1).rand(3, 10, 10)
+    with SharedStore() as store:
+        spec = AnimSpec('ImageAnimate', args=(store.put(data),), kwargs={'pyplot':False}, \
+                        path=str(tmp_path / 'frames'), export={'fps':5})
+        stats = run_spec(spec)
+    assert stats['frames'] == 3
+    assert len(os.listdir(str(tmp_path / 'frames'))) == 3
+
+
+def test_render_batch_statuses(tmp_path):
+    data = np.random.RandomState(2).rand(4, 32, 32)
+    results = []
+    specs = [AnimSpec('ImageAnimate', args=(data,), kwargs={'pyplot':False}, \
+                      path=str(tmp_path / 'a{}'.format(i)), export={'fps':5}) for i in range(2)]
+    specs.append(AnimSpec('NoSuchAnimate', path=str(tmp_path / 'missing')))
+    specs.append(AnimSpec(SlowAnimate, args=(30,), path=str(tmp_path / 'slow'), timeout=0.5))
+    summary = render_batch(specs, workers=2, sharebytes=1024, \
+                           on_result=lambda r, ndone, njobs: results.append(r['status']))
+    assert (summary['done'], summary['failed'], summary['timeout']) == (2, 1, 1)
+    assert summary['frames'] == 8
+    assert sorted(results) == ['done', 'done', 'failed', 'timeout']
+    statuses = [r['status'] for r in summary['results']]
+    assert statuses == ['done', 'done', 'failed', 'timeout']
+    assert 'NoSuchAnimate' in summary['results'][2]['error']
+    assert len(os.listdir(str(tmp_path / 'a1'))) == 4
+
+
+def test_export_workers_clamped(tmp_path):
+    data = np.random.RandomState(3).rand(4, 16, 16)
+    with pytest.warns(UserWarning):
+        spec = AnimSpec('ImageAnimate', args=(data,), kwargs={'pyplot':False}, \
+                        path=str(tmp_path / 'frames'), export={'fps':5, 'workers':2})
+    assert spec.export['workers'] == 1
+    summary = render_batch([spec], workers=1)
+    assert summary['done'] == 1, summary['results'][0]['error']
@@ -0,0 +1,58 @@
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import pytest
+from animo.animo import LineAnimate, MultiLineAnimate, ImageAnimate, MultiImageAnimate
+from animo.export import FrameRenderer
+
+
+def line_anim(**kwargs):
+    x = np.linspace(0, 10, 200)[None, :]
+    y = np.sin(x + 0.2*np.arange(12)[:, None])
+    return LineAnimate(x, y, 12, fixed='x', pyplot=False, **kwargs)
+
+
+def image_anim(**kwargs):
+    data = np.random.RandomState(0).rand(12, 20, 30)
+    return ImageAnimate(data, climits='global', pyplot=False, **kwargs)
+
+
+def multiimage_anim(**kwargs):
+    rs = np.random.RandomState(1)
+    return MultiImageAnimate([rs.rand(12, 10, 10), rs.rand(12, 10, 10)], \
+                climits='global', pyplot=False, **kwargs)
+
+
+def multiline_anim(**kwargs):
+    x = np.linspace(0, 10, 100)[None, :]
+    dataset = [(x, np.cos(x + 0.1*np.arange(12)[:, None] + i)) for i in range(3)]
+    return MultiLineAnimate(dataset, 'x', 12, pyplot=False, **kwargs)
+
+
+MAKERS = [line_anim, image_anim, multiimage_anim, multiline_anim]
+
+
+@pytest.mark.parametrize('make', MAKERS)
+def test_init_returns_dynamic_artists(make):
+    anm = make(blit=True)
+    artists = anm.init_anim()
+    assert len(artists) > 0
+    assert tuple(artists) == tuple(anm.artists())
+
+
+@pytest.mark.parametrize('make', MAKERS)
+def test_blit_matches_full_redraw(make):
+    full = FrameRenderer(make(), blit=False)
+    blit = FrameRenderer(make(), blit=True)
+    assert blit.background is not None
+    for i in (0, 5, 11):
+        assert np.array_equal(full.render(i), blit.render(i))
+    blit.close()
+    assert not any(a.get_animated() for a in blit.artists)
+
+
+def test_line_follows_frames():
+    anm = line_anim(blit=True)
+    anm.animator(0)
+    anm.animator(7)
+    assert np.allclose(anm.lines.get_ydata(), anm.y[7])
@@ -0,0 +1,131 @@
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import os
+import pytest
+from PIL import Image
+from animo.animo import ImageAnimate
+import hashlib
+import time
+from animo.cache import FrameCache, DiskCache, digest_data
+
+
+def image_anim(**kwargs):
+    data = np.random.RandomState(0).rand(6, 10, 12)
+    return ImageAnimate(data, climits='global', figsize=(3, 2), pyplot=False, **kwargs)
+
+
+def frame_shapes(path):
+    return [np.asarray(Image.open(os.path.join(path, n))).shape for n in sorted(os.listdir(path))]
+
+
+def test_lru_budget():
+    cache = FrameCache(maxbytes=3*400)
+    for i in range(5):
+        cache.put(i, np.zeros((10, 10, 4), dtype='uint8'))
+    assert len(cache) == 3 and 0 not in cache and 4 in cache
+    cache.get(2)
+    cache.put(5, np.zeros((10, 10, 4), dtype='uint8'))
+    assert 2 in cache and 3 not in cache
+
+
+@pytest.mark.parametrize('fmt', ['rgba', 'png'])
+def test_cached_frames_equal_rendered(fmt):
+    anm = image_anim()
+    anm.enable_cache(fmt=fmt)
+    first = anm.render_frame(3)
+    assert np.array_equal(anm.render_frame(3), first)
+    assert anm.cache.hits == 1
+    assert np.array_equal(image_anim().render_frame(3), first)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_cache_with_export_at_other_dpi(tmp_path, workers):
+    anm = image_anim()
+    anm.enable_cache()
+    anm.render_frame(0)
+    anm.export(str(tmp_path / 'small'), dpi=50, workers=workers)
+    assert set(frame_shapes(str(tmp_path / 'small'))) == {(100, 150, 4)}
+    # The frames cached at both resolutions are kept apart
+    anm.export(str(tmp_path / 'full'))
+    assert set(frame_shapes(str(tmp_path / 'full'))) == {(200, 300, 4)}
+
+
+def test_key_follows_parameters_and_size():
+    anm = image_anim()
+    anm.enable_cache()
+    key = anm.framekey(2)
+    anm.set_param("cmap = 'gray'")
+    assert len(anm.cache) == 0 and anm.framekey(2) != key
+    key = anm.framekey(2)
+    anm.f.set_size_inches(4, 2)
+    assert anm.framekey(2) != key
+
+
+def test_view_frame_returns_figure_with_and_without_cache():
+    anm = image_anim()
+    assert anm.view_frame(1) == (anm.f, anm.ax)
+    anm.enable_cache()
+    assert anm.view_frame(1) == (anm.f, anm.ax)
+    assert anm.view_frame(1) == (anm.f, anm.ax)
+    assert anm.cache.hits == 1
+
+
+def test_digest_hashes_scalar_leaves():
+    digests = []
+    for value in (['a', 1], ['b', 1], ['a', 2.], {'k':None}):
+        h = hashlib.sha1()
+        assert digest_data(value, h)
+        digests.append(h.hexdigest())
+    assert len(set(digests)) == 4
+
+
+def test_disk_cache_budget(tmp_path):
+    cache = DiskCache(path=str(tmp_path), maxbytes=2500)
+    cache.put('a', b'x'*1000, meta={'n':1})
+    assert cache.get('a') == b'x'*1000 and cache.meta('a') == {'n':1}
+    assert cache.get('b') is None
+    time.sleep(0.05)
+    cache.put('b', b'y'*1000)
+    time.sleep(0.05)
+    cache.meta('a')
+    time.sleep(0.05)
+    cache.put('c', b'z'*1000)
+    assert 'a' in cache and 'b' not in cache and 'c' in cache
+    cache.clear()
+    assert cache.nbytes == 0
+
+
+def test_export_cache_follows_direct_changes(tmp_path):
+    anm = image_anim(text=['a']*6)
+    anm.enable_diskcache(path=str(tmp_path / 'cache'))
+    path = str(tmp_path / 'anim.gif')
+    assert not anm.export(path).get('cached', False)
+    assert anm.export(path).get('cached', False)
+    anm.text = ['x']*6
+    assert not anm.export(path).get('cached', False)
+
+
+def test_colormap_objects_in_key(tmp_path):
+    import matplotlib as mpl
+    keys = [image_anim(cmap=mpl.colormaps[name]).contentkey() for name in ('gray', 'viridis', 'gray')]
+    assert keys[0] is not None and keys[0] != keys[1] and keys[0] == keys[2]
+    cache = str(tmp_path / 'cache')
+    gray, viridis = image_anim(cmap=mpl.colormaps['gray']), image_anim(cmap=mpl.colormaps['viridis'])
+    for anm in (gray, viridis):
+        anm.enable_diskcache(path=cache)
+    gray.export(str(tmp_path / 'gray.gif'))
+    assert not viridis.export(str(tmp_path / 'viridis.gif')).get('cached', False)
+
+
+def test_norms_and_unknown_attributes_in_key():
+    import matplotlib as mpl
+    digests = []
+    for norm in (mpl.colors.Normalize(0, 1), mpl.colors.Normalize(0, 2), mpl.colors.LogNorm(1, 2)):
+        h = hashlib.sha1()
+        assert digest_data(norm, h)
+        digests.append(h.hexdigest())
+    assert len(set(digests)) == 3
+    anm = image_anim()
+    anm.extra = object()
+    assert anm.contentkey() is None
@@ -0,0 +1,55 @@
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib as mpl
+import numpy as np
+import pytest
+from animo import compact as cpt
+from animo.animo import ImageAnimate
+from animo.export import FrameRenderer
+
+
+@pytest.mark.parametrize('dtype,bits', [('uint8', 8), ('uint16', 16)])
+def test_maxerror_bound(dtype, bits):
+    stack = np.random.RandomState(0).uniform(-3, 5, size=(20, 16, 16))
+    anm = ImageAnimate(stack.copy(), climits='global', compact=dtype, pyplot=False)
+    vmin, vmax = stack.min(), stack.max()
+    assert anm.data.dtype == np.dtype(dtype)
+    assert anm.maxerror == pytest.approx((vmax - vmin) / (2 * (2**bits - 2)))
+    error = np.abs(cpt.decode(anm.data, anm.scale, anm.offset) - stack)
+    assert error.max() <= anm.maxerror * (1 + 1e-9)
+
+
+@pytest.mark.parametrize('dtype', ['uint8', 'uint16'])
+def test_nan_and_clamping(dtype):
+    stack = np.array([[[np.nan, np.inf, -5.], [0., 0.5, 1.], [2., -np.inf, 0.25]]])
+    codes, scale, offset = cpt.quantize_stack(stack, 0., 1., dtype)
+    nancode = cpt.nan_code(dtype)
+    assert codes[0, 0, 0] == nancode and codes[0, 0, 1] == nancode and codes[0, 2, 1] == nancode
+    values = cpt.decode(codes, scale, offset)
+    assert np.isnan(values[0, 0, 0]) and np.isnan(values[0, 2, 1])
+    # Values beyond the limits are clamped to them
+    assert values[0, 0, 2] == 0. and values[0, 2, 0] == pytest.approx(1.)
+    assert np.nanmax(values) <= 1. + 1e-12
+    with pytest.raises(Exception):
+        cpt.quantize_stack(stack, 0., 1., 'int32')
+
+
+def test_compact_norm_in_data_units():
+    codes, scale, offset = cpt.quantize_stack(np.linspace(2., 4., 12).reshape(1, 3, 4), 2., 4.)
+    datanorm = mpl.colors.Normalize(vmin=2., vmax=4.)
+    norm = cpt.CompactNorm(datanorm, scale, offset, cpt.nan_code('uint8'))
+    assert np.allclose(norm(codes), datanorm(cpt.decode(codes, scale, offset)), atol=1e-6)
+    masked = norm(np.array([0, 255], dtype='uint8'))
+    assert masked.mask.tolist() == [False, True]
+    assert norm.inverse(0.5) == pytest.approx((3. - offset) / scale)
+
+
+def test_colorbar_stays_in_data_units():
+    stack = np.random.RandomState(1).uniform(10., 20., size=(4, 8, 8))
+    anm = ImageAnimate(stack, climits='global', compact='uint8', colorbar=True, pyplot=False)
+    reference = ImageAnimate(stack, climits='global', colorbar=True, pyplot=False)
+    FrameRenderer(anm).render(1)
+    FrameRenderer(reference).render(1)
+    assert anm.cbar.mappable.norm.vmin == pytest.approx(stack.min())
+    assert anm.cbar.mappable.norm.vmax == pytest.approx(stack.max())
+    assert anm.cbar.ax.get_ylim() == pytest.approx(reference.cbar.ax.get_ylim())
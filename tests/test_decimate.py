@@ -0,0 +1,52 @@
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import pytest
+from animo.decimate import decimate_lines
+from animo.animo import LineAnimate
+from animo.export import FrameRenderer
+
+
+def signal(n=20000, nlines=3):
+    x = np.linspace(0, 10, n)
+    rs = np.random.RandomState(0)
+    return x, np.cumsum(rs.randn(nlines, n), axis=1)
+
+
+def test_minmax_keeps_extrema_and_endpoints():
+    x, Y = signal()
+    xd, Yd = decimate_lines(x, Y, (0, 10), 100, 'minmax')
+    assert xd.size <= 4 * 100 and Yd.shape == (3, xd.size)
+    assert np.array_equal(Yd.min(axis=1), Y.min(axis=1))
+    assert np.array_equal(Yd.max(axis=1), Y.max(axis=1))
+    assert xd[0] == x[0] and xd[-1] == x[-1]
+
+
+def test_lttb_preserves_endpoints():
+    x, Y = signal()
+    xd, Yd = decimate_lines(x, Y, (0, 10), 50, 'lttb')
+    assert xd.shape == Yd.shape == (3, 100)
+    assert np.all(xd[:, 0] == x[0]) and np.all(xd[:, -1] == x[-1])
+    assert np.array_equal(Yd[:, 0], Y[:, 0]) and np.array_equal(Yd[:, -1], Y[:, -1])
+    assert np.all(np.diff(xd, axis=1) > 0)
+
+
+def test_window_and_short_lines():
+    x, Y = signal()
+    xd, Yd = decimate_lines(x, Y, (2, 3), 100, 'minmax')
+    assert xd[0] <= 2 and xd[-1] >= 3 and xd.size < x.size
+    xs, Ys = decimate_lines(x[:50], Y[:, :50], (0, 10), 100, 'lttb')
+    assert np.array_equal(Ys, Y[:, :50])
+    with pytest.raises(Exception):
+        decimate_lines(x, Y, (0, 10), 100, 'mean')
+
+
+def test_decimated_line_draws_like_full_line():
+    x, Y = signal(n=50000, nlines=4)
+    full = LineAnimate(x[None, :], Y, 4, pyplot=False)
+    dec = LineAnimate(x[None, :], Y, 4, decimate='minmax', pyplot=False)
+    a, b = FrameRenderer(full), FrameRenderer(dec)
+    assert np.array_equal(full.ax.get_ylim(), dec.ax.get_ylim())
+    ia, ib = a.render(2), b.render(2)
+    assert len(dec.lines.get_xdata()) < x.size / 10
+    assert np.mean(np.any(ia != ib, axis=2)) < 0.01
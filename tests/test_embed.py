@@ -0,0 +1,56 @@
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import io
+import pytest
+from base64 import b64decode
+from PIL import Image
+from animo.embed import encode_frame, embed_frames, pack_payloads, unpack_payloads
+
+
+def frames():
+    rs = np.random.RandomState(0)
+    a, b = [(rs.rand(12, 16, 4)*255).astype('uint8') for i in range(2)]
+    return [a, a.copy(), b, a]
+
+
+def decode(payload):
+    return Image.open(io.BytesIO(b64decode(payload.split(',', 1)[1])))
+
+
+def test_identical_frames_embedded_once():
+    payloads, index = embed_frames(frames())
+    assert len(payloads) == 2 and index == [0, 0, 1, 0]
+    assert np.array_equal(np.asarray(decode(payloads[1])), frames()[2])
+    payloads, index = embed_frames(frames(), dedup=False)
+    assert len(payloads) == 4 and index == [0, 1, 2, 3]
+
+
+@pytest.mark.parametrize('fmt, mime', [('png', 'png'), ('jpeg', 'jpeg'), ('webp', 'webp')])
+def test_lossy_formats(fmt, mime):
+    payloads, index = embed_frames(frames(), fmt=fmt, quality=50)
+    assert payloads[0].startswith('data:image/{};base64,'.format(mime))
+    assert decode(payloads[0]).size == (16, 12)
+
+
+def test_downscaled_width():
+    img = decode(embed_frames(frames(), width=8)[0][0])
+    assert img.size == (8, 6)
+    with pytest.raises(Exception):
+        encode_frame(frames()[0], fmt='bmp')
+
+
+def test_pack_roundtrip():
+    payloads, index = embed_frames(frames(), fmt='jpeg')
+    assert unpack_payloads(pack_payloads(payloads, index)) == (payloads, index)
+
+
+def test_html_player_index():
+    pytest.importorskip('JSAnimation')
+    from animo.animo import ImageAnimate
+    from animo.embed import anim_to_html
+    data = np.zeros((6, 4, 4))
+    data[3:] = 1
+    anm = ImageAnimate(data, vmin=0, vmax=1, figsize=(2, 2), pyplot=False)
+    html = anim_to_html(anm, verbose=False)
+    assert 'var index = [0,0,0,1,1,1];' in html
@@ -0,0 +1,47 @@
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import pytest
+from animo.animo import ImageAnimate, CompositePlotAnimate
+from animo.export import FrameRenderer
+
+
+def stack(nframes=6, nr=16, nc=24):
+    return np.random.RandomState(0).rand(nframes, nr, nc)
+
+
+def test_engine_selection():
+    assert ImageAnimate(stack(), pyplot=False).engine == 'imshow'
+    uneven = np.cumsum(np.arange(1, 25))
+    assert ImageAnimate(stack(), imx=uneven, pyplot=False).engine == 'pcolormesh'
+    with pytest.raises(Exception):
+        ImageAnimate(stack(), imx=uneven, engine='imshow', pyplot=False)
+
+
+@pytest.mark.parametrize('engine', ['imshow', 'pcolormesh', 'raster'])
+def test_engines_render_same_frames(engine):
+    anm = ImageAnimate(stack(), engine=engine, climits='global', pyplot=False)
+    ref = ImageAnimate(stack(), engine='imshow', climits='global', pyplot=False)
+    frames = [FrameRenderer(anm).render(i) for i in range(anm.nframes)]
+    refs = [FrameRenderer(ref).render(i) for i in range(ref.nframes)]
+    assert len(frames) == len(refs) == 6
+    assert all(f.shape == r.shape for f, r in zip(frames, refs))
+    # Same axes decoration, only the image pixels can differ between engines
+    bbox = anm.ax.bbox
+    h = frames[0].shape[0]
+    outside = np.ones(frames[0].shape[:2], dtype=bool)
+    outside[int(h - bbox.y1) - 2:int(np.ceil(h - bbox.y0)) + 2, int(bbox.x0) - 2:int(np.ceil(bbox.x1)) + 2] = False
+    assert np.array_equal(frames[3][outside], refs[3][outside])
+
+
+@pytest.mark.parametrize('engine', ['imshow', 'pcolormesh', 'raster'])
+def test_composite_line_above_image(engine):
+    data = np.zeros((4, 20, 30))
+    x = np.linspace(0, 29, 60)[None, :]
+    y = 10. + 3*np.sin(x/4. + np.arange(4)[:, None])
+    anm = CompositePlotAnimate(x, y, data, engine=engine, cmap='gray', climits='global', \
+                linecolor='r', vmin=-1, vmax=1, pyplot=False)
+    img = FrameRenderer(anm).render(2)
+    red = (img[..., 0] > 200) & (img[..., 1] < 60) & (img[..., 2] < 60)
+    assert red.sum() > 100
+    assert anm.lines.get_zorder() > anm.qmesh.get_zorder()
@@ -0,0 +1,122 @@
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import os
+import pytest
+from PIL import Image
+from animo.animo import ImageAnimate, LineAnimate
+from animo.export import FrameRenderer
+
+
+def image_anim(**kwargs):
+    data = np.random.RandomState(0).rand(8, 12, 16)
+    return ImageAnimate(data, climits='global', figsize=(3, 3), pyplot=False, **kwargs)
+
+
+def read_pngs(path):
+    names = sorted(os.listdir(path))
+    return [np.asarray(Image.open(os.path.join(path, n))) for n in names]
+
+
+def test_png_export_parity_across_workers(tmp_path):
+    serial = image_anim().export(str(tmp_path / 'serial'))
+    parallel = image_anim().export(str(tmp_path / 'parallel'), workers=2)
+    assert serial['frames'] == parallel['frames'] == 8
+    a, b = read_pngs(str(tmp_path / 'serial')), read_pngs(str(tmp_path / 'parallel'))
+    assert len(a) == len(b) == 8
+    assert all(np.array_equal(x, y) for x, y in zip(a, b))
+
+
+def test_gif_export_frame_count(tmp_path):
+    path = str(tmp_path / 'anim.gif')
+    stats = image_anim().export(path, frames=range(5))
+    assert stats['frames'] == 5
+    with Image.open(path) as gif:
+        assert gif.n_frames == 5
+
+
+def test_export_dpi_leaves_figure_unchanged(tmp_path):
+    anm = image_anim()
+    dpi = anm.f.dpi
+    anm.export(str(tmp_path / 'small'), dpi=30, frames=range(2))
+    assert anm.f.dpi == dpi
+    assert read_pngs(str(tmp_path / 'small'))[0].shape[:2] == (90, 90)
+
+
+def test_renderer_restores_dpi_on_errors(tmp_path):
+    anm = image_anim()
+    dpi = anm.f.dpi
+    with pytest.raises(IndexError):
+        anm.export(str(tmp_path / 'broken.gif'), dpi=30, frames=[0, 100])
+    assert anm.f.dpi == dpi
+
+    def broken(iframe):
+        raise ValueError('broken animator')
+    anm.animator = broken
+    with pytest.raises(ValueError):
+        FrameRenderer(anm, dpi=30)
+    assert anm.f.dpi == dpi
+
+
+def test_line_export_shapes(tmp_path):
+    x = np.linspace(0, 1, 50)[None, :]
+    anm = LineAnimate(x, x**np.arange(1, 5)[:, None], 4, figsize=(2, 2), pyplot=False)
+    anm.export(str(tmp_path / 'lines'), dpi=50)
+    frames = read_pngs(str(tmp_path / 'lines'))
+    assert len(frames) == 4 and all(f.shape == (100, 100, 4) for f in frames)
+
+
+def test_chunks_submitted_in_bounded_window():
+    from concurrent.futures import Future
+    from animo.export import _bounded_map
+
+    class Pool(object):
+        submitted = 0
+
+        def submit(self, func, chunk):
+            self.submitted += 1
+            future = Future()
+            future.set_result(func(chunk))
+            return future
+
+    pool, consumed, ahead = Pool(), 0, []
+    chunks = [[i, i + 1] for i in range(0, 40, 2)]
+    for item in _bounded_map(pool, list, chunks, window=4):
+        consumed += 1
+        ahead.append(pool.submitted - (consumed + 1) // 2)
+    assert consumed == 40 and max(ahead) <= 4
+
+
+def test_gif_frames_streamed_to_disk(tmp_path):
+    from animo.export import GIFFrameWriter
+    rs = np.random.RandomState(0)
+    writer = GIFFrameWriter(str(tmp_path / 'stream.gif'), fps=10)
+    sizes = []
+    for i in range(4):
+        writer.write((rs.rand(20, 30, 4)*255).astype('uint8'))
+        sizes.append(writer.file.tell())
+    writer.close()
+    assert sizes == sorted(sizes) and sizes[0] > 0
+    with Image.open(str(tmp_path / 'stream.gif')) as gif:
+        assert gif.n_frames == 4 and gif.info['duration'] == 100 and gif.info['loop'] == 0
+
+
+def test_pipeline_keeps_producer_error():
+    from animo.export import EncoderPipeline
+
+    class FailingWriter(object):
+        nbytes = 0
+
+        def write(self, img):
+            return
+
+        def close(self):
+            raise IOError('writer failed')
+
+    with pytest.raises(ValueError, match='producer'):
+        with EncoderPipeline(FailingWriter()) as pipe:
+            pipe.put(np.zeros((2, 2, 4), dtype='uint8'))
+            raise ValueError('producer failed')
+    with pytest.raises(IOError, match='writer'):
+        with EncoderPipeline(FailingWriter()) as pipe:
+            pipe.put(np.zeros((2, 2, 4), dtype='uint8'))
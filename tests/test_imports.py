@@ -0,0 +1,33 @@
+import os
+import sys
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_fresh(code):
+    env = dict(os.environ, PYTHONPATH=ROOT, MPLBACKEND='Agg')
+    proc = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, \
+                          capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+    return proc.stdout
+
+
+def test_import_leaves_pyplot_unloaded():
+    out = run_fresh(
+        "import sys\n"
+        "import animo\n"
+        "print('IPython' in sys.modules, 'matplotlib.pyplot' in sys.modules, "
+        "'matplotlib.animation' in sys.modules)\n")
+    assert out.split() == ['False', 'False', 'False']
+
+
+def test_new_figure_without_pyplot():
+    out = run_fresh(
+        "import sys\n"
+        "from animo.animo import new_figure\n"
+        "f, ax = new_figure((2, 2), pyplot=False)\n"
+        "f, axs = new_figure((2, 2), 1, 2)\n"
+        "f.canvas.draw()\n"
+        "print(len(axs), 'matplotlib.pyplot' in sys.modules)\n")
+    assert out.split() == ['2', 'False']
@@ -0,0 +1,71 @@
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import pytest
+from animo.animo import ImageAnimate, MultiImageAnimate, StackLimits
+from animo.export import FrameRenderer
+
+
+def stack():
+    return np.random.RandomState(0).rand(20, 8, 9)
+
+
+def test_limits_match_numpy():
+    data = stack()
+    lim = StackLimits(data, chunksize=3)
+    assert lim.get() == (data.min(), data.max())
+    assert np.allclose(lim.fmin, data.min(axis=(1, 2)))
+    assert lim.get(7) == (data[7].min(), data[7].max())
+
+
+def test_percentile_limits():
+    data = stack()
+    data[4, 0, 0] = 1e6
+    lim = StackLimits(data, percentile=(1, 99))
+    assert lim.get()[1] < 2
+    assert np.allclose(lim.get(4), np.percentile(data[4], (1, 99)))
+
+
+def test_all_nan_frame_is_skipped():
+    data = stack()
+    data[3] = np.nan
+    for percentile in (None, (1, 99)):
+        vmin, vmax = StackLimits(data, percentile=percentile).get()
+        assert np.isfinite(vmin) and np.isfinite(vmax) and vmin < vmax
+
+
+def test_all_nan_stack():
+    lim = StackLimits(np.full((3, 4, 4), np.nan))
+    assert lim.get() == (0., 1.)
+    anm = ImageAnimate(np.full((3, 4, 4), np.nan), climits='global', pyplot=False)
+    assert FrameRenderer(anm).render(1).shape[2] == 4
+
+
+def test_nan_frame_renders_others():
+    data = stack()
+    data[0] = np.nan
+    anm = ImageAnimate(data, climits='global', pyplot=False)
+    ref = ImageAnimate(stack(), climits='global', pyplot=False)
+    anm.animator(0)
+    assert np.isfinite(anm.norm.vmin) and np.isfinite(anm.norm.vmax)
+    assert np.array_equal(FrameRenderer(anm).render(5), FrameRenderer(ref).render(5))
+
+
+def test_merged_limits_shared_norm():
+    rs = np.random.RandomState(2)
+    a, b = rs.rand(5, 4, 4), 2 + rs.rand(5, 4, 4)
+    b[1] = np.nan
+    anm = MultiImageAnimate([a, b], climits='global', sharenorm=True, pyplot=False)
+    assert anm.inst[0].norm is anm.inst[1].norm
+    assert (anm.inst[0].norm.vmin, anm.inst[0].norm.vmax) == (a.min(), np.nanmax(b))
+    assert np.all(np.isfinite(anm.inst[0].limits.fmin))
+
+
+@pytest.mark.parametrize('climits', ['global', 'frame'])
+def test_frame_norms(climits):
+    data = stack()
+    anm = ImageAnimate(data, climits=climits, pyplot=False)
+    anm.animator(0)
+    anm.animator(5)
+    expect = (data.min(), data.max()) if climits == 'global' else (data[5].min(), data[5].max())
+    assert (anm.norm.vmin, anm.norm.vmax) == expect
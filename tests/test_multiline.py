@@ -0,0 +1,47 @@
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import pytest
+from animo.animo import MultiLineAnimate
+from animo.export import FrameRenderer
+
+
+def dataset(ntraces=3, nframes=5):
+    x = np.linspace(0, 10, 100)[None, :]
+    return [(x, np.sin(x + 0.3*np.arange(nframes)[:, None] + i)) for i in range(ntraces)]
+
+
+def test_collection_segments_follow_frames():
+    anm = MultiLineAnimate(dataset(), 'x', 5, collection=True, pyplot=False)
+    anm.animator(0)
+    anm.animator(3)
+    segs = anm.lines.get_segments()
+    assert len(segs) == 3
+    assert np.allclose(segs[1][:, 1], dataset()[1][1][3])
+
+
+def test_collection_matches_separate_lines():
+    opts = dict(linecolors=['r', 'g', 'b'], linewidths=[1, 2, 3], pyplot=False)
+    lines = FrameRenderer(MultiLineAnimate(dataset(), 'x', 5, **opts))
+    coll = FrameRenderer(MultiLineAnimate(dataset(), 'x', 5, collection=True, **opts))
+    a, b = lines.render(2), coll.render(2)
+    assert a.shape == b.shape
+    assert np.mean(np.any(a != b, axis=2)) < 0.01
+
+
+def test_collection_legend_and_zorder():
+    anm = MultiLineAnimate(dataset(), 'x', 5, collection=True, labels=['a', '', 'c'], \
+                linecolors=['r', 'g', 'b'], legend=True, zorder=3, pyplot=False)
+    anm.animator(0)
+    legend = anm.ax.get_legend()
+    assert [t.get_text() for t in legend.get_texts()] == ['a', 'c']
+    assert [h.get_color() for h in legend.legend_handles] == ['r', 'b']
+    assert anm.lines.get_zorder() == 3
+
+
+def test_collection_rejects_per_trace_zorders():
+    with pytest.raises(Exception, match='zorder'):
+        MultiLineAnimate(dataset(), 'x', 5, collection=True, zorders=[0, 1, 2], pyplot=False)
+    anm = MultiLineAnimate(dataset(), 'x', 5, zorders=[3, 2, 1], pyplot=False)
+    anm.animator(0)
+    assert [inst.lines.get_zorder() for inst in anm.inst] == [3, 2, 1]
@@ -0,0 +1,49 @@
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import pytest
+from animo.animo import OrthoSliceAnimate
+from animo.export import FrameRenderer
+
+
+def volume():
+    return np.random.RandomState(0).rand(6, 8, 10)
+
+
+def test_sweep_positions():
+    anm = OrthoSliceAnimate(volume(), sweep='x', pyplot=False)
+    assert anm.nframes == 10
+    assert anm.positions(7) == (3, 4, 7)
+    anm = OrthoSliceAnimate(volume(), pyplot=False)
+    assert anm.nframes == 10
+    assert anm.positions(9) == (5, 7, 9)
+
+
+@pytest.mark.parametrize('sweep', ['zy', '', 'w', 0])
+def test_sweep_validated(sweep):
+    with pytest.raises(Exception, match='sweep'):
+        OrthoSliceAnimate(volume(), sweep=sweep, pyplot=False)
+
+
+def test_planes_follow_the_volume():
+    vol = volume()
+    anm = OrthoSliceAnimate(vol, sweep='y', cursor=(1, 2, 3), pyplot=False)
+    renderer = FrameRenderer(anm)
+    renderer.render(5)
+    planes = [inst.qmesh.get_array() for inst in anm.inst]
+    for plane, expected in zip(planes, (vol[1], vol[:, 5], vol[:, :, 3])):
+        assert np.allclose(np.asarray(plane).reshape(expected.shape), expected)
+    assert not anm.changed(5) and anm.changed(6)
+
+
+def test_contiguous_files_per_plane(tmp_path):
+    import os
+    path = str(tmp_path / 'v.npy')
+    vol = volume()
+    OrthoSliceAnimate(vol, contiguous=path, pyplot=False)
+    files = [str(tmp_path / 'v.axis{}.npy'.format(k)) for k in (1, 2)]
+    assert all(os.path.exists(f) for f in files) and not os.path.exists(path)
+    mtimes = [os.path.getmtime(f) for f in files]
+    anm = OrthoSliceAnimate(vol, contiguous=path, pyplot=False)
+    assert [os.path.getmtime(f) for f in files] == mtimes
+    assert np.array_equal(np.asarray(anm.inst[2].data[4]), vol[:, :, 4])
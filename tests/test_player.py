@@ -0,0 +1,65 @@
+import matplotlib
+matplotlib.use('Agg')
+import time
+import numpy as np
+import pytest
+from animo.animo import ImageAnimate
+from animo.player import FramePlayer
+
+
+def image_anim():
+    data = np.random.RandomState(0).rand(30, 16, 16)
+    return ImageAnimate(data, climits='global', figsize=(2, 2), pyplot=False)
+
+
+def wait_idle(player, timeout=10.):
+    tend = time.time() + timeout
+    last = -1
+    while time.time() < tend and player.rendered != last:
+        last = player.rendered
+        time.sleep(0.2)
+
+
+def test_prefetch_window():
+    player = FramePlayer(image_anim(), prefetch=3)
+    wait_idle(player)
+    assert all(player.frame(i) is not None for i in range(4))
+    player.seek(10)
+    wait_idle(player)
+    assert all(player.frame(i) is not None for i in range(10, 14))
+    player.close()
+
+
+def test_prefetch_shrinks_to_budget():
+    probe = FramePlayer(image_anim(), prefetch=0)
+    framebytes = len(probe.frame(0))
+    probe.close()
+    with pytest.warns(UserWarning):
+        player = FramePlayer(image_anim(), prefetch=20, maxbytes=4*framebytes)
+    assert player.prefetch < 4
+    wait_idle(player)
+    # Frames evicted from the cache are not rendered over and over
+    assert player.rendered <= 1 + 20
+    assert player.frame(0) is not None
+    player.close()
+
+
+def test_frame_beyond_budget():
+    with pytest.raises(Exception):
+        FramePlayer(image_anim(), maxbytes=100)
+
+
+def test_failing_frame_keeps_rendering():
+    def read(i):
+        if i == 2:
+            raise IOError('unreadable frame')
+        return np.full((8, 8), i / 10.)
+    player = FramePlayer(ImageAnimate(read, nframes=10, vmin=0, vmax=1, pyplot=False), prefetch=4)
+    wait_idle(player)
+    assert isinstance(player.errors.get(2), IOError) and player.error is player.errors[2]
+    assert player.frame(2) is None
+    assert all(player.frame(i) is not None for i in (0, 1, 3, 4))
+    player.seek(6)
+    wait_idle(player)
+    assert all(player.frame(i) is not None for i in range(6, 10))
+    player.close()
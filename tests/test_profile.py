@@ -0,0 +1,74 @@
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import pytest
+from animo.animo import LineAnimate, ImageAnimate, MultiImageAnimate
+
+
+def line_anim(**kwargs):
+    x = np.linspace(0, 10, 200)[None, :]
+    y = np.sin(x + 0.2*np.arange(8)[:, None])
+    return LineAnimate(x, y, 8, fixed='x', pyplot=False, **kwargs)
+
+
+@pytest.mark.parametrize('blit', [False, True])
+def test_live_view_times_the_draw(blit):
+    anm = line_anim(blit=blit)
+    prof = anm.enable_profiling()
+    anm.view_anim(blit=blit)
+    for _ in range(4):
+        anm.anim._step()
+    stats = prof.summary()
+    assert stats['draw']['count'] == 4
+    assert stats['frame']['count'] == 4
+    assert stats['draw']['total'] > 0
+    assert prof.current is None
+    for timings in prof.frame_timings().values():
+        assert timings['draw'] <= timings['frame']
+
+
+def test_live_view_times_the_blit_of_every_axes():
+    rs = np.random.RandomState(0)
+    anm = MultiImageAnimate([rs.rand(6, 8, 8), rs.rand(6, 8, 8)], pyplot=False, blit=True)
+    prof = anm.enable_profiling()
+    anm.view_anim(blit=True)
+    for _ in range(3):
+        anm.anim._step()
+    stats = prof.summary()
+    assert stats['frame']['count'] == 3 and prof.current is None
+    assert all(len([e for e in prof.events if e[0] == i and e[1] == 'draw']) == 2 \
+               for i in prof.frame_timings())
+
+
+def test_redraw_outside_frames_is_not_recorded():
+    anm = line_anim()
+    prof = anm.enable_profiling()
+    anm.view_anim()
+    anm.f.canvas.draw()
+    assert prof.events == []
+    anm.disable_profiling()
+    assert 'draw' not in vars(anm.f.canvas) and 'blit' not in vars(anm.f.canvas)
+    anm.anim._step()
+    assert prof.events == []
+
+
+@pytest.mark.parametrize('make', [line_anim, \
+        lambda **kw: ImageAnimate(np.random.RandomState(0).rand(8, 6, 6), pyplot=False, **kw)])
+def test_view_frame_and_export_after_live_view(make, tmp_path):
+    anm = make()
+    prof = anm.enable_profiling()
+    anm.view_anim()
+    anm.anim._step()
+    anm.view_frame(2)
+    anm.export(str(tmp_path / 'frames'), fps=10)
+    assert len([e for e in prof.events if e[1] == 'frame']) == 2 + anm.nframes
+    assert prof.current is None and prof.end_frame() is None
+
+
+def test_export_profile_phases(tmp_path):
+    anm = line_anim()
+    prof = anm.enable_profiling()
+    anm.export(str(tmp_path / 'frames'), fps=10)
+    stats = prof.summary()
+    assert stats['frame']['count'] == anm.nframes
+    assert 'draw' in stats and 'encode' in stats
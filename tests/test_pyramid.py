@@ -0,0 +1,62 @@
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import pytest
+from animo.animo import ImageAnimate
+from animo.pyramid import FramePyramid, block_reduce
+
+
+def test_block_reduce_ragged_edges():
+    frame = np.arange(25.).reshape(5, 5)
+    mean = block_reduce(frame, 2)
+    assert mean.shape == (3, 3)
+    assert mean[0, 0] == np.mean([0, 1, 5, 6])
+    # The last row and column are repeated into the ragged blocks
+    assert mean[0, 2] == np.mean([4, 4, 9, 9])
+    assert mean[2, 2] == 24
+    maxima = block_reduce(frame[None], 2, method='max')
+    assert maxima.shape == (1, 3, 3)
+    assert maxima[0, 1, 0] == 16 and maxima[0, 2, 1] == 23
+    assert block_reduce(frame, 1).shape == (5, 5)
+    assert block_reduce(frame.astype('uint8'), 2).dtype == np.float32
+
+
+def test_eager_matches_lazy():
+    stack = np.random.RandomState(0).rand(5, 70, 90)
+    eager = FramePyramid(stack, method='max', eager=True, chunksize=2)
+    lazy = FramePyramid(stack, method='max', cachesize=3)
+    assert eager.nlevels == lazy.nlevels == 3
+    for i in range(5):
+        for k in range(eager.nlevels + 1):
+            assert np.array_equal(eager.get(i, k), lazy.get(i, k))
+    assert len(lazy._cache) == 3
+    with pytest.raises(Exception):
+        FramePyramid(stack, method='median')
+
+
+def pyramid_anim(**kwargs):
+    data = np.random.RandomState(1).rand(2, 512, 512)
+    return ImageAnimate(data, pyramid='mean', figsize=(2, 2), pyplot=False, **kwargs)
+
+
+@pytest.mark.parametrize('mode', ['lazy', 'eager'])
+def test_display_level_of_small_axes(mode):
+    anm = pyramid_anim(pyramidmode=mode)
+    anm.view_frame(0)
+    assert anm.level >= 1
+    shown = np.asarray(anm.qmesh.get_array())
+    assert shown.shape == (512 // 2**anm.level,)*2
+    assert np.allclose(shown, anm._pyr.get(0, anm.level))
+
+
+def test_refinement_after_zoom():
+    anm = pyramid_anim()
+    anm.view_frame(1)
+    coarse = anm.level
+    anm.ax.set_xlim(0, anm.extent[1] / 16.)
+    anm.ax.set_ylim(0, anm.extent[3] / 16.)
+    assert anm.level < coarse
+    assert np.asarray(anm.qmesh.get_array()).shape == (512 // 2**anm.level,)*2
+    anm.ax.set_xlim(anm.extent[0], anm.extent[1])
+    anm.ax.set_ylim(anm.extent[2], anm.extent[3])
+    assert anm.level == coarse
@@ -0,0 +1,83 @@
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib as mpl
+import numpy as np
+from animo import raster
+from animo.animo import ImageAnimate
+from animo.export import FrameRenderer
+
+
+def test_lut_matches_colormap():
+    lut = raster.colormap_lut('viridis')
+    assert lut.shape == (256, 4) and lut.dtype == np.uint8
+    cmap = mpl.colormaps['viridis']
+    assert np.array_equal(lut[0], np.round(np.array(cmap(0.)) * 255))
+    assert np.array_equal(lut[raster.NLEVELS - 1], np.round(np.array(cmap(1.)) * 255))
+    assert np.array_equal(lut[raster.BADCODE], np.round(np.array(cmap.get_bad()) * 255))
+
+
+def test_quantize_codes():
+    norm = mpl.colors.Normalize(vmin=0, vmax=1)
+    frame = np.array([[-1., 0., 0.5], [1., 2., np.nan]])
+    codes = raster.quantize(frame, norm)
+    assert codes.dtype == np.uint8
+    assert codes.tolist() == [[0, 0, 127], [254, 254, raster.BADCODE]]
+
+
+def test_colorize_and_composite():
+    lut = raster.colormap_lut('gray')
+    codes = np.array([[0, 254], [raster.BADCODE, 127]], dtype='uint8')
+    assert np.array_equal(raster.colorize(codes, lut), lut[codes])
+    region = np.full((2, 2, 4), 255, dtype='uint8')
+    raster.composite(region, codes, lut)
+    # Bad values are transparent in gray and keep the background
+    assert np.array_equal(region[1, 0], [255, 255, 255, 255])
+    assert np.array_equal(region[0, 0], lut[0])
+
+
+def test_grid_index():
+    axis = np.arange(5.)
+    idx = raster.grid_index(axis, [-0.6, -0.4, 0.49, 0.51, 4.4, 4.6])
+    assert idx.tolist() == [-1, 0, 0, 1, 4, -1]
+    assert raster.grid_index(axis[::-1], [0., 4.]).tolist() == [4, 0]
+
+
+def test_raster_engine_close_to_imshow():
+    data = np.random.RandomState(0).rand(4, 30, 40)
+    frames = {}
+    for engine in ('imshow', 'raster'):
+        anm = ImageAnimate(data, engine=engine, climits='global', cmap='viridis', pyplot=False)
+        frames[engine] = FrameRenderer(anm).render(2).astype(int)
+    diff = np.abs(frames['imshow'] - frames['raster'])
+    # Quantization to 255 levels and pixel snapping only change a few pixels
+    assert diff.shape[2] == 4
+    assert np.mean(diff.max(axis=2) > 8) < 0.02
+
+
+def full_draw(anm, iframe):
+    anm.view_frame(iframe)
+    anm.f.canvas.draw()
+    return np.array(anm.f.canvas.buffer_rgba())
+
+
+def test_render_frame_leaves_figure_drawable():
+    data = np.random.RandomState(3).rand(5, 20, 30)
+    make = lambda: ImageAnimate(data, climits='global', engine='raster', pyplot=False)
+    anm = make()
+    first = anm.render_frame(2)
+    assert not any(a.get_animated() for a in anm.f.findobj())
+    assert np.array_equal(full_draw(anm, 2), full_draw(make(), 2))
+    assert np.array_equal(anm.render_frame(2), first)
+    assert np.array_equal(full_draw(anm, 3), full_draw(make(), 3))
+    renderer = anm._renderer
+    anm.reset()
+    assert renderer.closed
+    assert not any(a.get_animated() for a in renderer.layers)
+
+
+def test_render_frame_after_resize():
+    anm = ImageAnimate(np.random.RandomState(4).rand(3, 10, 10), engine='raster', \
+                       figsize=(3, 2), pyplot=False)
+    assert anm.render_frame(0).shape == (200, 300, 4)
+    anm.f.set_size_inches(2, 2)
+    assert anm.render_frame(1).shape == (200, 200, 4)
@@ -0,0 +1,76 @@
+import matplotlib
+matplotlib.use('Agg')
+import os
+import time
+import numpy as np
+import pytest
+from animo import schedule
+from animo.animo import ImageAnimate
+from animo.schedule import PlaybackScheduler, plan_frames, plan_export
+
+
+def image_anim(nframes=12):
+    data = np.random.RandomState(0).rand(nframes, 8, 8)
+    return ImageAnimate(data, climits='global', pyplot=False)
+
+
+def test_plan_frames_subsample_and_repeat():
+    assert plan_frames(10, 4) == [0, 3, 6, 9]
+    assert plan_frames(3, 6) == [0, 0, 1, 1, 2, 2]
+    assert plan_frames(0, 3, frames=[5, 7, 9]) == [5, 7, 9]
+    assert plan_frames(5, 0) == [0]
+
+
+def test_slow_playback_skips_and_ends_on_last():
+    sched = PlaybackScheduler(range(20), fps=100)
+    shown = []
+    for i in sched:
+        shown.append(i)
+        time.sleep(0.03)
+    assert shown[0] == 0 and shown[-1] == 19
+    assert shown == sorted(set(shown))
+    assert sched.skipped > 0
+    report = sched.report()
+    assert report['shown'] == len(shown)
+    assert report['shown'] + report['skipped'] == 20
+    assert report['requested_fps'] == 100
+    assert report['achieved_fps'] == pytest.approx(report['shown'] / report['seconds'])
+    assert report['achieved_fps'] < 100
+    assert report['frametime'] >= 0.03
+    # The time of the last frame is taken when the playback ends
+    assert len(sched.frametimes) == len(shown)
+
+
+def test_fast_playback_shows_every_frame():
+    sched = PlaybackScheduler(['a', 'b', 'c'], fps=1000)
+    assert list(sched) == ['a', 'b', 'c']
+    assert sched.report()['skipped'] == 0
+    # Iterating again restarts the playback
+    assert list(sched)[-1] == 'c' and sched.report()['shown'] <= 3
+
+
+def test_plan_export_duration():
+    anm = image_anim(12)
+    assert plan_export(anm, fps=10) == list(range(12))
+    assert plan_export(anm, fps=10, duration=0.6) == plan_frames(12, 6)
+    frames = plan_export(anm, fps=10, duration=3)
+    assert len(frames) == 30 and frames[0] == 0 and frames[-1] == 11
+    assert all(frames.count(i) >= 2 for i in range(12))
+    assert plan_export(anm, fps=10, frames=[2, 4, 6, 8], duration=0.2) == [2, 8]
+
+
+def test_plan_export_budget(monkeypatch):
+    anm = image_anim(12)
+    monkeypatch.setattr(schedule, 'estimate_frametime', lambda anim, dpi=None: 0.1)
+    assert len(plan_export(anm, fps=10, budget=0.5)) == 5
+    assert len(plan_export(anm, fps=10, budget=0.5, workers=2)) == 10
+    # The budget never repeats frames
+    assert plan_export(anm, fps=10, budget=100) == list(range(12))
+    assert len(plan_export(anm, fps=10, duration=0.4, budget=100)) == 4
+
+
+def test_export_with_duration(tmp_path):
+    anm = image_anim(4)
+    stats = anm.export(str(tmp_path / 'frames'), fps=10, duration=0.8)
+    assert stats['frames'] == 8
+    assert len(os.listdir(str(tmp_path / 'frames'))) == 8
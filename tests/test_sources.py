@@ -0,0 +1,136 @@
+import numpy as np
+import pickle
+import os
+import pytest
+from animo.sources import ArraySource, CallableSource, GeneratorSource, PrefetchSource, \
+                    SlabSource, frame_stack, as_source, contiguous_stack, stack_digest
+
+
+def volume():
+    return np.arange(5*6*7, dtype='float64').reshape(5, 6, 7)
+
+
+@pytest.mark.parametrize('axis', [0, 1, 2])
+def test_array_source_matches_rollaxis(axis):
+    data = volume()
+    ref = np.rollaxis(data, axis)
+    src = ArraySource(data, axis=axis)
+    assert src.shape == ref.shape
+    assert all(np.array_equal(src[i], ref[i]) for i in range(len(ref)))
+    assert np.array_equal(src[1:4], ref[1:4])
+    assert np.array_equal(src[-1], ref[-1])
+    with pytest.raises(IndexError):
+        src[len(ref)]
+
+
+def test_memmap_source(tmp_path):
+    path = str(tmp_path / 'vol.npy')
+    np.save(path, volume())
+    stack = frame_stack(np.load(path, mmap_mode='r'), axis=1, prefetch=2)
+    assert isinstance(stack, PrefetchSource)
+    assert np.array_equal(stack[3], volume()[:, 3])
+    stack.close()
+
+
+def test_callable_source():
+    src = as_source(lambda i: np.full((2, 3), i), nframes=4)
+    assert isinstance(src, CallableSource)
+    assert src.shape == (4, 2, 3)
+    assert np.array_equal(src[1:3][:, 0, 0], [1, 2])
+    with pytest.raises(Exception):
+        as_source(lambda i: i)
+
+
+def test_generator_source_history():
+    src = as_source((np.full((2, 2), i) for i in range(10)), nframes=10, prefetch=0)
+    assert isinstance(src, GeneratorSource)
+    assert src[0][0, 0] == 0 and src[3][0, 0] == 3 and src[2][0, 0] == 2
+    with pytest.raises(Exception):
+        src[0]
+    with pytest.raises(Exception):
+        pickle.dumps(src)
+
+
+def test_prefetch_source_in_order_and_random():
+    data = volume()
+    src = PrefetchSource(ArraySource(data), depth=3)
+    assert all(np.array_equal(src[i], data[i]) for i in range(5))
+    assert all(np.array_equal(src[i], data[i]) for i in (4, 0, 2))
+    clone = pickle.loads(pickle.dumps(src))
+    assert np.array_equal(clone[2], data[2])
+    src.close()
+    clone.close()
+
+
+def test_frame_stack_views_arrays():
+    data = volume()
+    stack = frame_stack(data, axis=2)
+    assert isinstance(stack, np.ndarray) and np.shares_memory(stack, data)
+    assert stack.shape == (7, 5, 6)
+
+
+def frames(n=5):
+    return (np.full((4, 4), float(i)) for i in range(n))
+
+
+@pytest.mark.parametrize('opts', [{'climits':'global'}, {'climits':'frame'}, \
+                                  {'engine':'raster'}, {'compact':'uint8'}])
+def test_generator_needs_fixed_limits(opts):
+    import matplotlib
+    matplotlib.use('Agg')
+    from animo.animo import ImageAnimate
+    from animo.export import FrameRenderer
+    with pytest.raises(Exception, match='generator'):
+        ImageAnimate(frames(), nframes=5, pyplot=False, **opts)
+    anm = ImageAnimate(frames(), nframes=5, vmin=0, vmax=4, pyplot=False, **opts)
+    renderer = FrameRenderer(anm)
+    assert all(renderer.render(i).ndim == 3 for i in range(5))
+
+
+@pytest.mark.parametrize('axis', [1, 2])
+def test_slab_source_matches_slices(axis):
+    vol = volume()
+    src = SlabSource(vol, axis=axis, slab=4)
+    for i in list(range(vol.shape[axis])) + [0, 5, 2]:
+        assert np.array_equal(src.read(i), np.take(vol, i, axis=axis))
+    src = pickle.loads(pickle.dumps(src))
+    assert np.array_equal(src.read(3), np.take(vol, 3, axis=axis))
+
+
+@pytest.mark.parametrize('axis', [0, 1, 2])
+def test_contiguous_stack(axis):
+    vol = volume()
+    out = contiguous_stack(vol, axis=axis, chunkbytes=100)
+    assert out.flags.c_contiguous
+    assert np.array_equal(out, np.moveaxis(vol, axis, 0))
+
+
+def test_contiguous_stack_file_follows_content_and_axis(tmp_path):
+    path = str(tmp_path / 'stack.npy')
+    vol = np.arange(4*6*6, dtype='float64').reshape(4, 6, 6)
+    first = contiguous_stack(vol, axis=1, path=path)
+    assert np.array_equal(first, np.moveaxis(vol, 1, 0))
+    mtime = os.path.getmtime(path)
+    assert np.array_equal(contiguous_stack(vol, axis=1, path=path), first)
+    assert os.path.getmtime(path) == mtime
+    # Same shape and type along another axis or with other values
+    assert np.array_equal(contiguous_stack(vol, axis=2, path=path), np.moveaxis(vol, 2, 0))
+    assert np.array_equal(contiguous_stack(vol*0, axis=2, path=path), np.zeros((6, 4, 6)))
+
+
+def test_contiguous_stack_keys_memmaps_on_the_file(tmp_path):
+    src, path = str(tmp_path / 'vol.npy'), str(tmp_path / 'stack.npy')
+    np.save(src, volume())
+    mm = np.load(src, mmap_mode='r')
+    assert stack_digest(mm)['file'] == os.path.realpath(src)
+    assert not isinstance(stack_digest(mm[1:]), dict)
+    contiguous_stack(mm, axis=2, path=path)
+    mtime = os.path.getmtime(path)
+    contiguous_stack(np.load(src, mmap_mode='r'), axis=2, path=path)
+    assert os.path.getmtime(path) == mtime
+    before = os.stat(src).st_mtime_ns
+    np.save(src, 2*volume())
+    # Same size, a later modification time even on coarse clocks
+    os.utime(src, ns=(before + 10**9, before + 10**9))
+    out = contiguous_stack(np.load(src, mmap_mode='r'), axis=2, path=path)
+    assert np.array_equal(out, np.moveaxis(2*volume(), 2, 0))
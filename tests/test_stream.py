@@ -0,0 +1,89 @@
+import matplotlib
+matplotlib.use('Agg')
+import os
+import pickle
+import threading
+import numpy as np
+import pytest
+from animo.animo import StreamImageAnimate, StreamLineAnimate
+from animo.sources import RingSource
+
+
+def test_ring_wraps_around():
+    ring = RingSource((2, 3), capacity=4)
+    seqs = [ring.push(np.full((2, 3), float(i))) for i in range(6)]
+    assert seqs == list(range(6))
+    assert ring.nframes == 6 and ring.window() == range(2, 6)
+    assert np.all(ring.read(5) == 5.) and np.all(ring.read(2) == 2.)
+    for i in (1, 6):
+        with pytest.raises(Exception, match='no longer in the ring buffer'):
+            ring.read(i)
+    with pytest.raises(Exception):
+        ring.push(np.zeros((3, 2)))
+    ring = pickle.loads(pickle.dumps(ring))
+    assert np.all(ring.read(4) == 4.)
+
+
+def test_concurrent_pushes():
+    ring = RingSource((8,), capacity=16)
+
+    def produce(k):
+        for _ in range(250):
+            ring.push(np.full(8, float(k)))
+    threads = [threading.Thread(target=produce, args=(k,)) for k in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert ring.count == 1000
+    for i in ring.window():
+        frame = ring.read(i)
+        # Frames are never torn between producers
+        assert np.all(frame == frame[0]) and frame[0] in range(4)
+
+
+def test_refreshes_coalesce_pushes():
+    anm = StreamImageAnimate((4, 4), capacity=8, climits='frame', pyplot=False)
+    refresh = anm.refreshes()
+    assert next(refresh) is None
+    for i in range(3):
+        anm.push(np.full((4, 4), float(i)))
+    seq = next(refresh)
+    assert seq == 2
+    anm.animator(seq)
+    assert anm.shown == 2 and anm.skipped == 2
+    assert next(refresh) is None
+    assert anm.animator(None) == anm.artists()
+    anm.push(np.ones((4, 4)))
+    anm.animator(next(refresh))
+    assert anm.shown == 3 and anm.skipped == 2
+
+
+def test_live_view_draws_newest_frame():
+    anm = StreamImageAnimate((4, 4), capacity=8, vmin=0, vmax=10, pyplot=False)
+    anm.view_anim()
+    for i in range(5):
+        anm.push(np.full((4, 4), float(i)))
+    anm.anim._step()
+    assert anm.shown == 4
+    assert np.all(np.asarray(anm.qmesh.get_array()) == 4.)
+
+
+def test_export_ring_window(tmp_path):
+    anm = StreamImageAnimate((6, 6), capacity=4, vmin=0, vmax=10, pyplot=False, text='seq {}')
+    for i in range(7):
+        anm.push(np.full((6, 6), float(i)))
+    stats = anm.export(str(tmp_path / 'frames'), fps=5)
+    assert stats['frames'] == 4
+    assert len(os.listdir(str(tmp_path / 'frames'))) == 4
+
+
+def test_stream_lines(tmp_path):
+    x = np.linspace(0, 1, 20)
+    anm = StreamLineAnimate(x, capacity=4, pyplot=False)
+    for i in range(6):
+        anm.push(np.sin(x + i))
+    anm.animator(5)
+    assert np.allclose(anm.lines.get_ydata(), np.sin(x + 5))
+    assert anm.skipped == 5
+    assert anm.export(str(tmp_path / 'lines'), fps=5)['frames'] == 4
@@ -0,0 +1,85 @@
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import pytest
+from animo.animo import CompositePlotAnimate
+from animo.export import FrameRenderer
+from animo.timeline import Track, Timeline, content_key
+
+
+def test_track_index_fixed_rate():
+    track = Track(4, fps=2, start=1.)
+    assert [track.index(t) for t in (0., 1., 1.4, 1.5, 2.5, 10.)] == [0, 0, 0, 1, 3, 3]
+    assert track.duration == 3.
+    loop = Track(4, fps=2, loop=True)
+    assert [loop.index(t) for t in (0., 1.5, 2., 3.)] == [0, 3, 0, 2]
+
+
+def test_track_index_time_stamps():
+    track = Track(3, times=[0, 5, 15])
+    assert [track.index(t) for t in (0., 4.9, 5., 14., 20.)] == [0, 0, 1, 1, 2]
+    assert track.duration == 25.
+    with pytest.raises(Exception):
+        Track(3, times=[0, 1])
+
+
+def test_timeline_changes_and_commit():
+    tl = Timeline([('a', Track(8)), ('b', Track(2, fps=1))], fps=4)
+    assert tl.nticks == 8
+    assert list(tl.changes(0)) == ['a', 'b']
+    tl.commit(tl.indices(0))
+    assert tl.changes(0) == {}
+    assert dict(tl.changes(1)) == {'a':1}
+    tl.commit(tl.changes(1))
+    assert dict(tl.changes(4)) == {'a':4, 'b':1}
+    tl.reset()
+    assert list(tl.changes(4)) == ['a', 'b']
+
+
+def test_timeline_skips_identical_content():
+    frames = [np.zeros(3), np.zeros(3), np.ones(3)]
+    key = lambda name, index: content_key(frames[index])
+    tl = Timeline([('a', Track(3))], fps=1)
+    tl.commit(tl.indices(0), key)
+    assert tl.changes(1, key) == {}
+    assert tl.shown['a'][0] == 1
+    assert dict(tl.changes(2, key)) == {'a':2}
+
+
+def composite(**kwargs):
+    rs = np.random.RandomState(0)
+    data = rs.rand(2, 12, 16)
+    x = np.linspace(0, 15, 40)[None, :]
+    y = 6. + 3*np.sin(x/3. + 0.5*np.arange(8)[:, None])
+    return CompositePlotAnimate(x, y, data, climits='global', fps=4, pyplot=False, \
+                text=['t0', 't1'], \
+                tracks={'image':{'fps':1}, 'line':{'nframes':8}, 'text':{'times':[0, 1]}}, **kwargs)
+
+
+def test_composite_tracks_per_tick():
+    anm = composite()
+    assert anm.nframes == 8
+    anm.animator(0)
+    assert anm.changed(1)
+    dirty = anm.update_tracks(1)
+    assert list(dirty) == ['line']
+    assert anm.txt.get_text() == 't0'
+    anm.animator(4)
+    assert anm.timeline.shown['image'][0] == 1
+    assert anm.txt.get_text() == 't1'
+    assert not anm.changed(4)
+
+
+def test_composite_ticks_match_fresh_draws():
+    renderer = FrameRenderer(composite())
+    frames = [renderer.render(i) for i in range(8)]
+    for i in (3, 4, 7):
+        assert np.array_equal(frames[i], FrameRenderer(composite()).render(i))
+
+
+def test_composite_unchanged_tick_reuses_frame():
+    anm = composite(dedup=True)
+    anm.y[3] = anm.y[2]
+    renderer = FrameRenderer(anm)
+    renderer.render(2)
+    assert not anm.changed(3)